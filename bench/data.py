@@ -0,0 +1,47 @@
+import random
+from typing import Any, Dict, List
+
+# Synthetic catalog content shared by the fake servers. Names overlap across
+# degrees (and come in near-duplicate spellings) so that canonicalization,
+# similarity and graph building see realistic input.
+SKILL_VOCABULARY = [
+    ("Python Programming", "Technical"), ("Python", "Technical"), ("Java Programming", "Technical"),
+    ("C++", "Technical"), ("SQL", "Technical"), ("Database Design", "Technical"),
+    ("Data Structures", "Technical"), ("Algorithms", "Technical"), ("Algorithm Design", "Technical"),
+    ("Machine Learning", "Technical"), ("Deep Learning", "Technical"), ("Statistics", "Technical"),
+    ("Statistical Analysis", "Technical"), ("Linear Algebra", "Technical"), ("Calculus", "Technical"),
+    ("Probability", "Technical"), ("Data Visualisation", "Technical"), ("Data Visualization", "Technical"),
+    ("Computer Networks", "Technical"), ("Operating Systems", "Technical"), ("Cloud Computing", "Technical"),
+    ("Web Development", "Technical"), ("Software Testing", "Technical"), ("Version Control", "Technical"),
+    ("Cybersecurity", "Technical"), ("Cryptography", "Technical"), ("Embedded Systems", "Technical"),
+    ("Circuit Analysis", "Technical"), ("Signal Processing", "Technical"), ("Control Systems", "Technical"),
+    ("Thermodynamics", "Technical"), ("Fluid Mechanics", "Technical"), ("Financial Accounting", "Technical"),
+    ("Managerial Accounting", "Technical"), ("Econometrics", "Technical"), ("Microeconomics", "Technical"),
+    ("Macroeconomics", "Technical"), ("Corporate Finance", "Technical"), ("Taxation", "Technical"),
+    ("Auditing", "Technical"), ("Business Law", "Technical"), ("Marketing Strategy", "Technical"),
+    ("Project Management", "Soft"), ("Teamwork", "Soft"), ("Team Work", "Soft"), ("Communication", "Soft"),
+    ("Technical Writing", "Soft"), ("Critical Thinking", "Soft"), ("Problem Solving", "Soft"),
+    ("Problem-Solving", "Soft"), ("Leadership", "Soft"), ("Time Management", "Soft"),
+    ("Presentation Skills", "Soft"), ("Research Methods", "Soft"), ("Ethics", "Soft"),
+    ("Negotiation", "Soft"), ("Attention to Detail", "Soft"), ("Adaptability", "Soft"),
+]
+
+_WORDS = ("analysis design systems practical theory applied modelling methods foundations "
+          "introduction advanced principles engineering management data computing").split()
+
+
+def filler(rng: random.Random, size: int) -> str:
+    """About `size` characters of word-like text."""
+    words, length = [], 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:max(size, 0)]
+
+
+def skills(rng: random.Random, count: int, text_bytes: int) -> List[Dict[str, Any]]:
+    """`count` distinct skills with descriptions of about `text_bytes` characters."""
+    picked = rng.sample(SKILL_VOCABULARY, min(count, len(SKILL_VOCABULARY)))
+    return [{"name": name, "category": category, "description": filler(rng, text_bytes)}
+            for name, category in picked]
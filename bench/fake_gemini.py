@@ -0,0 +1,165 @@
+"""
+Local stand-in for the Gemini generateContent / streamGenerateContent REST API.
+
+    python -m bench.fake_gemini --port 54322 --latency-ms 800 --error-rate 0.02 --rate-limit-rate 0.05
+
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:54322 (any GEMINI_API_KEY);
+both the REST analysis calls and the google-genai extraction client honour it.
+Responses follow the request's responseSchema when one is sent; schema-less prompts
+get the skill-extraction shape ({"skills": [...]}, or {"modules": [...]} for batched
+prompts). usageMetadata is filled in with rough token counts.
+"""
+import re
+import json
+import zlib
+import random
+import asyncio
+import argparse
+from typing import Any, Dict
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from bench.data import filler, skills
+from bench.faults import Faults, add_server_arguments, faults_from_args
+
+_MODULE_ID = re.compile(r"Module ID: (\d+)")
+
+
+class FakeGemini:
+    def __init__(self, faults: Faults, skills_per_module: int, list_items: int, text_bytes: int,
+                 rate_limit_rate: float, chunks: int, chunk_ms: float):
+        self.faults = faults
+        self.skills_per_module = skills_per_module
+        self.list_items = list_items
+        self.text_bytes = text_bytes
+        self.rate_limit_rate = rate_limit_rate
+        self.chunks = chunks
+        self.chunk_ms = chunk_ms
+        self.requests = 0
+
+    def _from_schema(self, schema: Dict[str, Any], defs: Dict[str, Any], rng: random.Random) -> Any:
+        if "$ref" in schema:
+            return self._from_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, rng)
+        if "anyOf" in schema:
+            return self._from_schema(next(s for s in schema["anyOf"] if s.get("type") != "null"), defs, rng)
+        kind = (schema.get("type") or "object").lower()
+        if kind == "object":
+            return {name: self._from_schema(prop, defs, rng) for name, prop in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._from_schema(schema.get("items", {}), defs, rng) for _ in range(self.list_items)]
+        if kind in ("integer", "number"):
+            return rng.randint(1, 100)
+        if kind == "boolean":
+            return True
+        return filler(rng, self.text_bytes)
+
+    def respond(self, body: Dict[str, Any]) -> str:
+        """JSON text answering the request, deterministic per prompt."""
+        prompt = " ".join(part.get("text", "")
+                          for content in body.get("contents", []) for part in content.get("parts", []))
+        rng = random.Random(zlib.crc32(prompt.encode()))
+        config = body.get("generationConfig") or {}
+        schema = config.get("responseSchema") or config.get("responseJsonSchema")
+        if schema:
+            result = self._from_schema(schema, schema.get("$defs", {}), rng)
+        elif '"modules": [' in prompt:
+            result = {"modules": [
+                {"module_id": int(module_id), "skills": skills(rng, self.skills_per_module, self.text_bytes)}
+                for module_id in _MODULE_ID.findall(prompt)
+            ]}
+        else:
+            result = {"skills": skills(rng, self.skills_per_module, self.text_bytes)}
+        return json.dumps(result)
+
+    @staticmethod
+    def _candidate(text: str, prompt_chars: int, output_chars: int, finished: bool) -> Dict[str, Any]:
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        return {
+            "candidates": [candidate],
+            "usageMetadata": {
+                "promptTokenCount": prompt_chars // 4,
+                "candidatesTokenCount": output_chars // 4,
+                "totalTokenCount": (prompt_chars + output_chars) // 4,
+            },
+            "modelVersion": "bench-fake",
+        }
+
+    def _failure(self):
+        if self.faults.roll(self.rate_limit_rate):
+            return JSONResponse({"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Injected quota exhaustion",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "1s"}],
+            }}, status_code=429, headers={"Retry-After": "1"})
+        if self.faults.roll():
+            return JSONResponse({"error": {"code": 503, "status": "UNAVAILABLE", "message": "Injected failure"}},
+                                status_code=503)
+        return None
+
+    async def handle(self, target: str, request: Request):
+        self.requests += 1
+        model, _, method = target.partition(":")
+        body = await request.json()
+        await self.faults.delay()
+        failure = self._failure()
+        if failure is not None:
+            return failure
+
+        text = self.respond(body)
+        prompt_chars = len(json.dumps(body))
+        if method == "generateContent":
+            return JSONResponse(self._candidate(text, prompt_chars, len(text), finished=True))
+        if method != "streamGenerateContent":
+            return JSONResponse({"error": {"code": 404, "status": "NOT_FOUND",
+                                           "message": f"Method {method} is not supported by the fake"}},
+                                status_code=404)
+
+        size = max(1, -(-len(text) // self.chunks))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+
+        async def events():
+            sent = 0
+            for i, piece in enumerate(pieces):
+                if i:
+                    await asyncio.sleep(self.chunk_ms / 1000)
+                sent += len(piece)
+                event = self._candidate(piece, prompt_chars, sent, finished=i == len(pieces) - 1)
+                yield f"data: {json.dumps(event)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def create_app(server: FakeGemini) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+
+    @app.post("/{version}/models/{target}")
+    async def model_endpoint(version: str, target: str, request: Request):
+        return await server.handle(target, request)
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": server.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_server_arguments(parser, default_port=54322)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with a 429 and Retry-After.")
+    parser.add_argument("--skills", type=int, default=8, help="Skills returned per extracted module.")
+    parser.add_argument("--list-items", type=int, default=5, help="Items per array in schema responses.")
+    parser.add_argument("--text-bytes", type=int, default=120, help="Length of generated strings.")
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per streamed response.")
+    parser.add_argument("--chunk-ms", type=float, default=50.0, help="Delay between streamed chunks.")
+    args = parser.parse_args()
+
+    import uvicorn
+    server = FakeGemini(faults_from_args(args), args.skills, args.list_items, args.text_bytes,
+                        args.rate_limit_rate, args.chunks, args.chunk_ms)
+    uvicorn.run(create_app(server), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Local stand-in for Supabase's PostgREST API, serving a generated catalog from memory.
+
+    python -m bench.fake_postgrest --port 54321 --degrees 20 --modules 12 --skills 8 --latency-ms 15
+
+Point the app at it with SUPABASE_URL=http://127.0.0.1:54321 (any SUPABASE_KEY).
+Only the subset of PostgREST this service uses is implemented: select (with one
+level of foreign-key embedding such as degree_id(id,name)), eq/neq/gt/gte/lt/lte/in
+filters (also on a JSON field, column->>key), order, limit/offset, single-object
+responses, upsert (merge or ignore duplicates), update and delete.
+"""
+import random
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from bench.data import filler, skills
+from bench.faults import Faults, add_server_arguments, faults_from_args
+
+# Embedded selects resolve these columns to rows of the referenced table
+FOREIGN_KEYS = {"degree_id": "degrees", "module_id": "modules"}
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+_OPERATORS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+}
+
+
+def generate_catalog(degrees: int, modules: int, skills_per_module: int, text_bytes: int,
+                     seed: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Degrees with `modules` modules each, every module carrying `skills_per_module` extracted skills."""
+    rng = random.Random(seed)
+    tables = {"degrees": [], "modules": [], "extracted_skills": [], "degree_graphs": []}
+    for degree_id in range(1, degrees + 1):
+        tables["degrees"].append({"id": degree_id, "name": f"Bachelor of {filler(rng, 24).title()} {degree_id}"})
+        for _ in range(modules):
+            module_id = len(tables["modules"]) + 1
+            tables["modules"].append({
+                "id": module_id,
+                "name": f"{filler(rng, 20).title()} {module_id}",
+                "description": filler(rng, text_bytes),
+                "degree_id": degree_id,
+            })
+            for skill in skills(rng, skills_per_module, text_bytes // 4):
+                tables["extracted_skills"].append({
+                    "id": len(tables["extracted_skills"]) + 1,
+                    "degree_id": degree_id,
+                    "module_id": module_id,
+                    **skill,
+                })
+    return tables
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Splits a select list on commas outside parentheses."""
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current.append(ch)
+    parts.append("".join(current).strip())
+    return [p for p in parts if p]
+
+
+def _coerce(raw: str, sample: Any) -> Any:
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, float):
+        return float(raw)
+    return raw
+
+
+def _column_value(row: Dict[str, Any], column: str) -> Any:
+    if "->>" not in column:
+        return row.get(column)
+    column, field = column.split("->>", 1)
+    document = row.get(column)
+    return document.get(field) if isinstance(document, dict) else None
+
+
+def _matches(row: Dict[str, Any], filters: List[Tuple[str, str, str]]) -> bool:
+    for column, op, raw in filters:
+        value = _column_value(row, column)
+        if op == "in":
+            if str(value) not in {v.strip().strip('"') for v in raw.strip("()").split(",")}:
+                return False
+        elif op == "is":
+            if raw == "null" and value is not None:
+                return False
+        elif not _OPERATORS[op](value, _coerce(raw, value)):
+            return False
+    return True
+
+
+class FakePostgrest:
+    """In-memory tables behind the PostgREST HTTP surface."""
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]], faults: Faults):
+        self.tables = tables
+        self.faults = faults
+        self.requests = 0
+
+    def _project(self, row: Dict[str, Any], select: str) -> Dict[str, Any]:
+        if select in ("", "*"):
+            return dict(row)
+        out = {}
+        for item in _split_top_level(select):
+            if "(" in item:
+                column, inner = item.split("(", 1)
+                column = column.strip()
+                target = self._lookup(FOREIGN_KEYS.get(column), row.get(column))
+                out[column] = self._project(target, inner[:-1]) if target is not None else None
+            elif item == "*":
+                out.update(row)
+            else:
+                out[item] = row.get(item)
+        return out
+
+    def _lookup(self, table: Optional[str], key: Any) -> Optional[Dict[str, Any]]:
+        for row in self.tables.get(table, []):
+            if row.get("id") == key:
+                return row
+        return None
+
+    def _query(self, table: str, params) -> List[Dict[str, Any]]:
+        filters = []
+        for column, value in params.multi_items():
+            if column in RESERVED_PARAMS or "." not in value:
+                continue
+            op, raw = value.split(".", 1)
+            filters.append((column, op, raw))
+        rows = [row for row in self.tables.get(table, []) if _matches(row, filters)]
+
+        for term in reversed((params.get("order") or "").split(",")):
+            if not term:
+                continue
+            column, *modifiers = term.split(".")
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse="desc" in modifiers)
+
+        offset = int(params.get("offset") or 0)
+        limit = params.get("limit")
+        return rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+
+    def _upsert(self, table: str, payload: Any, conflict: List[str], merge: bool) -> List[Dict[str, Any]]:
+        rows = self.tables.setdefault(table, [])
+        written = []
+        for record in payload if isinstance(payload, list) else [payload]:
+            existing = None
+            if conflict:
+                key = tuple(record.get(c) for c in conflict)
+                existing = next((r for r in rows if tuple(r.get(c) for c in conflict) == key), None)
+            if existing is not None:
+                if merge:
+                    existing.update(record)
+                    written.append(existing)
+            else:
+                row = {"id": max((r.get("id") or 0 for r in rows), default=0) + 1, **record}
+                rows.append(row)
+                written.append(row)
+        return written
+
+    async def handle(self, table: str, request: Request) -> JSONResponse:
+        self.requests += 1
+        await self.faults.delay()
+        if self.faults.roll():
+            return JSONResponse({"code": "BENCH", "message": "Injected failure", "details": None, "hint": None},
+                                status_code=503)
+        if table not in self.tables and request.method == "GET":
+            return JSONResponse({"code": "42P01", "message": f'relation "public.{table}" does not exist',
+                                 "details": None, "hint": None}, status_code=404)
+
+        params = request.query_params
+        if request.method == "GET":
+            rows = self._query(table, params)
+        elif request.method == "POST":
+            prefer = request.headers.get("prefer", "")
+            conflict = [c.strip() for c in (params.get("on_conflict") or "").split(",") if c.strip()]
+            rows = self._upsert(table, await request.json(), conflict, "merge-duplicates" in prefer)
+        elif request.method == "PATCH":
+            changes = await request.json()
+            rows = self._query(table, params)
+            for row in rows:
+                row.update(changes)
+        else:  # DELETE
+            rows = self._query(table, params)
+            doomed = {id(row) for row in rows}
+            self.tables[table] = [row for row in self.tables[table] if id(row) not in doomed]
+
+        body = [self._project(row, params.get("select") or "*") for row in rows]
+        if request.headers.get("accept") == SINGLE_OBJECT:
+            if len(body) != 1:
+                return JSONResponse({
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(body)} rows",
+                    "hint": None,
+                }, status_code=406)
+            return JSONResponse(body[0])
+        return JSONResponse(body, status_code=201 if request.method == "POST" else 200)
+
+
+def create_app(server: FakePostgrest) -> FastAPI:
+    app = FastAPI(title="Fake PostgREST")
+
+    @app.api_route("/rest/v1/{table}", methods=["GET", "POST", "PATCH", "DELETE"])
+    async def table_endpoint(table: str, request: Request):
+        return await server.handle(table, request)
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": server.requests, "rows": {name: len(rows) for name, rows in server.tables.items()}}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_server_arguments(parser, default_port=54321)
+    parser.add_argument("--degrees", type=int, default=20)
+    parser.add_argument("--modules", type=int, default=12, help="Modules per degree.")
+    parser.add_argument("--skills", type=int, default=8, help="Extracted skills per module.")
+    parser.add_argument("--text-bytes", type=int, default=200, help="Length of module descriptions.")
+    args = parser.parse_args()
+
+    import uvicorn
+    tables = generate_catalog(args.degrees, args.modules, args.skills, args.text_bytes, args.seed)
+    uvicorn.run(create_app(FakePostgrest(tables, faults_from_args(args))),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import random
+import asyncio
+import argparse
+
+
+class Faults:
+    """Injected latency and failure rate shared by the fake servers."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    async def delay(self, extra_ms: float = 0.0):
+        """Sleeps for the configured latency plus uniform jitter (and `extra_ms`)."""
+        delay_ms = self.latency_ms + extra_ms
+        if self.jitter_ms:
+            delay_ms += self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    def roll(self, rate: float = None) -> bool:
+        """True with probability `rate` (the configured error rate by default)."""
+        rate = self.error_rate if rate is None else rate
+        return rate > 0 and self._random.random() < rate
+
+
+def add_server_arguments(parser: argparse.ArgumentParser, default_port: int):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every response.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter around the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for data generation and fault injection.")
+
+
+def faults_from_args(args: argparse.Namespace) -> Faults:
+    return Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
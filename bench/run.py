@@ -0,0 +1,348 @@
+"""
+Load scenarios for every router, run against local PostgREST and Gemini fakes.
+
+    python -m bench.run                                   # every scenario, default load
+    python -m bench.run -s analysis_summary -s graph_get -n 500 -c 32
+    python -m bench.run --gemini-latency-ms 1500 --gemini-rate-limit-rate 0.05 --label slow-gemini
+    python -m bench.run --cold                            # LLM, DB and shared caches disabled in the app
+    python -m bench.run --workers 4 -s graph_get          # several uvicorn workers sharing one cache file
+    python -m bench.run --compare bench/results/abc1234.json bench/results/def5678.json
+
+The fakes and the app (uvicorn main:app) run as subprocesses, with the app's
+caches, job queue and indexes in a temporary directory. Each scenario is a
+closed loop of --concurrency workers issuing --requests requests; job endpoints
+(202 + polling) are timed until the job finishes. Results (p50/p95/p99, req/s,
+status counts) are printed and saved to bench/results/<commit>[-<label>].json so
+runs can be compared across commits.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import platform
+import subprocess
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+JOB_POLL_INTERVAL = 0.05
+
+
+class Target:
+    """What a scenario needs to build its requests: the app client and the catalog shape."""
+
+    def __init__(self, http: httpx.AsyncClient, degrees: int, modules: int):
+        self.http = http
+        self.degrees = degrees
+        self.modules = modules
+
+    def degree(self, i: int) -> int:
+        return i % self.degrees + 1
+
+    def module(self, i: int) -> int:
+        return i % (self.degrees * self.modules) + 1
+
+    async def run_job(self, path: str) -> int:
+        """Submits a job and polls it to completion; returns 200 on success, 500 on failure."""
+        response = await self.http.post(path)
+        if response.status_code != 202:
+            return response.status_code
+        status_url = response.json()["status_url"]
+        while True:
+            job = (await self.http.get(status_url)).json()
+            if job["status"] in ("succeeded", "failed"):
+                return 200 if job["status"] == "succeeded" else 500
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+async def _get(target: Target, path: str) -> int:
+    return (await target.http.get(path)).status_code
+
+
+async def _stream(target: Target, path: str) -> int:
+    """Reads a whole SSE stream; an 'error' event counts as a failure."""
+    async with target.http.stream("GET", path) as response:
+        failed = False
+        async for line in response.aiter_lines():
+            failed = failed or line == "event: error"
+        return 500 if failed else response.status_code
+
+
+async def _process_all_graphs(target: Target):
+    await asyncio.gather(*[target.run_job(f"/api/degrees/{d}/process-graph") for d in range(1, target.degrees + 1)])
+
+
+Request = Callable[[Target, int], Awaitable[int]]
+
+
+class Scenario:
+    def __init__(self, name: str, request: Request, setup: Callable[[Target], Awaitable[None]] = None):
+        self.name = name
+        self.request = request
+        self.setup = setup
+
+
+# Ordered so that later scenarios find the data earlier ones produced (graphs, skills)
+SCENARIOS = [
+    Scenario("degree_list", lambda t, i: _get(t, "/api/degrees/")),
+    Scenario("degree_search", lambda t, i: _get(t, f"/api/degrees/search?q={'bach ' if i % 2 else ''}{t.degree(i)}")),
+    Scenario("module_process", lambda t, i: t.run_job(f"/api/modules/{t.module(i)}/process")),
+    Scenario("degree_modules_process", lambda t, i: t.run_job(f"/api/degrees/{t.degree(i)}/process-modules")),
+    Scenario("graph_process", lambda t, i: t.run_job(f"/api/degrees/{t.degree(i)}/process-graph")),
+    Scenario("graph_get", lambda t, i: _get(t, f"/api/degrees/{t.degree(i)}/graph"), setup=_process_all_graphs),
+    Scenario("graph_centrality", lambda t, i: _get(t, f"/api/degrees/{t.degree(i)}/centrality")),
+    Scenario("graph_neighborhood", lambda t, i: _get(t, f"/api/graph/neighborhood?node=deg_{t.degree(i)}&hops=2")),
+    Scenario("similar_modules", lambda t, i: _get(t, f"/api/modules/{t.module(i)}/similar")),
+    Scenario("similar_degrees", lambda t, i: _get(t, f"/api/degrees/{t.degree(i)}/similar")),
+    Scenario("analysis_summary", lambda t, i: _get(t, f"/api/degrees/{t.degree(i)}/summary")),
+    Scenario("analysis_development", lambda t, i: _get(t, f"/api/degrees/{t.degree(i)}/development")),
+    Scenario("analysis_jobs", lambda t, i: _get(t, f"/api/degrees/{t.degree(i)}/jobs")),
+    Scenario("analysis_combined", lambda t, i: _get(t, f"/api/degrees/{t.degree(i)}/analysis")),
+    Scenario("analysis_stream", lambda t, i: _stream(t, f"/api/degrees/{t.degree(i)}/analysis/stream")),
+]
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], duration: float) -> Dict[str, Any]:
+    ok = sorted(latencies)
+    total = sum(statuses.values())
+    return {
+        "requests": total,
+        "errors": total - statuses.get("200", 0),
+        "statuses": statuses,
+        "duration_s": round(duration, 3),
+        "rps": round(total / duration, 2) if duration else None,
+        "mean_ms": round(sum(ok) / len(ok) * 1000, 2) if ok else None,
+        **{f"p{q}_ms": round(percentile(ok, q) * 1000, 2) if ok else None for q in (50, 95, 99)},
+        "max_ms": round(ok[-1] * 1000, 2) if ok else None,
+    }
+
+
+async def run_scenario(target: Target, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Closed loop: `concurrency` workers issue `requests` requests in total."""
+    if scenario.setup is not None:
+        await scenario.setup(target)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                status = str(await scenario.request(target, i))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+            try:
+                await http.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def _fake_args(args: argparse.Namespace, prefix: str) -> List[str]:
+    out = []
+    for name in ("latency_ms", "jitter_ms", "error_rate"):
+        out += [f"--{name.replace('_', '-')}", str(getattr(args, f"{prefix}_{name}"))]
+    return out
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="skillpath-bench-")
+    pg_port, gemini_port, app_port = _free_port(), _free_port(), _free_port()
+    python = [sys.executable, "-m"]
+    processes = []
+
+    def spawn(command: List[str], env: Dict[str, str] = None, log: str = None) -> subprocess.Popen:
+        output = open(os.path.join(workdir, log), "w") if log else subprocess.DEVNULL
+        process = subprocess.Popen(command, cwd=ROOT, env={**os.environ, **(env or {})},
+                                   stdout=output, stderr=subprocess.STDOUT)
+        processes.append(process)
+        return process
+
+    try:
+        postgrest = spawn(python + ["bench.fake_postgrest", "--port", str(pg_port),
+                                    "--degrees", str(args.degrees), "--modules", str(args.modules),
+                                    "--skills", str(args.skills), "--text-bytes", str(args.text_bytes)]
+                          + _fake_args(args, "pg"), log="postgrest.log")
+        gemini = spawn(python + ["bench.fake_gemini", "--port", str(gemini_port),
+                                 "--skills", str(args.skills), "--text-bytes", str(args.text_bytes),
+                                 "--rate-limit-rate", str(args.gemini_rate_limit_rate),
+                                 "--chunk-ms", str(args.gemini_chunk_ms)]
+                       + _fake_args(args, "gemini"), log="gemini.log")
+        app_env = {
+            "SUPABASE_URL": f"http://127.0.0.1:{pg_port}",
+            "SUPABASE_KEY": "bench",
+            "GEMINI_API_KEY": "bench",
+            "GEMINI_BASE_URL": f"http://127.0.0.1:{gemini_port}",
+            "GEMINI_RPM": str(args.gemini_rpm),
+            "GEMINI_BURST": str(int(args.gemini_rpm)),
+            "JOB_QUEUE_PATH": os.path.join(workdir, "jobs.sqlite3"),
+            "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+            "SHARED_CACHE_PATH": os.path.join(workdir, "shared_cache.sqlite3"),
+            "SKILL_REGISTRY_PATH": os.path.join(workdir, "skill_registry.sqlite3"),
+            "SIMILARITY_INDEX_DIR": os.path.join(workdir, "similarity"),
+            "DEGREE_POPULARITY_PATH": os.path.join(workdir, "degree_popularity.json"),
+        }
+        if args.cold:
+            app_env.update({"LLM_CACHE_ENABLED": "false", "DB_CACHE_ENABLED": "false", "SHARED_CACHE_ENABLED": "false"})
+        try:
+            await _wait_ready(f"http://127.0.0.1:{pg_port}/stats", postgrest)
+            await _wait_ready(f"http://127.0.0.1:{gemini_port}/stats", gemini)
+            # The app loads its degree index at startup, so it starts once the fakes are up
+            app = spawn(python + ["uvicorn", "main:app", "--port", str(app_port), "--workers", str(args.workers),
+                                  "--log-level", "warning"],
+                        env=app_env, log="app.log")
+            await _wait_ready(f"http://127.0.0.1:{app_port}/", app)
+        except RuntimeError as e:
+            raise RuntimeError(f"{e}; logs in {workdir}") from None
+
+        results = {}
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits,
+                                     timeout=args.timeout) as http:
+            target = Target(http, args.degrees, args.modules)
+            for name in args.scenario or [s.name for s in SCENARIOS]:
+                results[name] = await run_scenario(target, SCENARIOS_BY_NAME[name], args.requests, args.concurrency)
+                print(format_row(name, results[name]), flush=True)
+            app_stats = (await http.get("/stats")).json()
+        return {"scenarios": results, "app_stats": app_stats, "logs": workdir}
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+HEADER = f"{'scenario':<24}{'req':>6}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def format_row(name: str, r: Dict[str, Any]) -> str:
+    return (f"{name:<24}{r['requests']:>6}{r['errors']:>6}{_fmt(r['rps']):>10}{_fmt(r['p50_ms']):>10}"
+            f"{_fmt(r['p95_ms']):>10}{_fmt(r['p99_ms']):>10}{_fmt(r['max_ms']):>10}")
+
+
+def compare(base_path: str, head_path: str):
+    """Prints per-scenario p50/p95/p99 and req/s for two saved runs, with the relative change."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+    print(f"base: {base['commit']} ({base['timestamp']})  head: {head['commit']} ({head['timestamp']})")
+    print(f"{'scenario':<24}" + "".join(f"{m:>26}" for m in ("p50 ms", "p95 ms", "p99 ms", "req/s")))
+    for name, new in head["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if old is None:
+            continue
+        cells = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+            a, b = old.get(metric), new.get(metric)
+            change = f"{(b - a) / a * 100:+.0f}%" if a and b is not None else ""
+            cells.append(f"{_fmt(a):>9} -> {_fmt(b):>7} {change:>6}")
+        print(f"{name:<24}" + "".join(f"{cell:>26}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scenario", action="append", choices=list(SCENARIOS_BY_NAME),
+                        help="Scenario to run (repeatable); all when omitted.")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Requests per scenario.")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (seconds).")
+    parser.add_argument("--cold", action="store_true", help="Disable the app's LLM, DB and shared caches.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (they share one cache file).")
+    parser.add_argument("--label", help="Suffix for the results file, e.g. a configuration name.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two saved result files.")
+
+    catalog = parser.add_argument_group("catalog (fake PostgREST data)")
+    catalog.add_argument("--degrees", type=int, default=20)
+    catalog.add_argument("--modules", type=int, default=12, help="Modules per degree.")
+    catalog.add_argument("--skills", type=int, default=8, help="Skills per module (stored and generated).")
+    catalog.add_argument("--text-bytes", type=int, default=200, help="Length of descriptions and generated text.")
+
+    faults = parser.add_argument_group("latency and failures")
+    for prefix, latency in (("pg", 10.0), ("gemini", 400.0)):
+        faults.add_argument(f"--{prefix}-latency-ms", type=float, default=latency)
+        faults.add_argument(f"--{prefix}-jitter-ms", type=float, default=latency / 4)
+        faults.add_argument(f"--{prefix}-error-rate", type=float, default=0.0)
+    faults.add_argument("--gemini-rate-limit-rate", type=float, default=0.0)
+    faults.add_argument("--gemini-chunk-ms", type=float, default=50.0)
+    faults.add_argument("--gemini-rpm", type=float, default=6000.0,
+                        help="Quota the app's Gemini gateway is configured with.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    print(HEADER)
+    outcome = asyncio.run(run(args))
+
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    if _git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare",)},
+        **outcome,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{commit}{'-' + args.label if args.label else ''}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {path} (app, PostgREST and Gemini logs in {outcome['logs']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Per-request CPU of the validation and JSON serialization paths, old against new.
+
+    python -m bench.serialization                 # default payload sizes
+    python -m bench.serialization -n 2000 --skills 400 --nodes 2000
+
+Each case runs the same payload through two in-process FastAPI apps (httpx ASGI
+transport, no network): one as the routers used to respond (model(**row) per row,
+model round-trips, the stock JSONResponse and jsonable_encoder) and one as they
+respond now (batch TypeAdapter validation, FastJSONResponse / orjson). Skill
+validation is timed directly. Times are process CPU microseconds per request.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, List
+import httpx
+from fastapi import FastAPI
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.data import skills as generate_skills, filler  # noqa: E402
+from serialization import FastJSONResponse, validate_rows  # noqa: E402
+from routers.analysis_endpoints import (  # noqa: E402
+    DetailedSkill, AlignmentSummaryResponse, DevelopmentSuggestionsResponse, JobSuggestionsResponse,
+    DegreeAnalysisResponse,
+)
+
+
+def _payloads(rng: random.Random, args: argparse.Namespace) -> Dict[str, Any]:
+    rows = []
+    while len(rows) < args.skills:
+        rows.extend(generate_skills(rng, args.skills - len(rows), args.text_bytes))
+    summary = {"alignment_summary": filler(rng, 400), "strongest_skills": [r["name"] for r in rows[:5]]}
+    development = {"enhancement_courses": [filler(rng, 60) for _ in range(5)],
+                   "complementary_skills": [filler(rng, 30) for _ in range(5)]}
+    jobs = {"job_suggestions": [filler(rng, 30) for _ in range(3)]}
+    nodes = [{"id": f"skill_{i}", "label": filler(rng, 20), "group": "Skill", "category": "Technical",
+              "val": 10, "hop": i % 3} for i in range(args.nodes)]
+    links = [{"source": f"skill_{i}", "target": f"skill_{(i * 7) % args.nodes}", "group": "module-skill"}
+             for i in range(args.nodes * 2)]
+    return {
+        "rows": rows,
+        "summary": summary,
+        "sections": {"summary": summary, "development": development, "jobs": jobs},
+        "neighborhood": {"node": "skill_0", "hops": 2, "degrees": list(range(20)),
+                         "nodes": nodes, "links": links, "truncated": False},
+        "degrees": [{"id": i, "name": filler(rng, 40)} for i in range(args.degrees)],
+    }
+
+
+def _old_app(p: Dict[str, Any]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/summary", response_model=AlignmentSummaryResponse)
+    async def summary():
+        return AlignmentSummaryResponse(**p["summary"])
+
+    @app.get("/analysis", response_model=DegreeAnalysisResponse)
+    async def analysis():
+        combined = DegreeAnalysisResponse()
+        combined.summary = AlignmentSummaryResponse(**p["sections"]["summary"])
+        combined.development = DevelopmentSuggestionsResponse(**p["sections"]["development"])
+        combined.jobs = JobSuggestionsResponse(**p["sections"]["jobs"])
+        return combined
+
+    @app.get("/neighborhood")
+    async def neighborhood():
+        return p["neighborhood"]
+
+    @app.get("/degrees")
+    async def degrees():
+        return p["degrees"]
+
+    return app
+
+
+def _new_app(p: Dict[str, Any]) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/summary", response_model=AlignmentSummaryResponse)
+    async def summary():
+        return p["summary"]
+
+    @app.get("/analysis", response_model=DegreeAnalysisResponse)
+    async def analysis():
+        combined = DegreeAnalysisResponse()
+        combined.summary = AlignmentSummaryResponse.model_validate(p["sections"]["summary"])
+        combined.development = DevelopmentSuggestionsResponse.model_validate(p["sections"]["development"])
+        combined.jobs = JobSuggestionsResponse.model_validate(p["sections"]["jobs"])
+        return FastJSONResponse(combined)
+
+    @app.get("/neighborhood")
+    async def neighborhood():
+        return FastJSONResponse(p["neighborhood"])
+
+    @app.get("/degrees")
+    async def degrees():
+        return FastJSONResponse(p["degrees"])
+
+    return app
+
+
+def _cpu_us(fn: Callable[[], Any], n: int) -> float:
+    fn()
+    started = time.process_time()
+    for _ in range(n):
+        fn()
+    return (time.process_time() - started) / n * 1e6
+
+
+async def _cpu_us_http(app: FastAPI, path: str, n: int) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        (await client.get(path)).raise_for_status()
+        started = time.process_time()
+        for _ in range(n):
+            await client.get(path)
+        return (time.process_time() - started) / n * 1e6
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    p = _payloads(random.Random(args.seed), args)
+    rows = p["rows"]
+    results = [{
+        "case": f"detailed_skills ({len(rows)} rows)",
+        "old": _cpu_us(lambda: [DetailedSkill(**row) for row in rows], args.requests),
+        "new": _cpu_us(lambda: validate_rows(DetailedSkill, rows), args.requests),
+    }]
+
+    old, new = _old_app(p), _new_app(p)
+    for case, path in (("analysis_section", "/summary"), ("analysis_combined", "/analysis"),
+                       (f"neighborhood ({args.nodes} nodes)", "/neighborhood"),
+                       (f"degree_list ({args.degrees} rows)", "/degrees")):
+        results.append({
+            "case": case,
+            "old": await _cpu_us_http(old, path, args.requests),
+            "new": await _cpu_us_http(new, path, args.requests),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--requests", type=int, default=500, help="Iterations per case.")
+    parser.add_argument("--skills", type=int, default=200, help="Detailed skill rows per degree.")
+    parser.add_argument("--text-bytes", type=int, default=200, help="Length of skill descriptions.")
+    parser.add_argument("--nodes", type=int, default=500, help="Nodes in the neighborhood payload.")
+    parser.add_argument("--degrees", type=int, default=1000, help="Rows in the degree list payload.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'case':<32}{'old us':>12}{'new us':>12}{'saved':>9}")
+    for r in results:
+        saved = 1 - r["new"] / r["old"] if r["old"] else 0.0
+        print(f"{r['case']:<32}{r['old']:>12.1f}{r['new']:>12.1f}{saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,78 @@
 import os
 import json
-import re
+import asyncio
 from google import genai
 from google.genai import types
+from llm_cache import llm_cache, make_key
+import singleflight
+import metrics
+from clients.gemini_gateway import gemini_gateway, GEMINI_BASE_URL, GEMINI_API_VERSION
+from clients.registry import client_registry
+from prompt_builder import log_prompt_tokens
 
-# Initialize globally (setup in main.py lifespan usually, but lazy loading here works too)
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# The SDK client is created once by the shared client registry (in main.lifespan, or on first use)
+client_registry.register("gemini", lambda: genai.Client(
+    api_key=os.getenv("GEMINI_API_KEY"),
+    http_options=types.HttpOptions(base_url=GEMINI_BASE_URL, api_version=GEMINI_API_VERSION)
+), close=lambda client: client.aio.aclose())
 
+GEMINI_EXTRACTION_MODEL = 'gemini-2.0-flash'
 
-async def generate_json(prompt: str):
+# Per-attempt timeout (seconds); concurrency and quota are handled by the shared gateway
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+
+
+class GeminiGenerationError(Exception):
+    """Raised when Gemini could not produce a JSON result (gateway failure, timeout or bad JSON)."""
+
+
+async def generate_json(prompt: str, degree_id: int = None):
     """
     Sends a prompt to Gemini and cleans the response to ensure valid JSON.
+
+    Uses the SDK's async path so the event loop is never blocked, and goes through
+    the shared Gemini gateway (quota, adaptive concurrency, retries, circuit breaker).
+    Successful results are cached by prompt (tagged with degree_id when given),
+    and concurrent identical prompts share one call. Failures raise GeminiGenerationError
+    so callers can tell an outage apart from an empty extraction.
     """
+    cache_key = make_key(GEMINI_EXTRACTION_MODEL, "", prompt, "application/json")
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    log_prompt_tokens("extraction", prompt)
     try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
+        return await singleflight.group("gemini_extraction").do(
+            cache_key, lambda: _generate(prompt, cache_key, degree_id)
+        )
+
+    except asyncio.TimeoutError as e:
+        raise GeminiGenerationError(f"Gemini timed out after {GEMINI_TIMEOUT_SECONDS}s") from e
+    except Exception as e:
+        raise GeminiGenerationError(f"Gemini Generation Error: {e}") from e
+
+
+async def _generate(prompt: str, cache_key: str, degree_id: int = None):
+    """Runs a time-limited Gemini call through the gateway and caches the parsed JSON."""
+    client = await client_registry.get("gemini")
+    response = await gemini_gateway.call(lambda: asyncio.wait_for(
+        client.aio.models.generate_content(
+            model=GEMINI_EXTRACTION_MODEL,
             contents=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type='application/json'
             )
-        )
+        ),
+        timeout=GEMINI_TIMEOUT_SECONDS
+    ), operation="extraction")
 
-        # Parse the JSON response
-        return json.loads(response.text)
+    usage = response.usage_metadata
+    if usage is not None:
+        metrics.record_llm_usage(GEMINI_EXTRACTION_MODEL, usage.prompt_token_count, usage.candidates_token_count)
 
-    except Exception as e:
-        print(f"Gemini Generation Error: {e}")
-        # Return empty structure on failure to prevent app crash
-        return {"skills": []}
\ No newline at end of file
+    # Parse the JSON response
+    with metrics.stage("json_parse", "extraction"):
+        result = json.loads(response.text)
+    await llm_cache.set(cache_key, result, degree_id)
+    return result
@@ -0,0 +1,325 @@
+import os
+import re
+import time
+import random
+import asyncio
+import httpx
+import metrics
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Endpoint (overridable for proxies and local stand-ins); used by the REST calls and the SDK client
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+GEMINI_API_VERSION = os.getenv("GEMINI_API_VERSION", "v1beta")
+
+# Quota: token bucket refilled at GEMINI_RPM requests/minute, holding up to GEMINI_BURST
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "10"))
+
+# Adaptive concurrency: starts at the max, halves on 429/503, grows by ~1 per window of successes
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_MIN_CONCURRENCY = int(os.getenv("GEMINI_MIN_CONCURRENCY", "1"))
+
+# Retries: full-jitter exponential backoff, never shorter than a Retry-After hint
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "30"))
+
+# Circuit breaker: open after N consecutive failures, probe again after the cooldown
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", "30"))
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+_OVERLOAD_STATUS = {429, 503}
+_RETRY_DELAY = re.compile(r'"?retryDelay"?\s*[:=]\s*"?(\d+(?:\.\d+)?)s')
+
+
+def model_url(model: str, method: str) -> str:
+    """REST URL of a model method, e.g. model_url(GEMINI_MODEL, "generateContent")."""
+    return f"{GEMINI_BASE_URL}/{GEMINI_API_VERSION}/models/{model}:{method}"
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling Gemini while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Gemini circuit breaker is open; retry in {retry_after:.0f}s")
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status of a failed call: httpx errors, google-genai APIError or an HTTPException."""
+    response = getattr(exc, "response", None)
+    for value in (getattr(response, "status_code", None), getattr(exc, "code", None),
+                  getattr(exc, "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header, or from the RetryInfo detail Gemini puts in 429 bodies."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    details = getattr(exc, "details", None)
+    text = str(details) if details is not None else ""
+    if not text and isinstance(response, httpx.Response) and response.is_closed:
+        text = response.text
+    match = _RETRY_DELAY.search(text)
+    return float(match.group(1)) if match else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = status_of(exc)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    return isinstance(exc, (asyncio.TimeoutError, httpx.TransportError))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> float:
+        """Takes one token, sleeping until one is available; returns the time waited."""
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase on success and multiplicative decrease on overload."""
+
+    def __init__(self, minimum: int, maximum: int):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed over just as we were cancelled
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        # Slots are handed to waiters directly, in FIFO order
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def increase(self):
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def decrease(self):
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, cooldown_seconds: float):
+        self.threshold = threshold
+        self.cooldown = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+
+    def before_call(self):
+        """Raises CircuitOpenError while open; after the cooldown lets a single probe through."""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + self.cooldown - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(max(remaining, 1.0))
+
+    def success(self):
+        self.state, self.failures, self._probing = "closed", 0, False
+
+    def failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state, self.opened_at, self._probing = "open", time.monotonic(), False
+
+    def neutral(self):
+        """The call ended without telling us anything about Gemini's health (e.g. a 4xx)."""
+        self._probing = False
+
+
+class GeminiGateway:
+    """
+    The single path to Gemini for every caller (REST and SDK): quota token bucket,
+    AIMD concurrency, Retry-After cooldowns, jittered retries and a circuit breaker.
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket(GEMINI_RPM / 60.0, GEMINI_BURST)
+        self.limiter = AIMDLimiter(GEMINI_MIN_CONCURRENCY, GEMINI_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_COOLDOWN_SECONDS)
+        self.cooldown_until = 0.0
+        self.counters: Dict[str, float] = {
+            "calls": 0, "attempts": 0, "successes": 0, "failures": 0, "retries": 0,
+            "rejected": 0, "throttled": 0, "timeouts": 0, "client_errors": 0,
+            "total_wait_seconds": 0.0, "max_wait_seconds": 0.0,
+        }
+
+    def _record_wait(self, waited: float):
+        self.counters["total_wait_seconds"] += waited
+        self.counters["max_wait_seconds"] = max(self.counters["max_wait_seconds"], waited)
+        if waited > 1.0:
+            print(f"Gemini gateway wait: {waited:.2f}s ({self.limiter.waiting} still waiting)")
+
+    @asynccontextmanager
+    async def admit(self, operation: str = "gemini"):
+        """
+        One attempt: waits for quota and a concurrency slot, then records how the
+        body ended. Use directly for calls that cannot be retried (streaming).
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.counters["rejected"] += 1
+            raise
+
+        queued_at = time.monotonic()
+        try:
+            cooldown = self.cooldown_until - queued_at
+            if cooldown > 0:
+                await asyncio.sleep(cooldown)
+            await self.bucket.acquire()
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.neutral()
+            raise
+        self._record_wait(time.monotonic() - queued_at)
+        self.counters["attempts"] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            metrics.GEMINI_ERRORS.inc(operation=operation, status=status_of(e) or type(e).__name__)
+            self._record_failure(e)
+            raise
+        except BaseException:
+            self.breaker.neutral()
+            raise
+        else:
+            self.counters["successes"] += 1
+            self.limiter.increase()
+            self.breaker.success()
+        finally:
+            self.limiter.release()
+            metrics.STAGE_LATENCY.observe(time.perf_counter() - started, stage="gemini", operation=operation)
+
+    def _record_failure(self, exc: Exception):
+        status = status_of(exc)
+        if isinstance(exc, asyncio.TimeoutError):
+            self.counters["timeouts"] += 1
+        if status in _OVERLOAD_STATUS:
+            self.counters["throttled"] += 1
+            self.limiter.decrease()
+            retry_after = retry_after_of(exc)
+            if retry_after:
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + retry_after)
+        if is_retryable(exc):
+            self.counters["failures"] += 1
+            self.breaker.failure()
+        else:
+            # 4xx (bad request, auth) or a parse error: Gemini itself is healthy
+            self.counters["client_errors"] += 1
+            self.breaker.neutral()
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        ceiling = min(GEMINI_BACKOFF_MAX_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+        return max(random.uniform(0, ceiling), retry_after_of(exc) or 0.0)
+
+    async def call(self, send: Callable[[], Awaitable[T]], operation: str = "gemini",
+                   max_attempts: int = None) -> T:
+        """
+        Runs `send` through the gateway, retrying throttling, 5xx, timeouts and transport
+        errors with jittered backoff. Other errors (4xx, parse errors) are raised at once.
+        """
+        self.counters["calls"] += 1
+        attempts = max_attempts or GEMINI_MAX_ATTEMPTS
+        for attempt in range(1, attempts + 1):
+            try:
+                async with self.admit(operation):
+                    return await send()
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if attempt == attempts or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                self.counters["retries"] += 1
+                metrics.GEMINI_RETRIES.inc(operation=operation, status=status_of(e) or type(e).__name__)
+                print(f"Gemini call failed (attempt {attempt}/{attempts}, status {status_of(e)}): "
+                      f"retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "waiting": self.limiter.waiting,
+            "tokens": round(self.bucket.tokens, 2),
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - time.monotonic()), 2),
+            "breaker": {"state": self.breaker.state, "consecutive_failures": self.breaker.failures,
+                        "opens": self.breaker.opens},
+        }
+
+
+gemini_gateway = GeminiGateway()
@@ -0,0 +1,38 @@
+import os
+import httpx
+from typing import AsyncGenerator
+from clients.registry import client_registry
+
+# Pool and timeout tuning for outbound LLM calls (all overridable via env)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """The pooled HTTP/2 client shared by all Gemini REST calls."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            HTTP_READ_TIMEOUT,
+            connect=HTTP_CONNECT_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+
+# Created once by the shared client registry; its pooled connections are closed on shutdown
+client_registry.register("http", _create_http_client, close=lambda client: client.aclose())
+
+
+async def get_http_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Dependency: Yields the shared HTTP client for use in endpoints."""
+    yield await client_registry.get("http")
@@ -0,0 +1,86 @@
+import time
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+ClientFactory = Callable[[], Union[Any, Awaitable[Any]]]
+ClientCloser = Callable[[Any], Optional[Awaitable[None]]]
+
+
+class ClientRegistry:
+    """
+    One instance of every outbound client (Supabase, pooled HTTP, Gemini SDK).
+
+    Modules register a factory at import time; a client is created on first use
+    (or eagerly by start() in main.lifespan), shared afterwards, and closed by close().
+    Concurrent first uses of the same client share a single creation.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, ClientFactory] = {}
+        self._closers: Dict[str, Optional[ClientCloser]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._init_ms: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+
+    def register(self, name: str, factory: ClientFactory, close: ClientCloser = None):
+        self._factories[name] = factory
+        self._closers[name] = close
+
+    async def get(self, name: str) -> Any:
+        """Returns the shared client, creating it on first use."""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            client = self._clients.get(name)
+            if client is None:
+                started = time.perf_counter()
+                try:
+                    client = self._factories[name]()
+                    if inspect.isawaitable(client):
+                        client = await client
+                except Exception:
+                    self._failures[name] = self._failures.get(name, 0) + 1
+                    raise
+                self._init_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+                self._clients[name] = client
+        return client
+
+    async def start(self, names: List[str] = None):
+        """Creates the registered clients up front; a failure is logged and retried on first use."""
+        for name in names or list(self._factories):
+            try:
+                await self.get(name)
+                print(f"✅ Client '{name}' initialized.")
+            except Exception as e:
+                print(f"❌ ERROR: Could not initialize client '{name}' (will retry on first use): {e}")
+
+    async def close(self):
+        """Closes the clients in reverse order of creation."""
+        for name in reversed(list(self._clients)):
+            client = self._clients.pop(name)
+            closer = self._closers.get(name)
+            if closer is None:
+                continue
+            try:
+                result = closer(client)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Error closing client '{name}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "initialized": name in self._clients,
+                "init_ms": self._init_ms.get(name),
+                "failures": self._failures.get(name, 0),
+            }
+            for name in self._factories
+        }
+
+
+client_registry = ClientRegistry()
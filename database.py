@@ -1,26 +1,156 @@
 import os
+import time
 from dotenv import load_dotenv
 from supabase import acreate_client, Client
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Hashable, Optional
+import singleflight
+import metrics
+from llm_cache import LRUTTLCache
+from serialization import dumps
+from shared_cache import shared_cache, SHARED_CACHE_ENABLED
+from clients.registry import client_registry
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# Global variable for the Supabase Client
-SUPABASE_CLIENT: Client = None
+# The ASYNCHRONOUS Supabase client is created once by the shared client registry
+client_registry.register("supabase", lambda: acreate_client(SUPABASE_URL, SUPABASE_KEY))
 
-async def setup_supabase_client():
-    """Initializes the global ASYNCHRONOUS Supabase client."""
-    global SUPABASE_CLIENT
-    if SUPABASE_CLIENT is None:
-        SUPABASE_CLIENT = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
-        print("✅ Supabase Async Client initialized.")
-    return SUPABASE_CLIENT
+async def setup_supabase_client() -> Client:
+    """Returns the shared Supabase client (created on first use or in main.lifespan)."""
+    return await client_registry.get("supabase")
 
 async def get_supabase_client() -> AsyncGenerator[Client, None]:
     """Dependency: Yields the client for use in endpoints."""
-    if SUPABASE_CLIENT is None:
-        await setup_supabase_client()
-    yield SUPABASE_CLIENT
\ No newline at end of file
+    yield await client_registry.get("supabase")
+
+
+# --- Read-through cache for catalog reads ---
+# Catalog data (modules, degrees, extracted skills, stored graphs) changes only through
+# this service's own writes, so entries live for a TTL and are invalidated by those writes.
+# Each worker keeps a small LRU in front of the host-wide shared cache (shared_cache.py),
+# which all workers fill and invalidate together.
+DB_CACHE_ENABLED = os.getenv("DB_CACHE_ENABLED", "true").lower() == "true"
+DB_CACHE_MAX_ENTRIES = int(os.getenv("DB_CACHE_MAX_ENTRIES", "1024"))
+# Per query shape and per worker while the shared tier holds the bulk
+DB_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("DB_CACHE_LOCAL_MAX_ENTRIES", "64"))
+
+DB_CACHE_TTLS: Dict[str, float] = {
+    "detailed_skills": float(os.getenv("DB_CACHE_TTL_DETAILED_SKILLS", "600")),
+    "module": float(os.getenv("DB_CACHE_TTL_MODULE", "3600")),
+    "degree_list": float(os.getenv("DB_CACHE_TTL_DEGREE_LIST", "300")),
+    "stored_graph": float(os.getenv("DB_CACHE_TTL_STORED_GRAPH", "600")),
+}
+
+
+_MISSING = object()
+
+
+class _QueryCache:
+    """One query shape: an LRU of results plus hit/miss counters and load latency."""
+
+    def __init__(self, name: str, ttl_seconds: float):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.entries = LRUTTLCache(DB_CACHE_LOCAL_MAX_ENTRIES if SHARED_CACHE_ENABLED else DB_CACHE_MAX_ENTRIES,
+                                   ttl_seconds)
+        # Bumped by every invalidation, so a load that raced with a write is not stored
+        self.generations: Dict[Hashable, int] = {}
+        self.epoch = 0
+        self.invalidations = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.max_load_seconds = 0.0
+
+    def drop(self, key: Optional[str], tag: Optional[int] = None):
+        """Drops one entry (every entry when key is None) from this worker's LRU."""
+        if key is None:
+            self.entries.clear()
+            self.generations.clear()
+            self.epoch += 1
+            return
+        self.entries.delete(key)
+        self.generations[key] = self.generations.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.entries.stats()
+        lookups = entries["hits"] + entries["misses"]
+        return {
+            **entries,
+            "hit_rate": round(entries["hits"] / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "avg_load_ms": round(self.load_seconds / self.loads * 1000, 2) if self.loads else None,
+            "max_load_ms": round(self.max_load_seconds * 1000, 2),
+        }
+
+
+_query_caches: Dict[str, _QueryCache] = {
+    name: _QueryCache(name, ttl) for name, ttl in DB_CACHE_TTLS.items()
+}
+for _cache in _query_caches.values():
+    shared_cache.subscribe(_cache.name, _cache.drop)
+
+
+def _cache_key(key: Hashable) -> str:
+    """Stable string form of a cache key, the same in every worker."""
+    return dumps(key).decode()
+
+
+async def cached_read(query: str, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                      decode: Callable[[Any], Any] = None) -> Any:
+    """
+    Returns the cached result of a catalog read, running `loader` on a miss.
+    Looks in this worker's LRU, then in the shared cache, then loads; results must be
+    JSON-serializable (pydantic models included), and `decode` turns the JSON read back
+    from the shared cache into what `loader` returns.
+    Concurrent misses for the same key share one load; errors are never cached.
+    Cached values are shared between callers and must not be mutated.
+    """
+    cache = _query_caches[query]
+    if not DB_CACHE_ENABLED:
+        return await loader()
+
+    await shared_cache.sync()
+    key = _cache_key(key)
+    value = cache.entries.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    async def load():
+        generation = (cache.epoch, cache.generations.get(key, 0))
+        entry = await shared_cache.get(query, key)
+        if entry is not None:
+            result = entry[0] if decode is None else decode(entry[0])
+            if (cache.epoch, cache.generations.get(key, 0)) == generation:
+                cache.entries.set(key, result)
+            return result
+
+        token = await shared_cache.token()
+        started = time.perf_counter()
+        with metrics.stage("supabase", query):
+            result = await loader()
+        elapsed = time.perf_counter() - started
+        cache.loads += 1
+        cache.load_seconds += elapsed
+        cache.max_load_seconds = max(cache.max_load_seconds, elapsed)
+        if (cache.epoch, cache.generations.get(key, 0)) == generation:
+            cache.entries.set(key, result)
+            await shared_cache.set(query, key, result, cache.ttl_seconds, token=token)
+        return result
+
+    return await singleflight.group(f"db_{query}").do(key, load)
+
+
+async def invalidate(query: str, key: Hashable = None):
+    """Drops one cached result (or every result of the query shape when key is None) in every worker."""
+    cache = _query_caches[query]
+    cache.invalidations += 1
+    key = None if key is None else _cache_key(key)
+    cache.drop(key)
+    await shared_cache.invalidate(query, key)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _query_caches.items()}
@@ -0,0 +1,120 @@
+import os
+import numpy as np
+from scipy import sparse
+from typing import Any, Dict, List
+from graph_model import CompactGraph
+
+# Local centrality analytics over the module-skill graph (replaces LLM-inferred rankings)
+PAGERANK_DAMPING = float(os.getenv("PAGERANK_DAMPING", "0.85"))
+PAGERANK_MAX_ITER = int(os.getenv("PAGERANK_MAX_ITER", "100"))
+PAGERANK_TOL = float(os.getenv("PAGERANK_TOL", "1e-8"))
+BETWEENNESS_BATCH = int(os.getenv("BETWEENNESS_BATCH", "256"))
+
+
+def _adjacency(graph: CompactGraph):
+    """Symmetric sparse adjacency straight from the link array; duplicate links become edge weights."""
+    links = graph.links
+    links = links[links[:, 0] != links[:, 1]]
+    src, dst = links[:, 0], links[:, 1]
+    n = len(graph)
+    weights = sparse.coo_matrix((np.ones(len(src)), (src, dst)), shape=(n, n)).tocsr()
+    weights = (weights + weights.T).tocsr()
+    binary = weights.copy()
+    binary.data[:] = 1.0
+    return weights, binary
+
+
+def _pagerank(weights: sparse.csr_matrix) -> np.ndarray:
+    n = weights.shape[0]
+    out_strength = np.asarray(weights.sum(axis=1)).ravel()
+    dangling = out_strength == 0
+    inv = np.divide(1.0, out_strength, out=np.zeros(n), where=~dangling)
+    transition = sparse.diags(inv) @ weights  # row-stochastic (except dangling rows)
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITER):
+        updated = PAGERANK_DAMPING * (transition.T @ rank + rank[dangling].sum() / n) + (1 - PAGERANK_DAMPING) / n
+        if np.abs(updated - rank).sum() < PAGERANK_TOL:
+            return updated
+        rank = updated
+    return rank
+
+
+def _betweenness(binary: sparse.csr_matrix) -> np.ndarray:
+    """
+    Brandes betweenness in linear-algebra form: BFS levels and dependency
+    back-propagation are sparse-matrix x dense-block products over batches of sources.
+    """
+    n = binary.shape[0]
+    centrality = np.zeros(n)
+    for start in range(0, n, BETWEENNESS_BATCH):
+        sources = np.arange(start, min(start + BETWEENNESS_BATCH, n))
+        cols = np.arange(len(sources))
+
+        sigma = np.zeros((n, len(sources)))
+        sigma[sources, cols] = 1.0
+        visited = sigma > 0
+        levels = [sigma.copy()]
+        frontier = sigma
+
+        # Forward sweep: shortest-path counts level by level
+        while True:
+            reached = binary @ frontier
+            reached[visited] = 0.0
+            if not reached.any():
+                break
+            visited |= reached > 0
+            sigma += reached
+            levels.append(reached)
+            frontier = reached
+
+        # Backward sweep: accumulate dependencies from the deepest level up
+        delta = np.zeros_like(sigma)
+        for depth in range(len(levels) - 1, 0, -1):
+            on_level = levels[depth] > 0
+            share = np.zeros_like(sigma)
+            share[on_level] = (1.0 + delta[on_level]) / sigma[on_level]
+            contribution = binary @ share
+            parents = levels[depth - 1] > 0
+            delta[parents] += (sigma * contribution)[parents]
+
+        delta[sources, cols] = 0.0
+        centrality += delta.sum(axis=1)
+
+    centrality /= 2.0  # undirected: every pair was counted from both ends
+    if n > 2:
+        centrality /= (n - 1) * (n - 2) / 2.0
+    return centrality
+
+
+def compute_centrality(graph: CompactGraph, group: str = "Skill", top_k: int = 10) -> Dict[str, Any]:
+    """
+    Degree, weighted degree, PageRank and betweenness for every node, returning the
+    top_k nodes of `group` ranked by weighted degree, then PageRank, then betweenness.
+    """
+    if len(graph) == 0:
+        return {"nodes_count": 0, "ranked": []}
+    weights, binary = _adjacency(graph)
+
+    degree = np.asarray(binary.sum(axis=1)).ravel()
+    weighted_degree = np.asarray(weights.sum(axis=1)).ravel()
+    pagerank = _pagerank(weights)
+    betweenness = _betweenness(binary)
+
+    candidates = np.arange(len(graph)) if group is None else np.flatnonzero(graph.group_mask(group))
+    if len(candidates) == 0:
+        return {"nodes_count": len(graph), "ranked": []}
+
+    # np.lexsort sorts by the last key first
+    order = np.lexsort((-betweenness[candidates], -pagerank[candidates], -weighted_degree[candidates]))
+    ranked: List[Dict[str, Any]] = []
+    for i in candidates[order][:top_k].tolist():
+        ranked.append({
+            "id": graph.ids[i],
+            "label": graph.labels[i],
+            "degree": int(degree[i]),
+            "weighted_degree": float(weighted_degree[i]),
+            "pagerank": round(float(pagerank[i]), 6),
+            "betweenness": round(float(betweenness[i]), 6),
+        })
+    return {"nodes_count": len(graph), "ranked": ranked}
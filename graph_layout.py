@@ -0,0 +1,146 @@
+import os
+import numpy as np
+from typing import Any, Dict, Optional
+from graph_model import CompactGraph
+
+# Force-directed layout computed server-side so clients can render without simulating
+LAYOUT_ITERATIONS = int(os.getenv("GRAPH_LAYOUT_ITERATIONS", "300"))
+LAYOUT_WARM_ITERATIONS = int(os.getenv("GRAPH_LAYOUT_WARM_ITERATIONS", "60"))
+# Node-iterations per layout: large graphs get fewer iterations than LAYOUT_ITERATIONS
+LAYOUT_ITERATION_BUDGET = int(os.getenv("GRAPH_LAYOUT_ITERATION_BUDGET", "150000"))
+LAYOUT_MAX_NODES = int(os.getenv("GRAPH_LAYOUT_MAX_NODES", "1500"))
+LAYOUT_LINK_DISTANCE = float(os.getenv("GRAPH_LAYOUT_LINK_DISTANCE", "30"))
+
+
+def _initial_positions(ids, edges, previous: Dict[str, tuple], rng: np.random.Generator,
+                       spread: float) -> np.ndarray:
+    """Previous positions where known; new nodes start next to already-placed neighbours."""
+    n = len(ids)
+    pos = np.empty((n, 2))
+    placed = np.zeros(n, dtype=bool)
+    for i, node_id in enumerate(ids):
+        if node_id in previous:
+            pos[i] = previous[node_id]
+            placed[i] = True
+
+    if not placed.any():
+        return rng.uniform(-spread, spread, size=(n, 2))
+
+    # Average of placed neighbours (+ jitter) for new nodes; random if isolated
+    sums = np.zeros((n, 2))
+    counts = np.zeros(n)
+    if len(edges):
+        for a, b in ((edges[:, 0], edges[:, 1]), (edges[:, 1], edges[:, 0])):
+            mask = placed[b] & ~placed[a]
+            np.add.at(sums, a[mask], pos[b[mask]])
+            np.add.at(counts, a[mask], 1)
+
+    new = ~placed
+    has_neighbour = new & (counts > 0)
+    jitter = rng.normal(0, LAYOUT_LINK_DISTANCE / 3, size=(n, 2))
+    pos[has_neighbour] = sums[has_neighbour] / counts[has_neighbour, None] + jitter[has_neighbour]
+    isolated = new & (counts == 0)
+    pos[isolated] = rng.uniform(-spread, spread, size=(int(isolated.sum()), 2))
+    return pos
+
+
+def _repulsion(pos: np.ndarray, k: float) -> np.ndarray:
+    """
+    Grid-approximated Fruchterman-Reingold repulsion: nodes are binned into 2k cells
+    and only pairs in the same or adjacent cells (closer than 2k) push each other
+    apart, so the cost grows with the number of nearby pairs instead of n^2.
+    """
+    n = len(pos)
+    cell = 2 * k
+    cells = np.floor(pos / cell).astype(np.int64)
+    cells -= cells.min(axis=0)
+    width = int(cells[:, 0].max()) + 3
+    keys = (cells[:, 1] + 1) * width + cells[:, 0] + 1
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    disp = np.zeros((n, 2))
+    for offset in (-width - 1, -width, -width + 1, -1, 0, 1, width - 1, width, width + 1):
+        start = np.searchsorted(sorted_keys, keys + offset, side='left')
+        counts = np.searchsorted(sorted_keys, keys + offset, side='right') - start
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        i = np.repeat(np.arange(n), counts)
+        j = order[np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(total)]
+        d = pos[i] - pos[j]
+        dist2 = np.maximum(np.einsum('ij,ij->i', d, d), 0.01)
+        # k^2 / d along the separation vector, cut off at 2k (and for the node itself)
+        force = np.where((i != j) & (dist2 < cell * cell), (k * k) / dist2, 0.0)
+        disp[:, 0] += np.bincount(i, weights=d[:, 0] * force, minlength=n)
+        disp[:, 1] += np.bincount(i, weights=d[:, 1] * force, minlength=n)
+    return disp
+
+
+def compute_layout(graph: CompactGraph, seed: int,
+                   previous: Optional[Dict[str, Any]] = None, relayout: bool = True) -> CompactGraph:
+    """
+    Sets x/y coordinates for every node using a vectorized Fruchterman-Reingold layout
+    (grid-approximated repulsion, iterations capped by LAYOUT_ITERATION_BUDGET).
+    Deterministic for a given seed; when a previous graph (stored graph_json) is
+    supplied its positions are reused and only a short warm-start run is done.
+    With relayout=False, previously placed nodes keep their positions and only new
+    nodes are placed next to their neighbours, without running the simulation.
+    """
+    n = len(graph)
+    if n == 0:
+        return graph
+
+    ids = graph.ids
+    links = graph.links
+    edges = links[links[:, 0] != links[:, 1], :2].astype(np.int64)
+
+    previous_positions = {
+        node['id']: (node['x'], node['y'])
+        for node in (previous or {}).get('nodes', [])
+        if 'x' in node and 'y' in node
+    }
+    warm = bool(previous_positions) and any(node_id in previous_positions for node_id in ids)
+    if n > LAYOUT_MAX_NODES and (relayout or not warm):
+        print(f"Graph layout skipped: {n} nodes exceeds GRAPH_LAYOUT_MAX_NODES={LAYOUT_MAX_NODES}")
+        return graph
+
+    rng = np.random.default_rng(seed)
+    k = LAYOUT_LINK_DISTANCE
+    spread = k * np.sqrt(n)
+    pos = _initial_positions(ids, edges, previous_positions, rng, spread)
+
+    if warm and not relayout:
+        graph.set_positions(np.round(pos, 2))
+        graph.meta['layout'] = {"seed": seed, "iterations": 0, "warm_start": True}
+        return graph
+
+    iterations = LAYOUT_WARM_ITERATIONS if warm else LAYOUT_ITERATIONS
+    iterations = max(1, min(iterations, LAYOUT_ITERATION_BUDGET // n))
+    temperature = k if warm else spread / 2
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        # Repulsion between nearby pairs
+        disp = _repulsion(pos, k)
+
+        # Attraction along links: d^2 / k
+        if len(edges):
+            d = pos[edges[:, 0]] - pos[edges[:, 1]]
+            length = np.maximum(np.sqrt(np.einsum('ij,ij->i', d, d)), 0.01)
+            pull = d * (length / k)[:, None]
+            np.add.at(disp, edges[:, 0], -pull)
+            np.add.at(disp, edges[:, 1], pull)
+
+        # Weak gravity keeps disconnected components on screen
+        disp -= pos * 0.01
+
+        # Move each node at most `temperature`, then cool down
+        magnitude = np.maximum(np.sqrt(np.einsum('ij,ij->i', disp, disp)), 1e-9)
+        pos += disp * (np.minimum(magnitude, temperature) / magnitude)[:, None]
+        temperature = max(temperature - cooling, 0.5)
+
+    pos -= pos.mean(axis=0)
+    graph.set_positions(np.round(pos, 2))
+    graph.meta['layout'] = {"seed": seed, "iterations": iterations, "warm_start": warm}
+    return graph
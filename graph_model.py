@@ -0,0 +1,197 @@
+import sys
+import numpy as np
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+
+class _Column:
+    """Growable NumPy column: amortized O(1) appends, `view()` returns the filled prefix without copying."""
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, width: int = 0, fill=0):
+        shape = (16, width) if width else (16,)
+        self.data = np.full(shape, fill, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            grown = np.empty((len(self.data) * 2,) + self.data.shape[1:], dtype=self.data.dtype)
+            grown[:self.size] = self.data
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+    def replace(self, values: np.ndarray):
+        self.data = np.array(values, dtype=self.data.dtype, copy=True)
+        self.size = len(self.data)
+        if self.size == 0:
+            self.data = np.empty((16,) + self.data.shape[1:], dtype=self.data.dtype)
+
+
+class CompactGraph:
+    """
+    Array-backed node/link graph used for building, updating and analysing degree graphs.
+
+    Node ids ("deg_1", "mod_7", "skill_python") are interned once and addressed by
+    position; per-node attributes are parallel columns (group codes, val and x/y in
+    NumPy arrays); links are a single (E, 3) int32 array of source, target and link
+    group code. Group names are stored once per graph instead of once per element.
+    to_json() produces the stored/wire format ({"nodes": [...], "links": [...], ...meta}).
+    """
+    __slots__ = ("ids", "labels", "categories", "meta", "_index", "_group_names", "_group_codes",
+                 "_groups", "_vals", "_positions", "_links")
+
+    def __init__(self):
+        self.ids: List[Hashable] = []
+        self.labels: List[str] = []
+        self.categories: List[Optional[str]] = []
+        self.meta: Dict[str, Any] = {}            # top-level keys besides nodes/links (version, layout)
+        self._index: Dict[Hashable, int] = {}
+        self._group_names: List[str] = []
+        self._group_codes: Dict[str, int] = {}
+        self._groups = _Column(np.int16)
+        self._vals = _Column(np.float64, fill=np.nan)
+        self._positions = _Column(np.float64, width=2, fill=np.nan)
+        self._links = _Column(np.int32, width=3)
+
+    # --- Building ---
+
+    def group_code(self, name: str) -> int:
+        code = self._group_codes.get(name)
+        if code is None:
+            code = self._group_codes[name] = len(self._group_names)
+            self._group_names.append(name)
+        return code
+
+    def add_node(self, node_id: Hashable, label: str, group: str, category: str = None,
+                 val: float = None, x: float = None, y: float = None) -> int:
+        """Position of the node, adding it first if the id is new."""
+        i = self._index.get(node_id)
+        if i is not None:
+            return i
+        if isinstance(node_id, str):
+            node_id = sys.intern(node_id)
+        i = self._index[node_id] = len(self.ids)
+        self.ids.append(node_id)
+        self.labels.append(label)
+        self.categories.append(category)
+        self._groups.append(self.group_code(group))
+        self._vals.append(np.nan if val is None else val)
+        self._positions.append((np.nan, np.nan) if x is None or y is None else (x, y))
+        return i
+
+    def add_link(self, source: int, target: int, group: str):
+        self._links.append((source, target, self.group_code(group)))
+
+    @classmethod
+    def from_json(cls, graph_data: Dict[str, Any]) -> "CompactGraph":
+        """Builds the compact form of a stored graph_json; links to unknown nodes are dropped."""
+        graph = cls()
+        for node in graph_data.get('nodes', []):
+            graph.add_node(node['id'], node.get('label') or str(node['id']), node.get('group') or "",
+                           node.get('category'), node.get('val'), node.get('x'), node.get('y'))
+        index = graph._index
+        for link in graph_data.get('links', []):
+            source, target = index.get(link['source']), index.get(link['target'])
+            if source is not None and target is not None:
+                graph.add_link(source, target, link.get('group') or "")
+        graph.meta = {k: v for k, v in graph_data.items() if k not in ('nodes', 'links')}
+        return graph
+
+    # --- Columns (views, not copies) ---
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index(self, node_id: Hashable) -> Optional[int]:
+        return self._index.get(node_id)
+
+    @property
+    def groups(self) -> np.ndarray:
+        return self._groups.view()
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions.view()
+
+    @property
+    def links(self) -> np.ndarray:
+        """(E, 3) int32: source position, target position, link group code."""
+        return self._links.view()
+
+    def group_name(self, code: int) -> str:
+        return self._group_names[code]
+
+    def group_mask(self, name: str) -> np.ndarray:
+        """Boolean mask of the nodes in a node group."""
+        code = self._group_codes.get(name)
+        return self.groups == code if code is not None else np.zeros(len(self), dtype=bool)
+
+    def link_mask(self, group: str) -> np.ndarray:
+        """Boolean mask of the links in a link group."""
+        code = self._group_codes.get(group)
+        return self.links[:, 2] == code if code is not None else np.zeros(len(self.links), dtype=bool)
+
+    def set_positions(self, positions: np.ndarray):
+        self._positions.data[:len(self)] = positions
+
+    def link_keys(self) -> Iterable[tuple]:
+        """(source id, target id, group name) per link, for multiset comparisons."""
+        ids, names = self.ids, self._group_names
+        return ((ids[s], ids[t], names[g]) for s, t, g in self.links.tolist())
+
+    # --- Editing ---
+
+    def drop_links(self, mask: np.ndarray):
+        self._links.replace(self.links[~mask])
+
+    def drop_nodes(self, mask: np.ndarray):
+        """Removes the masked nodes and every link touching them; remaining positions are renumbered."""
+        if not mask.any():
+            return
+        keep = ~mask
+        remap = np.cumsum(keep) - 1
+        links = self.links
+        links = links[keep[links[:, 0]] & keep[links[:, 1]]]
+        self._links.replace(np.column_stack((remap[links[:, 0]], remap[links[:, 1]], links[:, 2])))
+
+        kept = np.flatnonzero(keep).tolist()
+        self.ids = [self.ids[i] for i in kept]
+        self.labels = [self.labels[i] for i in kept]
+        self.categories = [self.categories[i] for i in kept]
+        self._index = {node_id: i for i, node_id in enumerate(self.ids)}
+        for column in (self._groups, self._vals, self._positions):
+            column.replace(column.view()[keep])
+
+    # --- Wire format ---
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        The stored/wire format. Id, label and group strings are shared with the compact
+        graph (not copied), and numeric columns are converted in one pass each.
+        """
+        names = self._group_names
+        vals = self._vals.view()
+        has_val = ~np.isnan(vals)
+        positions = self.positions
+        has_position = ~np.isnan(positions).any(axis=1)
+
+        nodes = []
+        for node_id, label, category, group, val, val_set, (x, y), placed in zip(
+                self.ids, self.labels, self.categories, self.groups.tolist(), vals.tolist(),
+                has_val.tolist(), positions.tolist(), has_position.tolist()):
+            node = {"id": node_id, "label": label, "group": names[group]}
+            if category is not None:
+                node["category"] = category
+            if val_set:
+                node["val"] = int(val) if val.is_integer() else val
+            if placed:
+                node["x"] = x
+                node["y"] = y
+            nodes.append(node)
+
+        ids = self.ids
+        links = [{"source": ids[s], "target": ids[t], "group": names[g]} for s, t, g in self.links.tolist()]
+        return {"nodes": nodes, "links": links, **self.meta}
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from fastapi import HTTPException
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Durable in-process job queue for slow LLM/DB work (module processing, graph rebuilds)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# A running job belongs to the process holding its lease; the lease is renewed every
+# third of this while the handler runs, and only an expired lease is taken over
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_WAIT_POLL_SECONDS = 0.1
+
+PENDING, RUNNING, SUCCEEDED, FAILED = "pending", "running", "succeeded", "failed"
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class _JobStore:
+    """SQLite persistence for jobs. Calls are short and run in a worker thread."""
+
+    def __init__(self, path: str, owner: str):
+        self.path = path
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, dedup_key TEXT NOT NULL,"
+                " payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+                " result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL,"
+                " owner TEXT, lease_until REAL)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs(kind, dedup_key, status)")
+        return self._conn
+
+    def submit(self, kind: str, dedup_key: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Only a pending job is deduplicated: one that is already running may have
+                # read older data, so a new request queues a fresh run behind it
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE kind = ? AND dedup_key = ? AND status = ?"
+                    " ORDER BY created_at LIMIT 1",
+                    (kind, dedup_key, PENDING),
+                ).fetchone()
+                if row is not None:
+                    conn.execute("COMMIT")
+                    return _row_to_job(row), False
+
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, dedup_key, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, dedup_key, json.dumps(payload), PENDING, time.time()),
+                )
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                conn.execute("COMMIT")
+                return _row_to_job(row), True
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, max_attempts: int, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Atomically moves the oldest pending job to running under this process's lease."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(conn, max_attempts)
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (PENDING,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, owner = ?, lease_until = ?"
+                    " WHERE id = ?",
+                    (RUNNING, now, self.owner, now + lease_seconds, row["id"]),
+                )
+                claimed = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                conn.execute("COMMIT")
+                return _row_to_job(claimed)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def renew(self, job_id: str, lease_seconds: float) -> bool:
+        """Extends the lease on a job this process is running; False once another process has taken it over."""
+        with self._lock:
+            return self._connect().execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND owner = ?",
+                (time.time() + lease_seconds, job_id, RUNNING, self.owner),
+            ).rowcount > 0
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Any = None):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND status = ? AND owner = ?",
+                (status, json.dumps(result) if result is not None else None,
+                 json.dumps(error) if error is not None else None, time.time(), job_id, RUNNING, self.owner),
+            )
+
+    def requeue_interrupted(self, max_attempts: int) -> int:
+        """Crash-resume: jobs whose owner stopped renewing their lease go back to pending (or fail if exhausted)."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                requeued = self._requeue_expired(conn, max_attempts)
+                conn.execute("COMMIT")
+                return requeued
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _requeue_expired(conn: sqlite3.Connection, max_attempts: int) -> int:
+        """Runs inside the caller's transaction. Jobs still under a live lease are left to their owner."""
+        now = time.time()
+        expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        conn.execute(
+            f"UPDATE jobs SET status = ?, finished_at = ?, error = ?, lease_until = NULL WHERE {expired} AND attempts >= ?",
+            (FAILED, now, json.dumps({"detail": "Interrupted too many times"}), RUNNING, now, max_attempts),
+        )
+        return conn.execute(
+            f"UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_until = NULL WHERE {expired}",
+            (PENDING, RUNNING, now),
+        ).rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return _row_to_job(row) if row is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            return {row[0]: row[1] for row in rows}
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "payload": json.loads(row["payload"]),
+        "attempts": row["attempts"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": json.loads(row["error"]) if row["error"] else None,
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+    }
+
+
+class JobQueue:
+    """
+    Worker pool over the durable store. Handlers are registered per job kind;
+    an identical pending job (same kind and dedup key) is returned instead of
+    being queued twice. Several processes can share one store: each running job
+    carries its owner's lease, and only jobs whose lease expired are requeued.
+    """
+
+    def __init__(self, path: str, workers: int):
+        self.store = _JobStore(path, f"{os.getpid()}:{uuid.uuid4().hex[:8]}")
+        self.worker_count = workers
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def start(self):
+        if self._workers:
+            return
+        resumed = await asyncio.to_thread(self.store.requeue_interrupted, JOB_MAX_ATTEMPTS)
+        if resumed:
+            print(f"♻️ Job queue resumed {resumed} interrupted job(s).")
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work(i)) for i in range(self.worker_count)]
+        print(f"✅ Job queue started with {self.worker_count} worker(s).")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any], dedup_key: str = None) -> Tuple[Dict[str, Any], bool]:
+        """Queues a job; returns (job, created). created is False when an identical job was already queued."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        key = dedup_key if dedup_key is not None else json.dumps(payload, sort_keys=True)
+        job, created = await asyncio.to_thread(self.store.submit, kind, key, payload)
+        if created and self._wakeup is not None:
+            self._wakeup.set()
+        return job, created
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Polls a job until it finishes or `timeout` seconds pass, and returns its latest state."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job["status"] in (SUCCEEDED, FAILED) or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(JOB_WAIT_POLL_SECONDS)
+
+    async def stats(self) -> Dict[str, int]:
+        return await asyncio.to_thread(self.store.counts)
+
+    async def _work(self, worker_id: int):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS)
+            except Exception as e:
+                print(f"Job queue claim error (worker {worker_id}): {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except Exception as e:
+                print(f"Job queue worker {worker_id} error on job {job['id']}: {e}")
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(self.store.renew, job_id, JOB_LEASE_SECONDS):
+                    print(f"Job {job_id} lease lost to another process.")
+                    return
+            except Exception as e:
+                print(f"Job queue lease renewal error ({job_id}): {e}")
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job["kind"])
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind '{job['kind']}'")
+            result = await handler(job["payload"])
+            status, error = SUCCEEDED, None
+        except HTTPException as e:
+            result, status, error = None, FAILED, {"status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            result, status, error = None, FAILED, {"status_code": 500, "detail": str(e)}
+        finally:
+            heartbeat.cancel()
+        try:
+            await asyncio.to_thread(self.store.finish, job["id"], status, result, error)
+        except (TypeError, ValueError) as e:
+            # The handler's result is not JSON serializable: record the job as failed instead
+            print(f"Job {job['id']} ({job['kind']}) result could not be stored: {e}")
+            try:
+                await asyncio.to_thread(self.store.finish, job["id"], FAILED, None,
+                                        {"status_code": 500, "detail": f"Job result is not JSON serializable: {e}"})
+            except Exception as e:
+                print(f"Job {job['id']} could not be marked failed: {e}")
+        except Exception as e:
+            # e.g. 'database is locked': the lease expires and the job is requeued
+            print(f"Job {job['id']} ({job['kind']}) could not be recorded as {status}: {e}")
+
+
+job_queue = JobQueue(JOB_QUEUE_PATH, JOB_WORKERS)
+
+
+def job_accepted(job: Dict[str, Any], created: bool) -> Dict[str, Any]:
+    """Body returned with 202 Accepted when a job is submitted."""
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "deduplicated": not created,
+        "status_url": f"/api/jobs/{job['id']}",
+    }
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from shared_cache import SharedCache, SHARED_CACHE_ENABLED
+
+# Tier 1: in-memory LRU; Tier 2 (when SHARED_CACHE_ENABLED): local SQLite file that survives
+# restarts and is shared by every worker on the host (a SharedCache with its own byte budget)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+# Memory tier size per worker in a multi-worker deployment, where the disk tier holds the bulk
+LLM_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("LLM_CACHE_LOCAL_MAX_ENTRIES", "32"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_DISK_TTL_SECONDS = float(os.getenv("LLM_CACHE_DISK_TTL_SECONDS", "604800"))
+LLM_CACHE_DISK_MAX_BYTES = int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+
+
+def make_key(model: str, system_prompt: str, user_query: str, schema: Any = None) -> str:
+    """Content address of an LLM call: identical inputs always hash to the same key."""
+    material = json.dumps(
+        {"model": model, "system": system_prompt, "query": user_query, "schema": schema},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LRUTTLCache:
+    """Small ordered-dict LRU with a per-entry TTL and eviction counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl_seconds: float = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key) -> bool:
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class LLMCache:
+    """
+    Two-tier cache for LLM results. Keys come from make_key; entries can be
+    tagged with a degree_id so everything derived from a degree can be dropped at once
+    (in every worker: the disk tier's invalidations reach the other workers' memory tiers).
+    """
+
+    def __init__(self):
+        self.memory = LRUTTLCache(LLM_CACHE_LOCAL_MAX_ENTRIES if SHARED_CACHE_ENABLED else LLM_CACHE_MAX_ENTRIES,
+                                  LLM_CACHE_TTL_SECONDS)
+        self.disk = SharedCache(LLM_CACHE_PATH, LLM_CACHE_DISK_MAX_BYTES, LLM_CACHE_ENABLED and SHARED_CACHE_ENABLED)
+        self.disk.subscribe("llm", self._forget)
+        self._keys_by_degree: Dict[int, set] = {}
+        self.disk_hits = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not LLM_CACHE_ENABLED:
+            return None
+        await self.disk.sync()
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        entry = await self.disk.get("llm", key)
+        if entry is None:
+            return None
+        self.disk_hits += 1
+        value, degree_id = entry
+        self._remember(key, value, degree_id)
+        return value
+
+    def _remember(self, key: str, value: Any, degree_id: Optional[int]):
+        self.memory.set(key, value)
+        if degree_id is not None:
+            self._keys_by_degree.setdefault(degree_id, set()).add(key)
+
+    def _forget(self, key: Optional[str], degree_id: Optional[int]):
+        """Drops memory entries another worker invalidated (everything when neither is given)."""
+        if degree_id is not None:
+            for tagged in self._keys_by_degree.pop(degree_id, set()):
+                self.memory.delete(tagged)
+        elif key is not None:
+            self.memory.delete(key)
+        else:
+            self.memory.clear()
+            self._keys_by_degree.clear()
+
+    async def set(self, key: str, value: Any, degree_id: Optional[int] = None):
+        if not LLM_CACHE_ENABLED:
+            return
+        self._remember(key, value, degree_id)
+        await self.disk.set("llm", key, value, LLM_CACHE_DISK_TTL_SECONDS, tag=degree_id)
+
+    async def invalidate_degree(self, degree_id: int) -> int:
+        """
+        Drops every cached result tagged with degree_id from both tiers, in every worker.
+        Returns the number of disk entries removed: the disk tier holds every result,
+        the memory tier only a subset of them (or the memory count when the disk tier is off).
+        """
+        removed = sum(self.memory.delete(key) for key in self._keys_by_degree.pop(degree_id, set()))
+        if not self.disk.enabled:
+            return removed
+        return await self.disk.invalidate("llm", tag=degree_id)
+
+    def stats(self) -> Dict[str, int]:
+        memory = self.memory.stats()
+        return {
+            "memory_entries": memory["entries"],
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": memory["misses"] - self.disk_hits,
+            "evictions": memory["evictions"],
+            "expirations": memory["expirations"],
+            "disk_errors": self.disk.errors,
+            "disk_bytes": self.disk.bytes,
+            "disk_evictions": self.disk.evictions,
+        }
+
+
+llm_cache = LLMCache()
@@ -1,55 +1,72 @@
-import os
+import time
+import asyncio
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from supabase import acreate_client, Client
-from google import genai
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from clients.registry import client_registry
+import singleflight
+import metrics
+from serialization import FastJSONResponse
+from llm_cache import llm_cache
+from shared_cache import shared_cache
+import database
+import warmup
+from clients.gemini_gateway import gemini_gateway
+from job_queue import job_queue
+from prompt_builder import PROMPT_STATS
+from skill_registry import skill_registry
 from routers import modules
 from routers import analysis_endpoints
 from routers import degrees as degree_router
 from routers import grapgh
+from routers import jobs
+from routers import similarity
+from routers import knowledge_graph
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
-SUPABASE_CLIENT: Client = None
-GEMINI_CLIENT = None
-
 ##uvicorn main:app --reload
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global SUPABASE_CLIENT, GEMINI_CLIENT
-
     print("--- 🚀 Application Startup Initiating ---")
 
-    # 1. Supabase Client Setup (Asynchronous)
+    # 1. Outbound clients (Supabase, pooled HTTP/2 for Gemini REST, Gemini SDK), created once
+    await client_registry.start()
+
+    # 2. Background job workers (resumes jobs interrupted by a previous crash)
     try:
-        SUPABASE_CLIENT = acreate_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
-        print("✅ Supabase Client initialized.")
+        await job_queue.start()
     except Exception as e:
-        print(f"❌ ERROR: Could not initialize Supabase Client: {e}")
-        SUPABASE_CLIENT = None
+        print(f"❌ ERROR: Could not start job queue: {e}")
 
+    # 3. Degree catalog typeahead index (refreshed in the background) and the skill registry's view
+    await degree_router.degree_index.start()
+    await skill_registry.refresh(force=True)
 
-    # 3. Gemini Client Setup
-    try:
-        GEMINI_CLIENT = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-        print("✅ Gemini Client initialized.")
-    except Exception as e:
-        print(f"❌ ERROR: Could not initialize Gemini Client: {e}")
-        GEMINI_CLIENT = None
+    # 4. Optional warm-up: open pools and preload the most-requested degrees
+    if warmup.WARMUP_ENABLED:
+        await warmup.run_warm_up()
 
     print("--- 🟢 Application Startup Complete ---")
 
     yield  # Application continues running
 
     # --- Shutdown Code ---
-    # Supabase and Gemini clients usually don't require an explicit close
+    await job_queue.stop()
+    await degree_router.degree_index.stop()
+    try:
+        await asyncio.to_thread(warmup.degree_popularity.save)
+    except OSError as e:
+        print(f"Could not save degree popularity: {e}")
+    await client_registry.close()
     print("--- 🔴 Application Shutdown Complete ---")
 
-# Pass the lifespan function to the FastAPI app constructor
-app = FastAPI(title="Skillpath", version="1.0.0", lifespan=lifespan)
+
+# Pass the lifespan function to the FastAPI app constructor (orjson is the default encoder)
+app = FastAPI(title="Skillpath", version="1.0.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # --- Middleware and Router Setup (Unchanged) ---
 app.add_middleware(
@@ -58,12 +75,81 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cross-origin frontends can only read response headers listed here (degree list pagination)
+    expose_headers=["X-Next-Cursor"],
 )
 
+app.include_router(degree_router.router)
 app.include_router(modules.router)
+app.include_router(modules.degree_router)
 app.include_router(analysis_endpoints.router)
 app.include_router(grapgh.router)
+app.include_router(jobs.router)
+app.include_router(similarity.router)
+app.include_router(knowledge_graph.router)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-endpoint request counts and latency (time to response headers), labelled by route template."""
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - started, route=path, method=request.method)
+        metrics.HTTP_REQUESTS.inc(route=path, method=request.method, status=status_code)
+        # Degree request counts decide what the startup warm-up preloads
+        degree_id = request.scope.get("path_params", {}).get("degree_id")
+        if degree_id is not None and status_code < 400:
+            warmup.degree_popularity.record(int(degree_id))
+
+
+# Existing runtime stats, exported as gauges on every /metrics scrape
+metrics.register_stats("llm_cache", llm_cache.stats)
+metrics.register_stats("db_cache", database.cache_stats, label="query")
+metrics.register_stats("shared_cache", shared_cache.stats)
+metrics.register_stats("singleflight", singleflight.stats, label="group")
+metrics.register_stats("gemini_gateway", gemini_gateway.stats)
+metrics.register_stats("prompt_tokens", lambda: PROMPT_STATS, label="call_site")
+metrics.register_stats("skill_registry", skill_registry.stats)
+metrics.register_stats("similarity_index", similarity.similarity_index.stats)
+metrics.register_stats("knowledge_graph", knowledge_graph.knowledge_graph.stats)
+metrics.register_stats("degree_index", degree_router.degree_index.stats)
+metrics.register_stats("clients", client_registry.stats, label="client")
+
+
 @app.get("/")
 def read_root():
     """Simple health check endpoint."""
     return {"status": "ok", "message": "Skill Mapper API is running."}
+
+
+@app.get("/stats")
+async def read_stats():
+    """Runtime counters: LLM cache, prompt sizes, Gemini gateway, request coalescing and jobs."""
+    return {
+        "llm_cache": llm_cache.stats(),
+        "db_cache": database.cache_stats(),
+        "shared_cache": shared_cache.stats(),
+        "prompt_tokens": PROMPT_STATS,
+        "gemini_gateway": gemini_gateway.stats(),
+        "singleflight": singleflight.stats(),
+        "jobs": await job_queue.stats(),
+        "skill_registry": skill_registry.stats(),
+        "similarity_index": similarity.similarity_index.stats(),
+        "knowledge_graph": knowledge_graph.knowledge_graph.stats(),
+        "degree_index": degree_router.degree_index.stats(),
+        "clients": client_registry.stats(),
+        "warmup": warmup.WARMUP_STATS,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """Prometheus text exposition: request and stage latency histograms, token and retry counters, cache gauges."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,177 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Prometheus text-format metrics without a client library: counters, histograms
+# and scrape-time collectors that export the existing stats() dictionaries.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series: Dict[LabelKey, List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', repr(bound)),))} {int(count)}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {int(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {int(series[-2])}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-1])}")
+        return lines
+
+
+_METRICS: List[Any] = []
+_COLLECTORS: List[Tuple[str, Callable[[], Dict[str, Any]], Optional[str]]] = []
+
+
+def counter(name: str, help_text: str) -> Counter:
+    metric = Counter(name, help_text)
+    _METRICS.append(metric)
+    return metric
+
+
+def histogram(name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+    metric = Histogram(name, help_text, buckets)
+    _METRICS.append(metric)
+    return metric
+
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, Any]], label: str = None):
+    """
+    Exports a stats() dictionary as gauges at scrape time. With `label`, the top-level
+    keys become that label's values (e.g. one series per cache or query shape).
+    """
+    _COLLECTORS.append((prefix, stats, label))
+
+
+def _stat_samples(prefix: str, stats: Dict[str, Any], label: Optional[str],
+                  labels: LabelKey = ()) -> Iterator[Tuple[str, LabelKey, float]]:
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            yield f"{prefix}_{key}", labels, value
+        elif isinstance(value, dict):
+            if label is not None:
+                yield from _stat_samples(prefix, value, None, labels + ((label, str(key)),))
+            else:
+                yield from _stat_samples(f"{prefix}_{key}", value, None, labels)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+
+    gauges: Dict[str, List[Tuple[LabelKey, float]]] = {}
+    for prefix, stats, label in _COLLECTORS:
+        try:
+            for name, labels, value in _stat_samples(prefix, stats(), label):
+                gauges.setdefault(name, []).append((labels, value))
+        except Exception as e:
+            print(f"Metrics collector '{prefix}' failed: {e}")
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# --- Application metrics ---
+
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests by route, method and status.")
+HTTP_LATENCY = histogram("http_request_duration_seconds", "Time to response headers, by route and method.")
+STAGE_LATENCY = histogram("stage_duration_seconds",
+                          "Time spent per processing stage (supabase, prompt_build, gemini, json_parse, graph_*).")
+LLM_TOKENS = counter("llm_tokens_total", "Gemini tokens reported in usageMetadata, by model and kind.")
+LLM_PROMPT_TOKENS_ESTIMATED = counter("llm_prompt_tokens_estimated_total",
+                                      "Locally estimated prompt tokens, by call site.")
+GEMINI_RETRIES = counter("gemini_retries_total", "Gemini attempts retried by the gateway, by status.")
+GEMINI_ERRORS = counter("gemini_errors_total", "Failed Gemini attempts, by operation and status.")
+
+
+def stage(name: str, operation: str = ""):
+    """Context manager timing one stage of a request: `with metrics.stage("supabase", "detailed_skills"):`."""
+    return STAGE_LATENCY.time(stage=name, operation=operation)
+
+
+def record_llm_usage(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+
+
+def record_usage_metadata(model: str, result: Dict[str, Any]):
+    """Token counts from a REST generateContent response (or the last streamed chunk)."""
+    usage = (result or {}).get("usageMetadata") or {}
+    record_llm_usage(model, usage.get("promptTokenCount"), usage.get("candidatesTokenCount"))
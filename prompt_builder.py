@@ -0,0 +1,142 @@
+import os
+import re
+import math
+from typing import Any, Dict, Iterable, List
+import metrics
+
+# Token-budgeted skill listings for LLM prompts
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+# Running totals of estimated prompt tokens, per call site
+PROMPT_STATS: Dict[str, Dict[str, int]] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate: punctuation counts as one token and words as roughly
+    one token per four characters, which tracks SentencePiece counts closely enough
+    for budgeting.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def log_prompt_tokens(label: str, *parts: str) -> int:
+    """Estimates and records the prompt size of one LLM call."""
+    tokens = sum(estimate_tokens(part) for part in parts if part)
+    stats = PROMPT_STATS.setdefault(label, {"calls": 0, "tokens": 0, "max_tokens": 0})
+    stats["calls"] += 1
+    stats["tokens"] += tokens
+    stats["max_tokens"] = max(stats["max_tokens"], tokens)
+    metrics.LLM_PROMPT_TOKENS_ESTIMATED.inc(tokens, call_site=label)
+    return tokens
+
+
+def _field(skill: Any, key: str) -> str:
+    value = skill.get(key) if isinstance(skill, dict) else getattr(skill, key, None)
+    return (value or "").strip()
+
+
+def skill_key(name: str) -> str:
+    """Normalized name used to spot duplicates: lowercase words, naive singular, sorted."""
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+             for w in _WORD_PATTERN.findall(name.lower())]
+    return " ".join(sorted(set(words)))
+
+
+def dedupe_skills(skills: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Merges skills with the same normalized key (case, plurals and word order aside) in
+    one pass. Spelling similarity is deliberately not a merge signal: "Microeconomics"
+    and "Macroeconomics" are different skills. Keeps the longest description and counts
+    how often each skill occurred.
+    """
+    merged: List[Dict[str, Any]] = []
+    by_key: Dict[str, Dict[str, Any]] = {}
+
+    for skill in skills:
+        name = _field(skill, "name")
+        if not name:
+            continue
+        category = _field(skill, "category") or "General"
+        description = _field(skill, "description")
+        key = skill_key(name)
+
+        entry = by_key.get(key)
+        if entry is None:
+            entry = {"key": key, "name": name, "category": category, "description": description, "count": 0}
+            merged.append(entry)
+            by_key[key] = entry
+        elif len(description) > len(entry["description"]):
+            entry["description"] = description
+        entry["count"] += 1
+
+    return merged
+
+
+def _truncate_words(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words, kept, used = text.split(), [], 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept) + "…" if kept else ""
+
+
+def _render(grouped: Dict[str, List[Dict[str, Any]]], description_tokens: int) -> str:
+    sections = []
+    for category, entries in grouped.items():
+        lines = []
+        for entry in entries:
+            description = _truncate_words(entry["description"], description_tokens)
+            suffix = f" (x{entry['count']})" if entry["count"] > 1 else ""
+            lines.append(f"- {entry['name']}{suffix}" + (f": {description}" if description else ""))
+        sections.append(f"{category}:\n" + "\n".join(lines))
+    return "\n".join(sections)
+
+
+def build_skills_prompt(skills: Iterable[Any], token_budget: int = None) -> str:
+    """
+    Renders skills deduplicated and grouped by category, trimming descriptions (and,
+    as a last resort, the least frequent skills) until the listing fits the token budget.
+    """
+    budget = token_budget or PROMPT_TOKEN_BUDGET
+    entries = dedupe_skills(skills)
+
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in sorted(entries, key=lambda e: (e["category"].lower(), -e["count"], e["name"].lower())):
+        grouped.setdefault(entry["category"], []).append(entry)
+
+    text = _render(grouped, description_tokens=10 ** 6)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    # Give every description an equal share of what the names leave over
+    names_only = _render(grouped, description_tokens=0)
+    spare = budget - estimate_tokens(names_only)
+    if spare > 0 and entries:
+        text = _render(grouped, description_tokens=spare // len(entries) - 2)
+        if estimate_tokens(text) <= budget:
+            return text
+    text = names_only
+
+    # Still too large: drop the least frequent skills until it fits
+    ranked = sorted(entries, key=lambda e: (e["count"], -len(e["name"])))
+    dropped = set()
+    while estimate_tokens(text) > budget and len(dropped) < len(ranked) - 1:
+        batch = max(1, (len(ranked) - len(dropped)) // 10)
+        for entry in ranked[len(dropped):len(dropped) + batch]:
+            dropped.add(id(entry))
+        kept = {c: [e for e in es if id(e) not in dropped] for c, es in grouped.items()}
+        text = _render({c: es for c, es in kept.items() if es}, description_tokens=0)
+    if dropped:
+        text += f"\n(+{len(dropped)} less frequent skills omitted)"
+    return text
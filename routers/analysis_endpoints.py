@@ -3,10 +3,19 @@ import json
 import httpx
 import asyncio
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
 from supabase import Client
-from database import get_supabase_client
+from database import get_supabase_client, cached_read, invalidate
+from clients.http_client import get_http_client
+from clients.gemini_gateway import gemini_gateway, model_url, CircuitOpenError
+from llm_cache import llm_cache, make_key
+import singleflight
+import metrics
+from serialization import FastJSONResponse, dumps, validate_rows
+from prompt_builder import build_skills_prompt, log_prompt_tokens
+from skill_registry import skill_registry
 
 
 # --- 1. Pydantic Models for Data Structure and Response ---
@@ -37,11 +46,25 @@ class JobSuggestionsResponse(BaseModel):
     job_suggestions: List[str] = Field(..., description="List of 3 suitable future-aligned job titles in South Africa.")
 
 
+# Combined response: each section is None when its LLM call failed (see errors)
+class DegreeAnalysisResponse(BaseModel):
+    summary: Optional[AlignmentSummaryResponse] = None
+    development: Optional[DevelopmentSuggestionsResponse] = None
+    jobs: Optional[JobSuggestionsResponse] = None
+    errors: Dict[str, str] = Field(default_factory=dict,
+                                   description="Per-section error messages for sections that could not be produced.")
+
+
 # --- 2. Core LLM Analysis Utility ---
 
-async def call_gemini_api(system_prompt: str, user_query: str, schema: dict) -> dict:
+GEMINI_MODEL = "gemini-2.5-flash-preview-09-2025"
+
+async def call_gemini_api(system_prompt: str, user_query: str, schema: dict,
+                          http_client: httpx.AsyncClient, degree_id: int = None) -> dict:
     """
     Generic utility function to handle the secure API call logic with exponential backoff.
+    Uses the shared pooled client, so retries reuse the open connection.
+    Concurrent identical calls are coalesced into one Gemini request.
     """
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
@@ -50,8 +73,13 @@ async def call_gemini_api(system_prompt: str, user_query: str, schema: dict) ->
             detail="GEMINI_API_KEY environment variable is not set on the server."
         )
 
-    apiUrl = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-09-2025:generateContent"
+    # Identical prompts are served from the LLM cache (memory, then disk)
+    cache_key = make_key(GEMINI_MODEL, system_prompt, user_query, schema)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    log_prompt_tokens("analysis", system_prompt, user_query)
     payload = {
         "contents": [{"parts": [{"text": user_query}]}],
         "systemInstruction": {"parts": [{"text": system_prompt}]},
@@ -61,47 +89,131 @@ async def call_gemini_api(system_prompt: str, user_query: str, schema: dict) ->
         }
     }
 
-    # Retry logic with Exponential Backoff
-    MAX_RETRIES = 3
-    for i in range(MAX_RETRIES):
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{apiUrl}?key={gemini_api_key}",
-                    headers={"Content-Type": "application/json"},
-                    json=payload
-                )
-                response.raise_for_status()
+    async def request() -> dict:
+        analysis_data = await _post_with_retries(payload, gemini_api_key, http_client)
+        await llm_cache.set(cache_key, analysis_data, degree_id)
+        return analysis_data
+
+    return await singleflight.group("gemini").do(cache_key, request)
+
+
+def gemini_http_error(e: Exception) -> HTTPException:
+    """Maps a failed gateway call to the HTTPException returned to our client."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    if isinstance(e, httpx.HTTPStatusError):
+        print(f"HTTP Error calling Gemini: {e.response.text}")
+        return HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Gemini API call failed. Status: {e.response.status_code}"
+        )
+    print(f"An unexpected error occurred during Gemini API call: {e}")
+    return HTTPException(status_code=500, detail=f"Internal server error during analysis: {e}")
 
-                result = response.json()
-                json_string = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text")
 
-                if not json_string:
-                    raise ValueError("Gemini API returned an empty analysis result.")
+async def _post_with_retries(payload: dict, gemini_api_key: str, http_client: httpx.AsyncClient) -> dict:
+    """
+    Sends one generateContent request through the shared Gemini gateway, which applies
+    the quota limiter, retries only transient failures (honoring Retry-After) and fails
+    fast while the circuit breaker is open.
+    """
+    apiUrl = model_url(GEMINI_MODEL, "generateContent")
+
+    async def send() -> dict:
+        response = await http_client.post(
+            f"{apiUrl}?key={gemini_api_key}",
+            headers={"Content-Type": "application/json"},
+            json=payload,
+            timeout=30.0
+        )
+        response.raise_for_status()
 
-                return json.loads(json_string)
+        with metrics.stage("json_parse", "analysis"):
+            result = response.json()
+            metrics.record_usage_metadata(GEMINI_MODEL, result)
+            json_string = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text")
 
-        except httpx.HTTPStatusError as e:
-            # Handle specific HTTP errors (4xx, 5xx)
-            print(f"HTTP Error calling Gemini (Attempt {i + 1}): {e.response.text}")
-            if i == MAX_RETRIES - 1:
-                raise HTTPException(
-                    status_code=e.response.status_code,
-                    detail=f"Gemini API call failed after {MAX_RETRIES} attempts. Status: {e.response.status_code}"
-                )
-        except Exception as e:
-            # Handle JSON parsing or other general errors
-            print(f"An unexpected error occurred (Attempt {i + 1}): {e}")
-            if i == MAX_RETRIES - 1:
+            if not json_string:
+                raise ValueError("Gemini API returned an empty analysis result.")
+
+            return json.loads(json_string)
+
+    try:
+        return await gemini_gateway.call(send, operation="analysis")
+    except Exception as e:
+        raise gemini_http_error(e)
+
+
+async def stream_gemini_api(system_prompt: str, user_query: str, schema: dict,
+                            http_client: httpx.AsyncClient, degree_id: int = None) -> AsyncIterator[str]:
+    """
+    Streaming variant of call_gemini_api: yields raw text chunks as Gemini produces them
+    (streamGenerateContent with SSE). The assembled JSON is stored in the LLM cache, so
+    callers should check the cache first; streamed calls go through the gateway's
+    limiter and breaker but are not retried.
+    """
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    if not gemini_api_key:
+        raise HTTPException(
+            status_code=503,
+            detail="GEMINI_API_KEY environment variable is not set on the server."
+        )
+
+    apiUrl = model_url(GEMINI_MODEL, "streamGenerateContent")
+    log_prompt_tokens("analysis_stream", system_prompt, user_query)
+
+    payload = {
+        "contents": [{"parts": [{"text": user_query}]}],
+        "systemInstruction": {"parts": [{"text": system_prompt}]},
+        "generationConfig": {
+            "responseMimeType": "application/json",
+            "responseSchema": schema
+        }
+    }
+
+    chunks = []
+    usage = None
+    try:
+        async with gemini_gateway.admit("analysis_stream"), http_client.stream(
+                "POST",
+                f"{apiUrl}?alt=sse&key={gemini_api_key}",
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                timeout=30.0
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                print(f"HTTP Error streaming from Gemini: {response.text}")
+                retry_after = response.headers.get("retry-after")
                 raise HTTPException(
-                    status_code=500,
-                    detail=f"Internal server error during analysis after {MAX_RETRIES} attempts: {e}"
+                    status_code=response.status_code,
+                    detail=f"Gemini streaming call failed. Status: {response.status_code}",
+                    headers={"Retry-After": retry_after} if retry_after else None
                 )
 
-        # Exponential backoff delay
-        await asyncio.sleep(2 ** i)
-
-    raise HTTPException(status_code=500, detail="Analysis failed due to unknown error after retries.")
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if "usageMetadata" in event:
+                    usage = event["usageMetadata"]  # cumulative; the last chunk carries the totals
+                parts = event.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+                text = "".join(part.get("text", "") for part in parts)
+                if text:
+                    chunks.append(text)
+                    yield text
+    except CircuitOpenError as e:
+        raise gemini_http_error(e)
+
+    metrics.record_usage_metadata(GEMINI_MODEL, {"usageMetadata": usage})
+    json_string = "".join(chunks)
+    if not json_string:
+        raise HTTPException(status_code=500, detail="Gemini API returned an empty analysis result.")
+
+    await llm_cache.set(make_key(GEMINI_MODEL, system_prompt, user_query, schema),
+                        json.loads(json_string), degree_id)
 
 
 # --- 3. Data Retrieval (Pre-analysis Step) ---
@@ -110,7 +222,16 @@ async def fetch_detailed_skills(degree_id: int, client: Client) -> List[Detailed
     """
     Retrieves the full skill list (name, category, description) from Supabase.
     This rich data is crucial for preventing stale analysis suggestions.
+    Served from the read-through cache, shared by every worker on the host (invalidated
+    when the degree's skills are upserted); concurrent misses for the same degree share a single query.
+    Also brings the skill registry's view up to date for the prompt that formats these skills.
     """
+    await skill_registry.refresh()
+    return await cached_read("detailed_skills", degree_id, lambda: _fetch_detailed_skills(degree_id, client),
+                             decode=lambda rows: validate_rows(DetailedSkill, rows))
+
+
+async def _fetch_detailed_skills(degree_id: int, client: Client) -> List[DetailedSkill]:
     try:
         # Fetch skill details (name, category, description) for the given degree
         skills_res = await client.table('extracted_skills') \
@@ -123,8 +244,8 @@ async def fetch_detailed_skills(degree_id: int, client: Client) -> List[Detailed
         if not raw_skills:
             return []
 
-        # Map raw data to Pydantic models for type safety
-        return [DetailedSkill(**skill) for skill in raw_skills]
+        # Map raw data to Pydantic models for type safety (the whole list in one validation call)
+        return validate_rows(DetailedSkill, raw_skills)
 
     except Exception as e:
         print(f"Supabase Read Error during detailed skill fetch: {e}")
@@ -134,55 +255,106 @@ async def fetch_detailed_skills(degree_id: int, client: Client) -> List[Detailed
 # --- 4. LLM Analysis Service Functions (3 Separate Calls) ---
 
 def _format_skills_for_prompt(detailed_skills: List[DetailedSkill]) -> str:
-    """Helper to format the detailed skill data for the LLM prompt."""
-    return '\n'.join([
-        f"Skill: {s.name} | Category: {s.category} | Description: {s.description}"
-        for s in detailed_skills
-    ])
+    """
+    Helper to format the detailed skill data for the LLM prompt: names mapped to their
+    canonical skill, near-duplicates merged, grouped by category and trimmed to PROMPT_TOKEN_BUDGET.
+    """
+    with metrics.stage("prompt_build", "analysis"):
+        return build_skills_prompt([
+            {"name": skill_registry.resolve_name(s.name), "category": s.category, "description": s.description}
+            for s in detailed_skills
+        ])
 
 
-# Service 1: Alignment Summary and Strongest Skills
-async def get_alignment_summary(detailed_skills: List[DetailedSkill]) -> Dict[str, Any]:
+# Prompt builders: return (system_prompt, user_query, schema) so the same request
+# can be sent as a regular call or as a streamed call.
+def _alignment_summary_request(detailed_skills: List[DetailedSkill], skills_text: str = None):
     system_prompt = "You are an expert career analyst. Analyze the comprehensive skill set to determine the core alignment and identify the central skills of the curriculum."
     user_query = f"""
     Based on the following {len(detailed_skills)} detailed skills:
-    {_format_skills_for_prompt(detailed_skills)}
+    {skills_text or _format_skills_for_prompt(detailed_skills)}
 
     1. Write a 3-sentence 'alignment summary' of the overall career focus of the degree.
     2. Identify the top 5 'strongest skills' (skills central to the whole curriculum).
     """
-
-    schema = AlignmentSummaryResponse.model_json_schema()
-    return await call_gemini_api(system_prompt, user_query, schema)
+    return system_prompt, user_query, AlignmentSummaryResponse.model_json_schema()
 
 
-# Service 2: Development and Enhancement Suggestions
-async def get_development_suggestions(detailed_skills: List[DetailedSkill]) -> Dict[str, Any]:
+def _development_suggestions_request(detailed_skills: List[DetailedSkill], skills_text: str = None):
     system_prompt = "You are an expert strategic planner. Analyze the provided skill set to suggest specific enhancement opportunities and future-proofing skills."
     user_query = f"""
     Based on the following {len(detailed_skills)} detailed skills:
-    {_format_skills_for_prompt(detailed_skills)}
+    {skills_text or _format_skills_for_prompt(detailed_skills)}
 
     1. Suggest 5 'enhancement courses' (specific, external courses, certifications, or diplomas to build on the existing skills).
     2. Recommend 5 'complementary skills' (emerging skills like MLOps, specific soft skills, or domain knowledge needed to future-proof the career).
     """
+    return system_prompt, user_query, DevelopmentSuggestionsResponse.model_json_schema()
 
-    schema = DevelopmentSuggestionsResponse.model_json_schema()
-    return await call_gemini_api(system_prompt, user_query, schema)
 
-
-# Service 3: Job Suggestions
-async def get_job_suggestions(detailed_skills: List[DetailedSkill]) -> Dict[str, Any]:
+def _job_suggestions_request(detailed_skills: List[DetailedSkill], skills_text: str = None):
     system_prompt = "You are an expert recruitment specialist focused on the South African market. Analyze the skill set to provide relevant job titles."
     user_query = f"""
     Based on the following {len(detailed_skills)} detailed skills:
-    {_format_skills_for_prompt(detailed_skills)}
+    {skills_text or _format_skills_for_prompt(detailed_skills)}
 
     Suggest 3 'job suggestions' (suitable future-aligned job titles specifically in the South African (SA) market context).
     """
+    return system_prompt, user_query, JobSuggestionsResponse.model_json_schema()
+
+
+# Service 1: Alignment Summary and Strongest Skills
+async def get_alignment_summary(detailed_skills: List[DetailedSkill],
+                                http_client: httpx.AsyncClient,
+                                degree_id: int = None,
+                                skills_text: str = None) -> Dict[str, Any]:
+    system_prompt, user_query, schema = _alignment_summary_request(detailed_skills, skills_text)
+    return await call_gemini_api(system_prompt, user_query, schema, http_client, degree_id)
+
+
+# Service 2: Development and Enhancement Suggestions
+async def get_development_suggestions(detailed_skills: List[DetailedSkill],
+                                      http_client: httpx.AsyncClient,
+                                      degree_id: int = None,
+                                      skills_text: str = None) -> Dict[str, Any]:
+    system_prompt, user_query, schema = _development_suggestions_request(detailed_skills, skills_text)
+    return await call_gemini_api(system_prompt, user_query, schema, http_client, degree_id)
+
+
+# Service 3: Job Suggestions
+async def get_job_suggestions(detailed_skills: List[DetailedSkill],
+                              http_client: httpx.AsyncClient,
+                              degree_id: int = None,
+                              skills_text: str = None) -> Dict[str, Any]:
+    system_prompt, user_query, schema = _job_suggestions_request(detailed_skills, skills_text)
+    return await call_gemini_api(system_prompt, user_query, schema, http_client, degree_id)
+
+
+# Section name -> (prompt builder, response model); shared by the combined and streaming endpoints
+ANALYSIS_SECTIONS = {
+    "summary": (_alignment_summary_request, AlignmentSummaryResponse),
+    "development": (_development_suggestions_request, DevelopmentSuggestionsResponse),
+    "jobs": (_job_suggestions_request, JobSuggestionsResponse),
+}
+
+
+async def warm_analysis(degree_id: int, client: Client) -> int:
+    """
+    Startup warm-up for one degree: loads its skills into the read-through cache and
+    promotes its cached analysis sections from the LLM cache's disk tier to memory.
+    Never calls Gemini; returns the number of sections that were cached.
+    """
+    detailed_skills_data = await fetch_detailed_skills(degree_id, client)
+    if not detailed_skills_data:
+        return 0
 
-    schema = JobSuggestionsResponse.model_json_schema()
-    return await call_gemini_api(system_prompt, user_query, schema)
+    skills_text = _format_skills_for_prompt(detailed_skills_data)
+    cached = 0
+    for build_request, _ in ANALYSIS_SECTIONS.values():
+        system_prompt, user_query, schema = build_request(detailed_skills_data, skills_text)
+        if await llm_cache.get(make_key(GEMINI_MODEL, system_prompt, user_query, schema)) is not None:
+            cached += 1
+    return cached
 
 
 # --- 5. FastAPI Router and Endpoints (3 Separate Endpoints Restored) ---
@@ -197,7 +369,8 @@ router = APIRouter(
 @router.get("/{degree_id}/summary", response_model=AlignmentSummaryResponse)
 async def get_alignment_summary_endpoint(
         degree_id: int,
-        client: Client = Depends(get_supabase_client)
+        client: Client = Depends(get_supabase_client),
+        http_client: httpx.AsyncClient = Depends(get_http_client)
 ):
     """Retrieves the Alignment Summary and Strongest Skills (API 1 of 3)."""
     detailed_skills_data = await fetch_detailed_skills(degree_id, client)
@@ -208,14 +381,15 @@ async def get_alignment_summary_endpoint(
             detail=f"No skills found for Degree ID {degree_id}. Analysis aborted."
         )
 
-    analysis_data = await get_alignment_summary(detailed_skills_data)
-    return AlignmentSummaryResponse(**analysis_data)
+    # Validated and serialized once, by the route's response_model
+    return await get_alignment_summary(detailed_skills_data, http_client, degree_id)
 
 
 @router.get("/{degree_id}/development", response_model=DevelopmentSuggestionsResponse)
 async def get_development_suggestions_endpoint(
         degree_id: int,
-        client: Client = Depends(get_supabase_client)
+        client: Client = Depends(get_supabase_client),
+        http_client: httpx.AsyncClient = Depends(get_http_client)
 ):
     """Retrieves Enhancement and Complementary Skill Suggestions (API 2 of 3)."""
     detailed_skills_data = await fetch_detailed_skills(degree_id, client)
@@ -226,14 +400,15 @@ async def get_development_suggestions_endpoint(
             detail=f"No skills found for Degree ID {degree_id}. Analysis aborted."
         )
 
-    analysis_data = await get_development_suggestions(detailed_skills_data)
-    return DevelopmentSuggestionsResponse(**analysis_data)
+    # Validated and serialized once, by the route's response_model
+    return await get_development_suggestions(detailed_skills_data, http_client, degree_id)
 
 
 @router.get("/{degree_id}/jobs", response_model=JobSuggestionsResponse)
 async def get_job_suggestions_endpoint(
         degree_id: int,
-        client: Client = Depends(get_supabase_client)
+        client: Client = Depends(get_supabase_client),
+        http_client: httpx.AsyncClient = Depends(get_http_client)
 ):
     """Retrieves relevant Job Suggestions (API 3 of 3)."""
     detailed_skills_data = await fetch_detailed_skills(degree_id, client)
@@ -244,5 +419,141 @@ async def get_job_suggestions_endpoint(
             detail=f"No skills found for Degree ID {degree_id}. Analysis aborted."
         )
 
-    analysis_data = await get_job_suggestions(detailed_skills_data)
-    return JobSuggestionsResponse(**analysis_data)
\ No newline at end of file
+    # Validated and serialized once, by the route's response_model
+    return await get_job_suggestions(detailed_skills_data, http_client, degree_id)
+
+
+@router.delete("/{degree_id}/analysis-cache")
+async def invalidate_analysis_cache_endpoint(degree_id: int):
+    """Drops cached LLM analysis results (and skill data) for a degree so the next request re-runs Gemini."""
+    await invalidate("detailed_skills", degree_id)
+    removed = await llm_cache.invalidate_degree(degree_id)
+    return {"degree_id": degree_id, "entries_removed": removed, "cache": llm_cache.stats()}
+
+
+@router.get("/{degree_id}/analysis", response_model=DegreeAnalysisResponse)
+async def get_degree_analysis_endpoint(
+        degree_id: int,
+        client: Client = Depends(get_supabase_client),
+        http_client: httpx.AsyncClient = Depends(get_http_client)
+):
+    """
+    Retrieves all three analysis sections in one request. Skills are fetched and
+    formatted once, the three LLM calls run concurrently, and a failed section is
+    reported in 'errors' instead of failing the whole response.
+    """
+    detailed_skills_data = await fetch_detailed_skills(degree_id, client)
+
+    if not detailed_skills_data:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No skills found for Degree ID {degree_id}. Analysis aborted."
+        )
+
+    skills_text = _format_skills_for_prompt(detailed_skills_data)
+
+    async def run_section(build_request):
+        system_prompt, user_query, schema = build_request(detailed_skills_data, skills_text)
+        return await call_gemini_api(system_prompt, user_query, schema, http_client, degree_id)
+
+    results = await asyncio.gather(
+        *[run_section(build_request) for build_request, _ in ANALYSIS_SECTIONS.values()],
+        return_exceptions=True
+    )
+
+    combined = DegreeAnalysisResponse()
+    for (section, (_, model)), result in zip(ANALYSIS_SECTIONS.items(), results):
+        try:
+            if isinstance(result, BaseException):
+                raise result
+            setattr(combined, section, model(**result))
+        except HTTPException as e:
+            combined.errors[section] = str(e.detail)
+        except Exception as e:
+            combined.errors[section] = f"Invalid analysis result: {e}"
+
+    if len(combined.errors) == len(ANALYSIS_SECTIONS):
+        raise HTTPException(status_code=502, detail={"message": "All analysis sections failed.", "errors": combined.errors})
+
+    # Sections were validated above; serialize straight to JSON instead of validating again
+    return FastJSONResponse(combined)
+
+
+def _sse_event(event: str, data: Any) -> str:
+    """Formats one Server-Sent Event frame (data may be a dict or a pydantic model)."""
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+@router.get("/{degree_id}/analysis/stream")
+async def stream_degree_analysis_endpoint(
+        degree_id: int,
+        client: Client = Depends(get_supabase_client),
+        http_client: httpx.AsyncClient = Depends(get_http_client)
+):
+    """
+    Streams the three analysis sections as Server-Sent Events. Token output is relayed
+    as 'token' events while Gemini generates; each finished section is sent as its own
+    event ('summary', 'development', 'jobs'), failures as 'error', and 'done' closes the stream.
+    """
+
+    async def run_section(section, build_request, model, detailed_skills_data, skills_text, queue):
+        system_prompt, user_query, schema = build_request(detailed_skills_data, skills_text)
+        try:
+            result = await llm_cache.get(make_key(GEMINI_MODEL, system_prompt, user_query, schema))
+            if result is None:
+                chunks = []
+                async for text in stream_gemini_api(system_prompt, user_query, schema, http_client, degree_id):
+                    chunks.append(text)
+                    await queue.put(_sse_event("token", {"section": section, "text": text}))
+                result = json.loads("".join(chunks))
+            await queue.put(_sse_event(section, model.model_validate(result)))
+        except HTTPException as e:
+            await queue.put(_sse_event("error", {"section": section, "detail": str(e.detail)}))
+        except Exception as e:
+            print(f"Streaming analysis error ({section}): {e}")
+            await queue.put(_sse_event("error", {"section": section, "detail": f"Invalid analysis result: {e}"}))
+        finally:
+            # Sentinel: this section has finished one way or another
+            await queue.put(None)
+
+    async def event_stream():
+        # Flush headers and a first frame before any slow work starts
+        yield ": connected\n\n"
+
+        try:
+            detailed_skills_data = await fetch_detailed_skills(degree_id, client)
+        except HTTPException as e:
+            yield _sse_event("error", {"section": None, "detail": str(e.detail)})
+            return
+
+        if not detailed_skills_data:
+            yield _sse_event("error", {"section": None,
+                                       "detail": f"No skills found for Degree ID {degree_id}. Analysis aborted."})
+            return
+
+        skills_text = _format_skills_for_prompt(detailed_skills_data)
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(run_section(section, build_request, model, detailed_skills_data, skills_text, queue))
+            for section, (build_request, model) in ANALYSIS_SECTIONS.items()
+        ]
+
+        try:
+            remaining = len(tasks)
+            while remaining:
+                frame = await queue.get()
+                if frame is None:
+                    remaining -= 1
+                    continue
+                yield frame
+            yield _sse_event("done", {"degree_id": degree_id})
+        finally:
+            # Client disconnected or stream finished: stop any in-flight Gemini streams
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
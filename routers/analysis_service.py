@@ -2,28 +2,17 @@ import os
 import json
 import httpx
 import asyncio
+import numpy as np
 from fastapi import HTTPException
 from pydantic import BaseModel
 from typing import List
-
-# --- Pydantic Models for Data Structure (Unchanged) ---
-class Node(BaseModel):
-    id: int
-    label: str
-    group: str
-    x: float = 0.0
-    y: float = 0.0
-    vx: float = 0.0
-    vy: float = 0.0
-
-class Link(BaseModel):
-    source: int
-    target: int
-    group: str
-
-class Graph(BaseModel):
-    nodes: List[Node]
-    links: List[Link]
+from llm_cache import llm_cache, make_key
+from clients.gemini_gateway import gemini_gateway, model_url, CircuitOpenError
+import singleflight
+import metrics
+from graph_analytics import compute_centrality
+from graph_model import CompactGraph
+from prompt_builder import build_skills_prompt, log_prompt_tokens
 
 # --- Pydantic Models for New Specialized LLM Responses ---
 class StrongSkillsResponse(BaseModel):
@@ -78,7 +67,7 @@ MOCK_DATABASE = {
     }
 }
 
-async def get_graph_data(degree_id: int) -> Graph:
+async def get_graph_data(degree_id: int) -> CompactGraph:
     """
     IMPLEMENTATION: Simulates an asynchronous query to a Supabase/PostgreSQL database.
     """
@@ -88,21 +77,24 @@ async def get_graph_data(degree_id: int) -> Graph:
 
     if not raw_data:
         print(f"WARNING: Graph data for Degree ID {degree_id} not found.")
-        return Graph(nodes=[], links=[])
+        return CompactGraph()
 
     try:
-        nodes = [Node(**node_data) for node_data in raw_data['nodes']]
-        links = [Link(**link_data) for link_data in raw_data['links']]
-        return Graph(nodes=nodes, links=links)
+        return CompactGraph.from_json(raw_data)
 
     except Exception as e:
-        print(f"ERROR: Failed to map raw data to Pydantic models: {e}")
-        return Graph(nodes=[], links=[])
+        print(f"ERROR: Failed to map raw data to the graph model: {e}")
+        return CompactGraph()
 
 # --- Core LLM Analysis Utility ---
-async def call_gemini_api(system_prompt: str, user_query: str, schema: dict) -> dict:
+GEMINI_MODEL = "gemini-2.5-flash-preview-09-2025"
+
+async def call_gemini_api(system_prompt: str, user_query: str, schema: dict,
+                          http_client: httpx.AsyncClient, degree_id: int = None) -> dict:
     """
     Generic utility function to handle the secure API call logic.
+    The pooled client is injected via clients.http_client.get_http_client.
+    Concurrent identical calls are coalesced into one Gemini request.
     """
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
@@ -111,8 +103,15 @@ async def call_gemini_api(system_prompt: str, user_query: str, schema: dict) ->
             detail="GEMINI_API_KEY environment variable is not set on the server."
         )
 
-    apiUrl = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-09-2025:generateContent"
+    apiUrl = model_url(GEMINI_MODEL, "generateContent")
 
+    # Identical prompts are served from the LLM cache (memory, then disk)
+    cache_key = make_key(GEMINI_MODEL, system_prompt, user_query, schema)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    log_prompt_tokens("graph_analysis", system_prompt, user_query)
     payload = {
         "contents": [{"parts": [{"text": user_query}]}],
         "systemInstruction": {"parts": [{"text": system_prompt}]},
@@ -122,16 +121,18 @@ async def call_gemini_api(system_prompt: str, user_query: str, schema: dict) ->
         }
     }
 
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(
-                f"{apiUrl}?key={gemini_api_key}",
-                headers={"Content-Type": "application/json"},
-                json=payload
-            )
-            response.raise_for_status()
+    async def send() -> dict:
+        response = await http_client.post(
+            f"{apiUrl}?key={gemini_api_key}",
+            headers={"Content-Type": "application/json"},
+            json=payload,
+            timeout=15.0
+        )
+        response.raise_for_status()
 
+        with metrics.stage("json_parse", "graph_analysis"):
             result = response.json()
+            metrics.record_usage_metadata(GEMINI_MODEL, result)
             json_string = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text")
 
             if not json_string:
@@ -139,33 +140,71 @@ async def call_gemini_api(system_prompt: str, user_query: str, schema: dict) ->
 
             return json.loads(json_string)
 
-    except httpx.HTTPStatusError as e:
-        print(f"HTTP Error calling Gemini: {e.response.text}")
-        raise HTTPException(
-            status_code=e.response.status_code,
-            detail=f"Gemini API call failed: {e.response.status_code}. Check key and usage limits."
-        )
-    except Exception as e:
-        print(f"An unexpected error occurred during Gemini API call: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Internal server error during analysis: {e}"
-        )
+    async def request() -> dict:
+        # The shared gateway applies the quota limiter, transient-only retries and the breaker
+        try:
+            analysis_data = await gemini_gateway.call(send, operation="graph_analysis")
+            await llm_cache.set(cache_key, analysis_data, degree_id)
+            return analysis_data
+
+        except CircuitOpenError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+        except httpx.HTTPStatusError as e:
+            print(f"HTTP Error calling Gemini: {e.response.text}")
+            raise HTTPException(
+                status_code=e.response.status_code,
+                detail=f"Gemini API call failed: {e.response.status_code}. Check key and usage limits."
+            )
+        except Exception as e:
+            print(f"An unexpected error occurred during Gemini API call: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Internal server error during analysis: {e}"
+            )
+
+    # Concurrent identical calls share one Gemini request
+    return await singleflight.group("gemini").do(cache_key, request)
+
+def _graph_skills_for_prompt(graph_data: CompactGraph) -> str:
+    """Compact, token-budgeted skill listing derived from the graph (replaces the raw graph JSON)."""
+    with metrics.stage("prompt_build", "graph_analysis"):
+        return _graph_skills_listing(graph_data)
+
+
+def _graph_skills_listing(graph_data: CompactGraph) -> str:
+    links = graph_data.links
+    module_counts = np.bincount(links[graph_data.link_mask("module-skill"), 1], minlength=len(graph_data))
+    skills = []
+    for i in np.flatnonzero(graph_data.group_mask("Skill")).tolist():
+        # Repeat each skill once per linking module so the builder reports it as (xN)
+        skills.extend([{"name": graph_data.labels[i], "category": "Skill"}] * max(1, int(module_counts[i])))
+    return build_skills_prompt(skills)
+
 
 # --- 1. Strongest Skills Service ---
-async def get_strongest_skills(graph_data: Graph) -> StrongSkillsResponse:
-    """Uses AI to identify and summarize the strongest skills."""
-    system_prompt = "You are an expert curriculum analyst. Analyze the graph to identify core strengths based on skill centrality (Skills linked to many Modules are stronger). Provide a concise alignment summary."
-    user_query = f"Analyze this knowledge graph. Identify the 5 strongest skills based on linkages and give a two-sentence career alignment summary. The raw graph data is:\n\n {json.dumps(graph_data.dict(), indent=2)}"
+STRONGEST_SKILLS_TOP_K = 5
+
+
+async def get_strongest_skills(graph_data: CompactGraph, http_client: httpx.AsyncClient,
+                               degree_id: int = None) -> StrongSkillsResponse:
+    """
+    Ranks skill centrality locally (graph_analytics) and only asks the AI for the
+    alignment summary, sending it the precomputed top-k instead of the whole graph.
+    """
+    with metrics.stage("graph_centrality", "strongest_skills"):
+        centrality = compute_centrality(graph_data, "Skill", STRONGEST_SKILLS_TOP_K)
+    top_skills = centrality["ranked"]
+    ranking = "\n".join(
+        f"{rank}. {skill['label']} (linked modules: {skill['degree']}, pagerank: {skill['pagerank']:.4f})"
+        for rank, skill in enumerate(top_skills, start=1)
+    )
+
+    system_prompt = "You are an expert curriculum analyst. The strongest skills of a curriculum have already been ranked by graph centrality (Skills linked to many Modules are stronger). Provide a concise alignment summary."
+    user_query = f"These are the {len(top_skills)} most central skills of the curriculum, strongest first:\n\n{ranking}\n\nGive a two-sentence career alignment summary."
 
     schema = {
         "type": "OBJECT",
         "properties": {
-            "strongest_skills": {
-                "type": "ARRAY",
-                "description": "List of the top 5 most central skills derived from the graph connections.",
-                "items": {"type": "STRING"}
-            },
             "alignment_summary": {
                 "type": "STRING",
                 "description": "A brief, two-sentence summary of the overall career alignment and focus."
@@ -173,14 +212,18 @@ async def get_strongest_skills(graph_data: Graph) -> StrongSkillsResponse:
         }
     }
 
-    analysis_data = await call_gemini_api(system_prompt, user_query, schema)
-    return StrongSkillsResponse(**analysis_data)
+    analysis_data = await call_gemini_api(system_prompt, user_query, schema, http_client, degree_id)
+    return StrongSkillsResponse(
+        strongest_skills=[skill['label'] for skill in top_skills],
+        alignment_summary=analysis_data.get("alignment_summary", "")
+    )
 
 # --- 2. Enhancement Courses Service ---
-async def get_enhancement_suggestions(graph_data: Graph) -> EnhancementResponse:
+async def get_enhancement_suggestions(graph_data: CompactGraph, http_client: httpx.AsyncClient,
+                                      degree_id: int = None) -> EnhancementResponse:
     """Uses AI to suggest courses/certs to enhance the current skill set."""
     system_prompt = "You are an expert career advisor. Based on the student's current skill set (derived from the graph), recommend relevant and specific, high-value courses, certifications, or diplomas to substantially enhance those current skills."
-    user_query = f"The student's current curriculum and skills are in this knowledge graph. Suggest 5 high-impact external courses or certifications (e.g., 'Google Professional ML Engineer Certification' or 'Coursera Deep Learning Specialization') that specifically build upon the established skills. The raw graph data is:\n\n {json.dumps(graph_data.dict(), indent=2)}"
+    user_query = f"The student's current curriculum and skills are in this knowledge graph. Suggest 5 high-impact external courses or certifications (e.g., 'Google Professional ML Engineer Certification' or 'Coursera Deep Learning Specialization') that specifically build upon the established skills. The skills, with how many modules teach each, are:\n\n{_graph_skills_for_prompt(graph_data)}"
 
     schema = {
         "type": "OBJECT",
@@ -193,14 +236,15 @@ async def get_enhancement_suggestions(graph_data: Graph) -> EnhancementResponse:
         }
     }
 
-    analysis_data = await call_gemini_api(system_prompt, user_query, schema)
+    analysis_data = await call_gemini_api(system_prompt, user_query, schema, http_client, degree_id)
     return EnhancementResponse(**analysis_data)
 
 # --- 3. Complementary Skills Service ---
-async def get_complementary_skills(graph_data: Graph) -> ComplementarySkillsResponse:
+async def get_complementary_skills(graph_data: CompactGraph, http_client: httpx.AsyncClient,
+                                   degree_id: int = None) -> ComplementarySkillsResponse:
     """Uses AI to suggest complementary skills and future-proof career paths."""
     system_prompt = "You are a strategic career planner. Based on the provided skills, identify 5 emerging or complementary skills that are crucial for future-proofing a career in this domain. Also, recommend 3 relevant job titles."
-    user_query = f"Analyze the current skills in this knowledge graph. Recommend 5 complementary skills needed to future-proof the career (e.g., communication, MLOps, DevOps) and suggest 3 aligned job roles. The raw graph data is:\n\n {json.dumps(graph_data.dict(), indent=2)}"
+    user_query = f"Analyze the current skills in this knowledge graph. Recommend 5 complementary skills needed to future-proof the career (e.g., communication, MLOps, DevOps) and suggest 3 aligned job roles. The skills, with how many modules teach each, are:\n\n{_graph_skills_for_prompt(graph_data)}"
 
     schema = {
         "type": "OBJECT",
@@ -218,5 +262,5 @@ async def get_complementary_skills(graph_data: Graph) -> ComplementarySkillsResp
         }
     }
 
-    analysis_data = await call_gemini_api(system_prompt, user_query, schema)
+    analysis_data = await call_gemini_api(system_prompt, user_query, schema, http_client, degree_id)
     return ComplementarySkillsResponse(**analysis_data)
\ No newline at end of file
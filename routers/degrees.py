@@ -1,34 +1,200 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import re
+import asyncio
+import bisect
+from fastapi import APIRouter, Depends, HTTPException, Query
 from supabase import Client
-from database import get_supabase_client  # Assuming this dependency is available
+from typing import Any, Dict, List, Optional, Tuple
+from database import get_supabase_client, setup_supabase_client, cached_read  # Assuming this dependency is available
+from serialization import FastJSONResponse
 
 router = APIRouter(prefix="/api/degrees", tags=["Degrees"])
 
+# Catalog paging and the in-memory typeahead index
+DEGREE_PAGE_MAX = int(os.getenv("DEGREE_PAGE_MAX", "1000"))
+DEGREE_INDEX_REFRESH_SECONDS = float(os.getenv("DEGREE_INDEX_REFRESH_SECONDS", "300"))
+
+_FIELD = re.compile(r"^[a-z_][a-z0-9_]*$")
+_WORD = re.compile(r"\w+")
+
+
+def _parse_fields(fields: Optional[str]) -> str:
+    """Validated select list for ?fields=; the id is always included because it is the cursor."""
+    if not fields:
+        return "id, name"
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in names if not _FIELD.match(f)]
+    if invalid:
+        raise HTTPException(status_code=422, detail=f"Invalid field name(s): {', '.join(invalid)}")
+    if "id" not in names:
+        names.insert(0, "id")
+    return ", ".join(dict.fromkeys(names))
+
+
+class DegreeIndex:
+    """
+    Sorted (word, degree) pairs for every word of every degree name, so a prefix
+    lookup is a bisect plus a short scan. Rebuilt from the degrees table in the
+    background and swapped in atomically.
+    """
+
+    def __init__(self):
+        self._words: List[str] = []
+        self._positions: List[int] = []
+        self._degrees: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+        self.loaded = False
+
+    def _build(self, degrees: List[Dict[str, Any]]):
+        pairs = sorted(
+            (word, position)
+            for position, degree in enumerate(degrees)
+            for word in set(_WORD.findall((degree.get('name') or "").lower()))
+        )
+        # One tuple assignment, so readers never see half of an old and half of a new index
+        self._words, self._positions, self._degrees = [w for w, _ in pairs], [p for _, p in pairs], degrees
+
+    async def refresh(self, client: Client):
+        """Reloads all degrees with keyset pagination and rebuilds the index."""
+        async with self._refresh_lock:
+            degrees, after = [], 0
+            while True:
+                page = await client.table('degrees') \
+                    .select('id, name') \
+                    .gt('id', after) \
+                    .order('id') \
+                    .limit(DEGREE_PAGE_MAX) \
+                    .execute()
+                degrees.extend(page.data or [])
+                if len(page.data or []) < DEGREE_PAGE_MAX:
+                    break
+                after = page.data[-1]['id']
+            self._build(degrees)
+            self.loaded = True
+
+    def search(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """Degrees with a name word starting with `prefix` (all words must match for multi-word queries)."""
+        terms = _WORD.findall(prefix.lower())
+        if not terms:
+            return []
+        words, positions, degrees = self._words, self._positions, self._degrees
+
+        matched = None
+        for term in terms:
+            start = bisect.bisect_left(words, term)
+            hits = set()
+            for i in range(start, len(words)):
+                if not words[i].startswith(term):
+                    break
+                hits.add(positions[i])
+            matched = hits if matched is None else matched & hits
+            if not matched:
+                return []
+
+        query = " ".join(terms)
+
+        def rank(position: int) -> Tuple[bool, str]:
+            name = (degrees[position].get('name') or "").lower()
+            return not name.startswith(query), name
+
+        return [degrees[p] for p in sorted(matched, key=rank)[:limit]]
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(DEGREE_INDEX_REFRESH_SECONDS)
+            try:
+                await self.refresh(await setup_supabase_client())
+            except Exception as e:
+                print(f"Degree index refresh failed: {e}")
+
+    async def start(self):
+        """Loads the index and keeps refreshing it in the background."""
+        try:
+            await self.refresh(await setup_supabase_client())
+            print(f"✅ Degree index loaded: {len(self._degrees)} degrees")
+        except Exception as e:
+            print(f"❌ ERROR: Could not load degree index (will load on first search): {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"loaded": self.loaded, "degrees": len(self._degrees), "words": len(self._words)}
+
+
+degree_index = DegreeIndex()
+
+
 @router.get("/")
 async def get_all_degrees(
+        after: Optional[int] = Query(None, description="Keyset cursor: return degrees with an id greater than this."),
+        limit: Optional[int] = Query(None, ge=1, le=DEGREE_PAGE_MAX, description="Page size; all degrees when omitted."),
+        fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: id,name)."),
         client: Client = Depends(get_supabase_client)
 ):
     """
     Fetches a list of all available degrees (programmes) from the database,
     returning their IDs and names. This is used to populate the dropdown
     in the frontend.
+
+    With ?limit= the list is paged by id (keyset pagination); the X-Next-Cursor
+    header carries the `after` value for the next page and is absent on the last page.
     """
+    select = _parse_fields(fields)
     try:
-        # Fetch all degrees. Assuming the table is named 'degrees' and
+        # Fetch degrees ordered by id. Assuming the table is named 'degrees' and
         # contains 'id' and 'name' columns.
-        query_result = await client.table('degrees') \
-            .select('id, name') \
-            .execute()
-
-        degrees_data = query_result.data
-
-        if not degrees_data:
-            # Return an empty list if the table exists but is empty
-            return []
+        async def fetch_degrees():
+            query = client.table('degrees').select(select).order('id')
+            if after is not None:
+                query = query.gt('id', after)
+            if limit is not None:
+                query = query.limit(limit)
+            query_result = await query.execute()
+            return query_result.data
 
-        return degrees_data
+        # The catalog rarely changes, so pages are served from the read-through cache
+        degrees_data = await cached_read("degree_list", (select, after, limit), fetch_degrees)
 
     except Exception as e:
         print(f"Supabase Read Error during degree fetch: {e}")
         # Return a 500 status code if the database read fails
-        raise HTTPException(status_code=500, detail=f"Database read failed: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Database read failed: {e}")
+
+    if not degrees_data:
+        # Return an empty list if the table exists but is empty
+        return []
+
+    headers = {}
+    if limit is not None and len(degrees_data) == limit:
+        headers["X-Next-Cursor"] = str(degrees_data[-1]['id'])
+    # Rows go straight to orjson; no per-row jsonable_encoder pass
+    return FastJSONResponse(degrees_data, headers=headers)
+
+
+@router.get("/search")
+async def search_degrees(
+        q: str = Query(..., min_length=1, max_length=100),
+        limit: int = Query(10, ge=1, le=50),
+        client: Client = Depends(get_supabase_client)
+):
+    """
+    Typeahead search: degrees whose name has words starting with the query words
+    ("comp sci" matches "Computer Science"), served from the in-memory index.
+    """
+    if not degree_index.loaded:
+        try:
+            await degree_index.refresh(client)
+        except Exception as e:
+            print(f"Supabase Read Error during degree index load: {e}")
+            raise HTTPException(status_code=500, detail=f"Database read failed: {e}")
+    return FastJSONResponse(degree_index.search(q, limit))
@@ -1,102 +1,365 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from supabase import Client
-from database import get_supabase_client
-from typing import Dict, List, Any
+from database import get_supabase_client, setup_supabase_client, cached_read, invalidate
+from job_queue import job_queue, job_accepted
+from typing import Awaitable, Callable, Dict, List, Any, Optional
+from collections import Counter
+import os
+import gzip
 import json
+import asyncio
+import hashlib
+import orjson
+import numpy as np
+import metrics
+from serialization import FastJSONResponse
+from llm_cache import LRUTTLCache
+from shared_cache import shared_cache, SHARED_CACHE_ENABLED
+from graph_layout import compute_layout
+from graph_analytics import compute_centrality
+from graph_model import CompactGraph
+from skill_registry import skill_registry, slug
+from routers.knowledge_graph import knowledge_graph
 
 router = APIRouter(prefix="/api", tags=["Graph Visualization"])
 
-def _build_graph_json(degrees, modules, skills) -> Dict[str, List[Dict[str, Any]]]:
+# Serializes read-modify-write of a degree's stored graph (full rebuilds and incremental updates)
+# within this process; across processes the degree_graphs write is conditional on the version
+# that was read, and a lost race re-reads and retries up to GRAPH_SAVE_ATTEMPTS times
+_graph_locks: Dict[int, asyncio.Lock] = {}
+GRAPH_SAVE_ATTEMPTS = int(os.getenv("GRAPH_SAVE_ATTEMPTS", "3"))
+
+
+class GraphVersionConflict(Exception):
+    """Another process saved a newer version of the degree's graph since it was read."""
+
+
+def _graph_lock(degree_id: int) -> asyncio.Lock:
+    if degree_id not in _graph_locks:
+        _graph_locks[degree_id] = asyncio.Lock()
+    return _graph_locks[degree_id]
+
+
+# Encoded graph cache: degree_id -> pre-serialized (and pre-gzipped) graph for the stored version.
+# Backed by the host-wide shared cache ("graph" namespace: the JSON body), so one worker's
+# Supabase read or save serves the others.
+GRAPH_CACHE_MAX_ENTRIES = int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", "256"))
+# Encoded graphs kept per worker while the shared tier holds the bulk
+GRAPH_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("GRAPH_CACHE_LOCAL_MAX_ENTRIES", "16"))
+GRAPH_CACHE_TTL_SECONDS = float(os.getenv("GRAPH_CACHE_TTL_SECONDS", "3600"))
+GRAPH_GZIP_MIN_BYTES = int(os.getenv("GRAPH_GZIP_MIN_BYTES", "1024"))
+
+_graph_cache = LRUTTLCache(GRAPH_CACHE_LOCAL_MAX_ENTRIES if SHARED_CACHE_ENABLED else GRAPH_CACHE_MAX_ENTRIES,
+                           GRAPH_CACHE_TTL_SECONDS)
+metrics.register_stats("graph_cache", _graph_cache.stats)
+
+
+def _drop_encoded_graph(key: Optional[str], tag: Optional[int] = None):
+    """Another worker saved or invalidated a degree's graph: drop this worker's encoding."""
+    if key is None:
+        _graph_cache.clear()
+    else:
+        _graph_cache.delete(int(key))
+
+
+shared_cache.subscribe("graph", _drop_encoded_graph)
+
+
+class EncodedGraph:
+    """A stored graph serialized once: JSON bytes, optional gzip bytes and its ETag."""
+    __slots__ = ("version", "etag", "body", "gzipped")
+
+    def __init__(self, degree_id: int, graph_data: Dict[str, Any], body: bytes = None):
+        self.version = graph_data.get('version', 0)
+        self.body = body if body is not None else orjson.dumps(graph_data)
+        digest = hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        self.etag = f'"{degree_id}-{self.version}-{digest}"'
+        self.gzipped = gzip.compress(self.body, compresslevel=6) if len(self.body) >= GRAPH_GZIP_MIN_BYTES else None
+
+
+def cache_graph(degree_id: int, graph_data: Dict[str, Any], body: bytes = None) -> EncodedGraph:
+    """Replaces the cached encoding for a degree (called whenever a new version is saved)."""
+    encoded = EncodedGraph(degree_id, graph_data, body)
+    _graph_cache.set(degree_id, encoded)
+    return encoded
+
+
+async def share_graph(degree_id: int, graph_data: Dict[str, Any]) -> EncodedGraph:
+    """Caches a newly saved version here and in the shared cache; other workers drop their old encoding."""
+    encoded = cache_graph(degree_id, graph_data)
+    await shared_cache.invalidate("graph", str(degree_id))
+    await shared_cache.set("graph", str(degree_id), encoded.body, GRAPH_CACHE_TTL_SECONDS)
+    return encoded
+
+
+async def invalidate_graph_cache(degree_id: int):
+    _graph_cache.delete(degree_id)
+    await shared_cache.invalidate("graph", str(degree_id))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _add_skill_node(graph: CompactGraph, skill: Dict[str, Any]) -> int:
+    """
+    Graph node for a skill. Names are resolved (read-only) through the canonical skill
+    registry, so aliases ("python", "Python Fundamentals") share one node; a name
+    the registry has not seen keeps its own node.
+    """
+    canonical = skill_registry.resolve_name(skill['name'])
+    return graph.add_node(f"skill_{slug(canonical)}", canonical, "Skill", skill.get('category', 'Generic'), 10)
+
+
+def _build_graph(degrees, modules, skills) -> CompactGraph:
     """
     Internal function to build the Nodes and Links structure from database query results.
     This logic is extracted from the original GET endpoint.
     """
-    nodes = []
-    links = []
-    added_node_ids = set()
+    graph = CompactGraph()
 
     # A. Process Degrees (Group: "Degree") - Assumes degrees is a list with one item
     for deg in degrees:
-        deg_id = f"deg_{deg['id']}"
-        if deg_id not in added_node_ids:
-            nodes.append({
-                "id": deg_id,
-                "label": deg['name'],
-                "group": "Degree",
-                "val": 30
-            })
-            added_node_ids.add(deg_id)
+        graph.add_node(f"deg_{deg['id']}", deg['name'], "Degree", val=30)
 
     # B. Process Modules (Group: "Module") and Degree -> Module Links
     for mod in modules:
-        mod_id = f"mod_{mod['id']}"
-        deg_id = f"deg_{mod['degree_id']}"
-
-        if mod_id not in added_node_ids:
-            nodes.append({
-                "id": mod_id,
-                "label": mod['name'],
-                "group": "Module",
-                "val": 20
-            })
-            added_node_ids.add(mod_id)
-
-        links.append({
-            "source": deg_id,
-            "target": mod_id,
-            "group": "degree-module"
-        })
+        mod_node = graph.add_node(f"mod_{mod['id']}", mod['name'], "Module", val=20)
+        deg_node = graph.index(f"deg_{mod['degree_id']}")
+        if deg_node is not None:
+            graph.add_link(deg_node, mod_node, "degree-module")
 
     # C. Process Skills (Group: "Skill") and Module -> Skill Links
     for skill in skills:
-        # Use skill name as ID, also prefixed
-        skill_id = f"skill_{skill['name'].replace(' ', '_').lower()}"
-        mod_id = f"mod_{skill['module_id']}"
-
-        if skill_id not in added_node_ids:
-            nodes.append({
-                "id": skill_id,
-                "label": skill['name'],
-                "group": "Skill",
-                "category": skill.get('category', 'Generic'),
-                "val": 10
-            })
-            added_node_ids.add(skill_id)
-
-        links.append({
-            "source": mod_id,
-            "target": skill_id,
-            "group": "module-skill"
-        })
+        mod_node = graph.index(f"mod_{skill['module_id']}")
+        skill_node = _add_skill_node(graph, skill)
+        if mod_node is not None:
+            graph.add_link(mod_node, skill_node, "module-skill")
+
+    return graph
+
+
+def _apply_module_update(graph: CompactGraph, degree_id: int, module: Dict[str, Any],
+                         skills: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Replaces one module's skill links in a stored graph (in place) and adds/removes only
+    the affected nodes. Skill nodes are dropped once no module links to them any more.
+    Returns a diff summary.
+    """
+    diff = {"nodes_added": 0, "nodes_removed": 0, "links_added": 0, "links_removed": 0}
+    nodes_before = len(graph)
+
+    # Module node and its degree link (new modules only)
+    mod_node = graph.index(f"mod_{module['id']}")
+    if mod_node is None:
+        mod_node = graph.add_node(f"mod_{module['id']}", module['name'], "Module", val=20)
+        diff["nodes_added"] += 1
+        nodes_before = len(graph)
+        deg_node = graph.index(f"deg_{degree_id}")
+        if deg_node is not None:
+            graph.add_link(deg_node, mod_node, "degree-module")
+            diff["links_added"] += 1
 
+    # Swap the module's skill links for the new set (skill nodes seen for the first time are added)
+    links = graph.links
+    old_mask = (links[:, 0] == mod_node) & graph.link_mask("module-skill")
+    old_targets = links[old_mask, 1].tolist()
+    new_targets = [_add_skill_node(graph, skill) for skill in skills]
+    diff["nodes_added"] += len(graph) - nodes_before
+
+    old_counts, new_counts = Counter(old_targets), Counter(new_targets)
+    diff["links_removed"] += sum((old_counts - new_counts).values())
+    diff["links_added"] += sum((new_counts - old_counts).values())
+    graph.drop_links(old_mask)
+    for target in new_targets:
+        graph.add_link(mod_node, target, "module-skill")
+
+    # Drop skill nodes that lost their last link
+    orphaned = np.zeros(len(graph), dtype=bool)
+    orphaned[old_targets] = True
+    orphaned[graph.links[:, 1]] = False
+    diff["nodes_removed"] += int(orphaned.sum())
+    graph.drop_nodes(orphaned)
+    return diff
+
+
+def _graph_drift(stored: CompactGraph, rebuilt: CompactGraph) -> Dict[str, int]:
+    """Compares node ids and link multisets of two graphs (used as a consistency check)."""
+    stored_nodes, rebuilt_nodes = set(stored.ids), set(rebuilt.ids)
+    stored_links, rebuilt_links = Counter(stored.link_keys()), Counter(rebuilt.link_keys())
     return {
-        "nodes": nodes,
-        "links": links
+        "missing_nodes": len(rebuilt_nodes - stored_nodes),
+        "extra_nodes": len(stored_nodes - rebuilt_nodes),
+        "missing_links": sum((rebuilt_links - stored_links).values()),
+        "extra_links": sum((stored_links - rebuilt_links).values()),
     }
 
 
-# --- NEW POST ENDPOINT: Calculates and SAVES the graph ---
-@router.post("/degrees/{degree_id}/process-graph", status_code=status.HTTP_201_CREATED)
-async def process_and_save_graph(
-        degree_id: int,
-        client: Client = Depends(get_supabase_client)
-):
+async def _fetch_stored_graph(degree_id: int, client: Client) -> Optional[Dict[str, Any]]:
+    """
+    Returns the stored graph_json for a degree, or None if it has never been processed.
+    Read-through cached; every degree_graphs upsert invalidates the entry.
+    """
+    async def fetch():
+        graph_res = await client.table('degree_graphs') \
+            .select('graph_json') \
+            .eq('degree_id', degree_id) \
+            .limit(1) \
+            .execute()
+        return graph_res.data[0]['graph_json'] if graph_res.data else None
+
+    return await cached_read("stored_graph", degree_id, fetch)
+
+
+async def _save_graph(degree_id: int, graph: CompactGraph, previous: Optional[Dict[str, Any]],
+                      client: Client, relayout: bool = True) -> Dict[str, Any]:
+    """
+    Saves the graph with a version one higher than the previously stored one, only if
+    the stored row still holds that previous version (or still does not exist);
+    raises GraphVersionConflict otherwise. Node positions are precomputed here
+    (warm-started from the previous version) in a worker thread so the event loop stays free;
+    with relayout=False the stored positions are kept and only new nodes are placed.
+    """
+    previous_version = previous.get('version', 0) if previous is not None else None
+    graph.meta['version'] = (previous_version or 0) + 1
+    with metrics.stage("graph_layout"):
+        await asyncio.to_thread(compute_layout, graph, degree_id, previous, relayout)
+    graph_data = graph.to_json()
+    try:
+        with metrics.stage("supabase", "save_graph"):
+            if previous is None:
+                res = await client.table('degree_graphs').upsert(
+                    {
+                        "degree_id": degree_id,
+                        "graph_json": graph_data
+                    },
+                    on_conflict='degree_id',
+                    ignore_duplicates=True
+                ).execute()
+            else:
+                query = client.table('degree_graphs') \
+                    .update({"graph_json": graph_data}) \
+                    .eq('degree_id', degree_id)
+                if 'version' in previous:
+                    query = query.eq('graph_json->>version', str(previous_version))
+                else:
+                    query = query.is_('graph_json->>version', 'null')
+                res = await query.execute()
+
+    except Exception as e:
+        print(f"Supabase Write Error (degree_graphs): {e}")
+        await invalidate_graph_cache(degree_id)
+        raise HTTPException(status_code=500, detail=f"Failed to save processed graph data: {e}")
+    finally:
+        await invalidate("stored_graph", degree_id)
+
+    if not res.data:
+        raise GraphVersionConflict(f"Graph for degree {degree_id} changed since version {previous_version}")
+
+    await share_graph(degree_id, graph_data)
+    knowledge_graph.put_degree(degree_id, graph)
+    return graph_data
+
+
+async def _retry_on_conflict(degree_id: int, operation: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Runs a read-modify-write of the degree's graph, re-reading and retrying when another process won the save."""
+    for attempt in range(1, GRAPH_SAVE_ATTEMPTS + 1):
+        try:
+            return await operation()
+        except GraphVersionConflict as e:
+            print(f"Graph save conflict (attempt {attempt}/{GRAPH_SAVE_ATTEMPTS}): {e}")
+    raise HTTPException(status_code=409,
+                        detail=f"Graph for Degree ID {degree_id} kept changing during the update; retry later.")
+
+
+async def update_graph_for_module(degree_id: int, module_id: int, client: Client) -> Dict[str, Any]:
+    """
+    Incrementally applies one module's current skills to the stored degree graph.
+    Falls back to a full rebuild when no graph has been stored yet.
+    """
+    async with _graph_lock(degree_id):
+        return await _retry_on_conflict(degree_id, lambda: _update_graph_for_module(degree_id, module_id, client))
+
+
+async def _update_graph_for_module(degree_id: int, module_id: int, client: Client) -> Dict[str, Any]:
+    await skill_registry.refresh()
+    try:
+        stored = await _fetch_stored_graph(degree_id, client)
+        if stored is not None:
+            module_res = await client.table('modules').select('id, name').eq('id', module_id).single().execute()
+            skills_res = await client.table('extracted_skills') \
+                .select('name, category, module_id') \
+                .eq('degree_id', degree_id) \
+                .eq('module_id', module_id) \
+                .execute()
+    except Exception as e:
+        print(f"Graph Data Fetch Error during incremental update: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch graph data from Supabase: {e}")
+
+    if stored is None:
+        return await _rebuild_graph(degree_id, client)
+
+    graph = CompactGraph.from_json(stored)
+    diff = _apply_module_update(graph, degree_id, module_res.data, skills_res.data or [])
+    if not any(diff.values()):
+        return {"mode": "incremental", "version": stored.get('version', 0), "diff": diff}
+
+    saved = await _save_graph(degree_id, graph, stored, client, relayout=False)
+    return {
+        "mode": "incremental",
+        "version": saved['version'],
+        "diff": diff,
+        "nodes_count": len(saved['nodes'])
+    }
+
+
+# --- NEW POST ENDPOINT: Queues the graph calculation ---
+@router.post("/degrees/{degree_id}/process-graph", status_code=status.HTTP_202_ACCEPTED)
+async def process_graph_endpoint(degree_id: int):
+    """
+    Queues a graph rebuild for a degree and returns 202 with a job id.
+    Poll GET /api/jobs/{job_id} for the result.
+    """
+    job, created = await job_queue.submit("process_graph", {"degree_id": degree_id}, dedup_key=str(degree_id))
+    return job_accepted(job, created)
+
+
+async def process_and_save_graph(degree_id: int, client: Client):
     """
     Calculates the full graph structure for a degree from its raw components
     (Modules, Skills) and persists the resulting JSON into the degree_graphs table.
+    Rebuilds of one degree run one after another under its graph lock, never shared:
+    a rebuild requested after new skills were written must read them, not join a
+    rebuild that already read the old ones.
+
+    The full rebuild doubles as a consistency check for incremental updates:
+    the response reports any drift between the previously stored graph and the rebuilt one.
     """
+    async with _graph_lock(degree_id):
+        return await _retry_on_conflict(degree_id, lambda: _rebuild_graph(degree_id, client))
+
+
+async def _rebuild_graph(degree_id: int, client: Client):
+    """Full rebuild; callers must hold the degree's graph lock."""
+    await skill_registry.refresh()
     try:
         # 1. Fetch raw data
-        degree_res = await client.table('degrees').select('id, name').eq('id', degree_id).single().execute()
-        degree = degree_res.data
-        degrees = [degree]
+        with metrics.stage("supabase", "graph_rebuild"):
+            degree_res = await client.table('degrees').select('id, name').eq('id', degree_id).single().execute()
+            degree = degree_res.data
+            degrees = [degree]
+
+            modules_res = await client.table('modules').select('id, name, degree_id').eq('degree_id', degree_id).execute()
+            modules = modules_res.data
 
-        modules_res = await client.table('modules').select('id, name, degree_id').eq('degree_id', degree_id).execute()
-        modules = modules_res.data
+            skills_res = await client.table('extracted_skills').select('name, category, module_id') \
+                .eq('degree_id', degree_id).execute()
+            skills = skills_res.data
 
-        skills_res = await client.table('extracted_skills').select('name, category, module_id').eq('degree_id',
-                                                                                                   degree_id).execute()
-        skills = skills_res.data
+        stored = await _fetch_stored_graph(degree_id, client)
 
     except Exception as e:
         if "PostgrestError" in str(e) and "rows not found" in str(e):
@@ -106,38 +369,40 @@ async def process_and_save_graph(
         raise HTTPException(status_code=500, detail=f"Failed to fetch raw graph data from Supabase: {e}")
 
     # 2. Build the graph structure using the internal function
-    graph_data = _build_graph_json(degrees, modules, skills)
+    with metrics.stage("graph_build"):
+        graph = _build_graph(degrees, modules, skills)
 
     # 3. Save the JSON to the new table (Upsert logic to handle updates)
-    try:
-        await client.table('degree_graphs').upsert(
-            {
-                "degree_id": degree_id,
-                "graph_json": graph_data
-            },
-            on_conflict='degree_id'
-        ).execute()
+    graph_data = await _save_graph(degree_id, graph, stored, client)
 
-    except Exception as e:
-        print(f"Supabase Write Error (degree_graphs): {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to save processed graph data: {e}")
+    drift = _graph_drift(CompactGraph.from_json(stored), graph) if stored is not None else None
 
     return {
         "message": f"Graph for Degree ID {degree_id} processed and saved successfully.",
-        "nodes_count": len(graph_data['nodes'])
+        "mode": "full",
+        "version": graph_data['version'],
+        "nodes_count": len(graph_data['nodes']),
+        "consistent": drift is None or not any(drift.values()),
+        "drift": drift
     }
 
 
-# --- UPDATED GET ENDPOINT: Retrieves the SAVED graph JSON ---
-@router.get("/degrees/{degree_id}/graph", response_model=Dict[str, List[Dict[str, Any]]])
-async def get_degree_graph(
-        degree_id: int,  # Capture the degree ID from the path
-        client: Client = Depends(get_supabase_client)
-):
+async def _load_encoded_graph(degree_id: int, client: Client) -> EncodedGraph:
     """
-    Retrieves the pre-calculated knowledge graph structure (Nodes & Links)
-    from the 'degree_graphs' table.
+    Returns the cached encoding of a degree's stored graph: this worker's copy, then the
+    shared cache's, then Supabase's.
     """
+    await shared_cache.sync()
+    encoded = _graph_cache.get(degree_id)
+    if encoded is not None:
+        return encoded
+
+    entry = await shared_cache.get("graph", str(degree_id))
+    if entry is not None:
+        body = entry[0]
+        return cache_graph(degree_id, orjson.loads(body), body)
+
+    token = await shared_cache.token()
     try:
         # Fetch the stored JSON object directly
         graph_res = await client.table('degree_graphs') \
@@ -149,9 +414,6 @@ async def get_degree_graph(
         # The result data contains the graph_json field
         graph_data = graph_res.data
 
-        # Return the actual JSON content stored in the graph_json column
-        return graph_data['graph_json']
-
     except Exception as e:
         # Handle the common Supabase error if the single item is not found (404)
         if "PostgrestError" in str(e) and "rows not found" in str(e):
@@ -159,4 +421,83 @@ async def get_degree_graph(
                                 detail=f"Graph for Degree ID {degree_id} not found. Please run the POST /process-graph endpoint first.")
 
         print(f"Graph Retrieval Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve stored graph data: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve stored graph data: {e}")
+
+    encoded = cache_graph(degree_id, graph_data['graph_json'])
+    await shared_cache.set("graph", str(degree_id), encoded.body, GRAPH_CACHE_TTL_SECONDS, token=token)
+    return encoded
+
+
+async def warm_graph(degree_id: int, client: Client) -> bool:
+    """Loads a degree's stored graph into the encoded graph cache (startup warm-up); False if it has none."""
+    try:
+        await _load_encoded_graph(degree_id, client)
+        return True
+    except HTTPException:
+        return False
+
+
+# --- UPDATED GET ENDPOINT: Retrieves the SAVED graph JSON ---
+@router.get("/degrees/{degree_id}/graph")
+async def get_degree_graph(
+        degree_id: int,  # Capture the degree ID from the path
+        request: Request,
+        client: Client = Depends(get_supabase_client)
+):
+    """
+    Retrieves the pre-calculated knowledge graph structure (Nodes & Links)
+    from the 'degree_graphs' table.
+
+    Served from the encoded graph cache when possible, with an ETag
+    (If-None-Match -> 304) and pre-compressed gzip bytes.
+    """
+    encoded = await _load_encoded_graph(degree_id, client)
+
+    headers = {"ETag": encoded.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), encoded.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # Return the pre-encoded bytes; no per-request validation or serialization
+    if encoded.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=encoded.gzipped, media_type="application/json", headers=headers)
+
+    return Response(content=encoded.body, media_type="application/json", headers=headers)
+
+
+# --- Local graph analytics ---
+_centrality_cache = LRUTTLCache(GRAPH_CACHE_MAX_ENTRIES, GRAPH_CACHE_TTL_SECONDS)
+
+
+@router.get("/degrees/{degree_id}/centrality")
+async def get_degree_centrality(
+        degree_id: int,
+        top_k: int = Query(10, ge=1, le=200),
+        client: Client = Depends(get_supabase_client)
+):
+    """
+    Ranks the skills of a degree's stored graph by degree, weighted degree,
+    PageRank and betweenness, computed locally (cached per graph version).
+    """
+    encoded = await _load_encoded_graph(degree_id, client)
+    cache_key = (degree_id, encoded.version, encoded.etag, top_k)
+
+    result = _centrality_cache.get(cache_key)
+    if result is None:
+        with metrics.stage("graph_centrality", "degree"):
+            graph = CompactGraph.from_json(orjson.loads(encoded.body))
+            result = await asyncio.to_thread(compute_centrality, graph, "Skill", top_k)
+        _centrality_cache.set(cache_key, result)
+
+    return FastJSONResponse({"degree_id": degree_id, "version": encoded.version, **result})
+
+
+# --- Job handler ---
+
+async def _process_graph_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    client = await setup_supabase_client()
+    return await process_and_save_graph(payload["degree_id"], client)
+
+
+job_queue.register("process_graph", _process_graph_job)
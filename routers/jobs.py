@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from job_queue import job_queue
+from serialization import FastJSONResponse
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    Returns the status of a queued job (pending, running, succeeded, failed)
+    together with its result or error once it has finished.
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return FastJSONResponse(job)
@@ -0,0 +1,288 @@
+import os
+import asyncio
+import threading
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from supabase import Client
+from typing import Any, Dict, Iterator, List, Optional
+from database import get_supabase_client
+from serialization import FastJSONResponse
+from skill_registry import skill_registry, slug
+from graph_model import CompactGraph
+
+router = APIRouter(prefix="/api/graph", tags=["Knowledge Graph"])
+
+# Process-wide graph of every stored degree graph (shared skill nodes bridge degrees)
+KNOWLEDGE_GRAPH_PAGE_SIZE = int(os.getenv("KNOWLEDGE_GRAPH_PAGE_SIZE", "200"))
+KNOWLEDGE_GRAPH_MAX_HOPS = int(os.getenv("KNOWLEDGE_GRAPH_MAX_HOPS", "4"))
+
+
+class KnowledgeGraphStore:
+    """
+    Node ids ("deg_1", "mod_7", "skill_python") are interned to integers once; each
+    degree contributes an int32 edge array. The merged graph is a symmetric CSR
+    (indptr/indices plus per-entry link group and direction), rebuilt lazily after a
+    degree changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._labels: List[str] = []
+        self._groups: List[int] = []
+        self._categories: List[Optional[str]] = []
+        self._group_names: List[str] = []          # interned node and link group names
+        self._group_index: Dict[str, int] = {}
+        self._degree_nodes: Dict[int, np.ndarray] = {}
+        self._degree_edges: Dict[int, np.ndarray] = {}   # (E, 3): source, target, link group
+        self._csr = None
+
+    def _intern_group(self, name: str) -> int:
+        code = self._group_index.get(name)
+        if code is None:
+            code = self._group_index[name] = len(self._group_names)
+            self._group_names.append(name)
+        return code
+
+    def _intern_node(self, node_id: str, label: str, group: str, category: Optional[str]) -> int:
+        i = self._index.get(node_id)
+        if i is None:
+            i = self._index[node_id] = len(self._ids)
+            self._ids.append(node_id)
+            self._labels.append(label or node_id)
+            self._groups.append(self._intern_group(group))
+            self._categories.append(category)
+        return i
+
+    def put_degree(self, degree_id: int, graph: CompactGraph):
+        """Replaces one degree's contribution with its graph."""
+        with self._lock:
+            self._put_degree(degree_id, graph)
+
+    def _put_degree(self, degree_id: int, graph: CompactGraph):
+        # Translate the graph's local positions and group codes to store-wide ones, then remap the link array
+        group_names = [graph.group_name(code) for code in graph.groups.tolist()]
+        nodes = np.array([
+            self._intern_node(node_id, label, group, category)
+            for node_id, label, group, category in zip(graph.ids, graph.labels, group_names, graph.categories)
+        ], dtype=np.int32)
+        links = graph.links
+        links = links[links[:, 0] != links[:, 1]]
+        link_groups = np.array([self._intern_group(graph.group_name(code)) for code in range(int(links[:, 2].max()) + 1)]
+                               if len(links) else [], dtype=np.int32)
+        self._degree_nodes[degree_id] = nodes
+        self._degree_edges[degree_id] = np.column_stack(
+            (nodes[links[:, 0]], nodes[links[:, 1]], link_groups[links[:, 2]])
+        ).astype(np.int32).reshape(-1, 3)
+        self._csr = None
+
+    def load(self, graphs: Dict[int, Dict[str, Any]]):
+        """Loads stored graph_json documents."""
+        with self._lock:
+            for degree_id, graph_data in graphs.items():
+                self._put_degree(degree_id, CompactGraph.from_json(graph_data))
+            self._loaded = True
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def _build(self) -> Dict[str, np.ndarray]:
+        n = len(self._ids)
+        edge_blocks = list(self._degree_edges.values())
+        links = np.unique(np.concatenate(edge_blocks), axis=0) if edge_blocks else np.empty((0, 3), dtype=np.int32)
+        node_blocks = list(self._degree_nodes.values())
+        active = np.unique(np.concatenate(node_blocks)) if node_blocks else np.empty(0, dtype=np.int32)
+
+        # Both directions of every link, sorted by row; `forward` remembers the stored direction
+        rows = np.concatenate((links[:, 0], links[:, 1]))
+        cols = np.concatenate((links[:, 1], links[:, 0]))
+        groups = np.concatenate((links[:, 2], links[:, 2]))
+        forward = np.concatenate((np.ones(len(links), dtype=bool), np.zeros(len(links), dtype=bool)))
+        order = np.lexsort((cols, rows))
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n)))).astype(np.int64)
+
+        self._csr = {
+            "indptr": indptr,
+            "indices": cols[order],
+            "link_groups": groups[order],
+            "forward": forward[order],
+            "links": links,
+            "active": active,
+        }
+        return self._csr
+
+    def _snapshot(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return self._csr or self._build()
+
+    def resolve(self, node: str) -> Optional[int]:
+        """Node id lookup; a bare skill name is resolved through the canonical skill registry."""
+        if node in self._index:
+            return self._index[node]
+        canonical = skill_registry.resolve(node)
+        return self._index.get(f"skill_{slug(canonical[1])}") if canonical else None
+
+    def _node(self, i: int, **extra) -> Dict[str, Any]:
+        node = {"id": self._ids[i], "label": self._labels[i], "group": self._group_names[self._groups[i]]}
+        if self._categories[i] is not None:
+            node["category"] = self._categories[i]
+        node.update(extra)
+        return node
+
+    def neighborhood(self, start: int, hops: int, max_nodes: int) -> Dict[str, Any]:
+        """Nodes within `hops` of `start` (breadth-first over the CSR) and the links among them."""
+        csr = self._snapshot()
+        indptr, indices = csr["indptr"], csr["indices"]
+        distance = np.full(len(indptr) - 1, -1, dtype=np.int32)
+        distance[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        selected = [frontier]
+        count, truncated = 1, False
+
+        for hop in range(1, hops + 1):
+            reached = np.unique(indices[_row_positions(indptr, frontier)])
+            reached = reached[distance[reached] < 0]
+            if len(reached) == 0:
+                break
+            if count + len(reached) > max_nodes:
+                reached, truncated = reached[:max_nodes - count], True
+            distance[reached] = hop
+            selected.append(reached)
+            count += len(reached)
+            frontier = reached
+            if truncated:
+                break
+
+        members = np.concatenate(selected)
+        positions = _row_positions(indptr, members)
+        sources = np.repeat(members, indptr[members + 1] - indptr[members])
+        targets = indices[positions]
+        # Keep links inside the selection, once each, in their stored direction
+        keep = (distance[targets] >= 0) & csr["forward"][positions]
+        return {
+            "nodes": [self._node(i, hop=int(distance[i])) for i in members.tolist()],
+            "links": [
+                {"source": self._ids[s], "target": self._ids[t], "group": self._group_names[g]}
+                for s, t, g in zip(sources[keep].tolist(), targets[keep].tolist(),
+                                   csr["link_groups"][positions][keep].tolist())
+            ],
+            "truncated": truncated,
+        }
+
+    def node_id(self, i: int) -> str:
+        return self._ids[i]
+
+    def degrees_of(self, i: int) -> List[int]:
+        with self._lock:
+            return sorted(d for d, nodes in self._degree_nodes.items() if i in nodes)
+
+    def page(self, cursor: int, limit: int) -> Iterator[bytes]:
+        """
+        NDJSON lines for one page of the global graph: a meta line, the page's nodes
+        (in interned order) and every link whose source is one of those nodes.
+        """
+        csr = self._snapshot()
+        active, links = csr["active"], csr["links"]
+        page_nodes = active[cursor:cursor + limit]
+        next_cursor = cursor + limit if cursor + limit < len(active) else None
+        yield orjson.dumps({"type": "meta", "nodes_count": len(active), "links_count": len(links),
+                            "cursor": cursor, "next_cursor": next_cursor}) + b"\n"
+        if len(page_nodes) == 0:
+            return
+        yield b"".join(orjson.dumps({"type": "node", **self._node(i)}) + b"\n" for i in page_nodes.tolist())
+
+        # links are sorted by source, so the page's links are one contiguous slice
+        lo = np.searchsorted(links[:, 0], page_nodes[0], side='left')
+        hi = np.searchsorted(links[:, 0], page_nodes[-1], side='right')
+        for s, t, g in links[lo:hi].tolist():
+            yield orjson.dumps({"type": "link", "source": self._ids[s], "target": self._ids[t],
+                                "group": self._group_names[g]}) + b"\n"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "degrees": len(self._degree_nodes),
+                "interned_nodes": len(self._ids),
+                "links": int(sum(len(e) for e in self._degree_edges.values())),
+            }
+
+
+def _row_positions(indptr: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Positions in `indices` of every entry of the given CSR rows, without a Python loop."""
+    starts, counts = indptr[rows], indptr[rows + 1] - indptr[rows]
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return offsets + np.arange(total)
+
+
+knowledge_graph = KnowledgeGraphStore()
+_load_lock = asyncio.Lock()
+
+
+async def _ensure_loaded(client: Client):
+    """Loads every stored degree graph the first time the store is queried."""
+    if knowledge_graph.loaded:
+        return
+    async with _load_lock:
+        if knowledge_graph.loaded:
+            return
+        graphs: Dict[int, Dict[str, Any]] = {}
+        start = 0
+        try:
+            while True:
+                page = await client.table('degree_graphs') \
+                    .select('degree_id, graph_json') \
+                    .order('degree_id') \
+                    .range(start, start + KNOWLEDGE_GRAPH_PAGE_SIZE - 1) \
+                    .execute()
+                for row in page.data or []:
+                    graphs[row['degree_id']] = row['graph_json']
+                if len(page.data or []) < KNOWLEDGE_GRAPH_PAGE_SIZE:
+                    break
+                start += KNOWLEDGE_GRAPH_PAGE_SIZE
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to load stored graphs: {e}")
+        await asyncio.to_thread(knowledge_graph.load, graphs)
+        print(f"Knowledge graph loaded: {len(graphs)} degrees")
+
+
+@router.get("/neighborhood")
+async def get_neighborhood(
+        node: str,
+        hops: int = Query(1, ge=1, le=KNOWLEDGE_GRAPH_MAX_HOPS),
+        max_nodes: int = Query(500, ge=1, le=10000),
+        client: Client = Depends(get_supabase_client)
+):
+    """
+    The k-hop subgraph around a node across all degrees, e.g. every module and degree
+    that teaches a skill (node=skill_python or node=Python, hops=2).
+    """
+    await _ensure_loaded(client)
+    await skill_registry.refresh()
+    start = knowledge_graph.resolve(node)
+    if start is None:
+        raise HTTPException(status_code=404, detail=f"Node '{node}' not found in any stored graph")
+    result = await asyncio.to_thread(knowledge_graph.neighborhood, start, hops, max_nodes)
+    return FastJSONResponse({"node": knowledge_graph.node_id(start), "hops": hops,
+                             "degrees": knowledge_graph.degrees_of(start), **result})
+
+
+@router.get("")
+async def get_global_graph(
+        cursor: int = Query(0, ge=0),
+        limit: int = Query(1000, ge=1, le=20000),
+        client: Client = Depends(get_supabase_client)
+):
+    """
+    The merged graph of every degree, streamed as NDJSON one page at a time.
+    Follow `next_cursor` from the first (meta) line until it is null.
+    """
+    await _ensure_loaded(client)
+    return StreamingResponse(knowledge_graph.page(cursor, limit), media_type="application/x-ndjson")
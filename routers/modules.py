@@ -1,34 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import asyncio
+from fastapi import APIRouter, HTTPException, status
 from supabase import Client
-from database import get_supabase_client
-from clients.gemini_client import generate_json
+from typing import List, Dict, Any
+from database import setup_supabase_client, cached_read, invalidate
+import metrics
+from clients.gemini_client import generate_json, GeminiGenerationError
+from job_queue import job_queue, job_accepted
+from routers.grapgh import update_graph_for_module, process_and_save_graph
+from prompt_builder import estimate_tokens
+from skill_registry import skill_registry
+from routers.similarity import index_module_skills
 
 router = APIRouter(prefix="/api/modules", tags=["Modules"])
 
+# Degree-wide batch extraction lives under /api/degrees but shares this module's helpers
+degree_router = APIRouter(prefix="/api/degrees", tags=["Modules"])
 
-@router.post("/{module_id}/process")
-async def process_module(
-        module_id: int,
-        client: Client = Depends(get_supabase_client)
-):
-    # 1. Fetch Module Details from Supabase
-    try:
+# Batch packing: modules per prompt are capped by an estimated token budget and a hard count
+BATCH_PROMPT_TOKEN_BUDGET = int(os.getenv("BATCH_PROMPT_TOKEN_BUDGET", "6000"))
+BATCH_MAX_MODULES = int(os.getenv("BATCH_MAX_MODULES", "10"))
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "3"))
+
+
+def _skill_rows(degree_id: int, module_id: int, skills: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Maps AI skill dicts to extracted_skills rows."""
+    return [
+        {
+            "degree_id": degree_id,
+            "module_id": module_id,
+            "name": skill['name'],
+            "category": skill['category'],
+            "description": skill.get('description', '')
+        }
+        for skill in skills
+    ]
+
+
+@router.post("/{module_id}/process", status_code=status.HTTP_202_ACCEPTED)
+async def process_module(module_id: int):
+    """
+    Queues skill extraction for a module and returns 202 with a job id.
+    Poll GET /api/jobs/{job_id} for the result.
+    """
+    job, created = await job_queue.submit("process_module", {"module_id": module_id}, dedup_key=str(module_id))
+    return job_accepted(job, created)
+
+
+async def run_process_module(module_id: int, client: Client) -> Dict[str, Any]:
+    """Fetches a module, extracts its skills with Gemini and upserts them (runs as a job)."""
+    # 1. Fetch Module Details from Supabase (read-through cached; modules rarely change)
+    async def fetch_module():
         # Fetch module and the name of the degree it belongs to
         response = await client.table('modules') \
             .select('id, name, description, degree_id(id, name)') \
             .eq('id', module_id) \
             .single() \
             .execute()
+        return response.data
 
-        module_data = response.data
+    try:
+        module_data = await cached_read("module", module_id, fetch_module)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Supabase Read Error: {e}")
 
     if not module_data:
         raise HTTPException(status_code=404, detail="Module not found")
 
-    # Unwrap nested degree data
-    degree = module_data.pop('degree_id')  # remove degree_id obj from module_data
+    # Unwrap nested degree data (the cached row itself is shared, so it is not modified)
+    degree = module_data['degree_id']
 
     # 2. Construct Prompt for Gemini
     prompt = f"""
@@ -47,33 +87,234 @@ async def process_module(
     """
 
     # 3. Call AI
-    ai_result = await generate_json(prompt)
+    try:
+        ai_result = await generate_json(prompt, degree_id=degree['id'])
+    except GeminiGenerationError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
     if not ai_result or "skills" not in ai_result:
         return {"message": "AI returned no skills", "data": []}
 
-    # 4. Prepare Data for Database Insert
-    skills_to_insert = []
-    for skill in ai_result['skills']:
-        skills_to_insert.append({
-            "degree_id": degree['id'],
-            "module_id": module_id,
-            "name": skill['name'],
-            "category": skill['category'],
-            "description": skill.get('description', '')
-        })
+    # 4. Prepare Data for Database Insert (names registered with the canonical skill registry)
+    try:
+        skills = await asyncio.to_thread(skill_registry.canonicalize_skills, ai_result['skills'])
+    except (KeyError, TypeError) as e:
+        raise HTTPException(status_code=502, detail=f"Malformed AI skill data: {e}")
+    skills_to_insert = _skill_rows(degree['id'], module_id, skills)
 
     # 5. Save to Supabase (Upsert to avoid duplicates)
     try:
-        await client.table('extracted_skills') \
-            .upsert(skills_to_insert, on_conflict='degree_id, module_id, name') \
-            .execute()
+        with metrics.stage("supabase", "upsert_skills"):
+            await client.table('extracted_skills') \
+                .upsert(skills_to_insert, on_conflict='degree_id, module_id, name') \
+                .execute()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Supabase Write Error: {e}")
+    finally:
+        await invalidate("detailed_skills", degree['id'])
+
+    # 6. Apply the module's skills to the similarity index and the stored degree graph
+    #    (both incremental; neither fails the extraction)
+    await index_module_skills(degree['id'], {module_id: [row['name'] for row in skills_to_insert]})
+    graph_update = await _refresh_graph(update_graph_for_module(degree['id'], module_id, client))
 
     return {
         "status": "success",
         "module": module_data['name'],
         "skills_extracted": len(skills_to_insert),
-        "skills": skills_to_insert
-    }
\ No newline at end of file
+        "skills": skills_to_insert,
+        "graph": graph_update
+    }
+
+
+async def _refresh_graph(update) -> Dict[str, Any]:
+    """Awaits a graph update, reporting failures instead of raising them."""
+    try:
+        return await update
+    except HTTPException as e:
+        return {"status": "failed", "error": e.detail}
+    except Exception as e:
+        print(f"Graph update after module processing failed: {e}")
+        return {"status": "failed", "error": str(e)}
+
+
+# --- Degree-wide batch extraction ---
+
+def _module_block(module: Dict[str, Any]) -> str:
+    return (
+        f"Module ID: {module['id']}\n"
+        f"Module Name: {module['name']}\n"
+        f"Description: {module.get('description') or 'No description'}"
+    )
+
+
+def _pack_modules(modules: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Greedily packs modules into batches that fit the prompt token budget."""
+    batches, current, current_tokens = [], [], 0
+    for module in modules:
+        tokens = estimate_tokens(_module_block(module))
+        if current and (current_tokens + tokens > BATCH_PROMPT_TOKEN_BUDGET or len(current) >= BATCH_MAX_MODULES):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(module)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _build_batch_prompt(degree_name: str, modules: List[Dict[str, Any]]) -> str:
+    blocks = "\n\n".join(_module_block(module) for module in modules)
+    return f"""
+    You are a curriculum analyst. Extract key skills from each of these academic modules.
+
+    Degree Context: {degree_name}
+
+    {blocks}
+
+    Return JSON format, with one entry per module using its Module ID:
+    {{
+        "modules": [
+            {{
+                "module_id": 123,
+                "skills": [
+                    {{ "name": "Skill Name", "category": "Technical" or "Soft", "description": "Brief reason" }}
+                ]
+            }}
+        ]
+    }}
+    """
+
+
+@degree_router.post("/{degree_id}/process-modules", status_code=status.HTTP_202_ACCEPTED)
+async def process_degree_modules(degree_id: int):
+    """
+    Queues skill extraction for every module of a degree and returns 202 with a job id.
+    Poll GET /api/jobs/{job_id} for per-module results.
+    """
+    job, created = await job_queue.submit("process_degree_modules", {"degree_id": degree_id},
+                                          dedup_key=str(degree_id))
+    return job_accepted(job, created)
+
+
+async def run_process_degree_modules(degree_id: int, client: Client) -> Dict[str, Any]:
+    """
+    Extracts skills for every module of a degree: one module query, several modules
+    packed per Gemini prompt (run with bounded parallelism), and one bulk upsert.
+    Reports success or failure per module.
+    """
+    # 1. Fetch all modules of the degree in one query
+    try:
+        response = await client.table('modules') \
+            .select('id, name, description, degree_id(id, name)') \
+            .eq('degree_id', degree_id) \
+            .execute()
+
+        modules = response.data
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Supabase Read Error: {e}")
+
+    if not modules:
+        raise HTTPException(status_code=404, detail=f"No modules found for Degree ID {degree_id}")
+
+    degree_name = modules[0]['degree_id']['name']
+    batches = _pack_modules(modules)
+
+    # 2. Run the batches with bounded parallelism
+    semaphore = asyncio.Semaphore(BATCH_PARALLELISM)
+
+    async def extract(batch):
+        async with semaphore:
+            try:
+                return await generate_json(_build_batch_prompt(degree_name, batch), degree_id=degree_id)
+            except GeminiGenerationError as e:
+                return e
+
+    ai_results = await asyncio.gather(*[extract(batch) for batch in batches])
+
+    # Every batch failing means Gemini is unavailable: fail the request so the job can be retried
+    if all(isinstance(ai_result, GeminiGenerationError) for ai_result in ai_results):
+        raise HTTPException(status_code=502, detail=str(ai_results[0]))
+
+    # 3. Match results back to modules
+    rows_by_key = {}
+    results = []
+    for batch, ai_result in zip(batches, ai_results):
+        if isinstance(ai_result, GeminiGenerationError):
+            results.extend({"module_id": module['id'], "module": module['name'],
+                            "status": "failed", "error": str(ai_result)} for module in batch)
+            continue
+        extracted = {}
+        for entry in (ai_result or {}).get("modules", []):
+            try:
+                extracted[int(entry["module_id"])] = entry.get("skills", [])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        for module in batch:
+            skills = extracted.get(module['id'])
+            if not skills:
+                results.append({"module_id": module['id'], "module": module['name'],
+                                "status": "failed", "error": "AI returned no skills"})
+                continue
+            try:
+                skills = await asyncio.to_thread(skill_registry.canonicalize_skills, skills)
+                rows = _skill_rows(degree_id, module['id'], skills)
+            except (KeyError, TypeError) as e:
+                results.append({"module_id": module['id'], "module": module['name'],
+                                "status": "failed", "error": f"Malformed AI skill data: {e}"})
+                continue
+            # Drop duplicates within the statement so the upsert cannot hit the same row twice
+            for row in rows:
+                rows_by_key[(row['module_id'], row['name'])] = row
+            results.append({"module_id": module['id'], "module": module['name'],
+                            "status": "success", "skills_extracted": len(rows)})
+
+    # 4. Save everything with one bulk upsert
+    skills_to_insert = list(rows_by_key.values())
+    if skills_to_insert:
+        try:
+            with metrics.stage("supabase", "upsert_skills"):
+                await client.table('extracted_skills') \
+                    .upsert(skills_to_insert, on_conflict='degree_id, module_id, name') \
+                    .execute()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Supabase Write Error: {e}")
+        finally:
+            await invalidate("detailed_skills", degree_id)
+
+        names_by_module: Dict[int, List[str]] = {}
+        for row in skills_to_insert:
+            names_by_module.setdefault(row['module_id'], []).append(row['name'])
+        await index_module_skills(degree_id, names_by_module)
+
+    # 5. Many modules changed at once, so rebuild the degree graph in full
+    graph_update = await _refresh_graph(process_and_save_graph(degree_id, client)) if skills_to_insert else None
+
+    succeeded = sum(1 for r in results if r['status'] == 'success')
+    return {
+        "status": "success" if succeeded == len(results) else "partial" if succeeded else "failed",
+        "degree_id": degree_id,
+        "modules_processed": len(results),
+        "modules_succeeded": succeeded,
+        "batches": len(batches),
+        "skills_extracted": len(skills_to_insert),
+        "results": results,
+        "graph": graph_update
+    }
+
+
+# --- Job handlers ---
+
+async def _process_module_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    client = await setup_supabase_client()
+    return await run_process_module(payload["module_id"], client)
+
+
+async def _process_degree_modules_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    client = await setup_supabase_client()
+    return await run_process_degree_modules(payload["degree_id"], client)
+
+
+job_queue.register("process_module", _process_module_job)
+job_queue.register("process_degree_modules", _process_degree_modules_job)
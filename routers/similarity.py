@@ -0,0 +1,436 @@
+import os
+import json
+import shutil
+import asyncio
+import threading
+from contextlib import contextmanager
+import numpy as np
+from scipy import sparse
+from fastapi import APIRouter, HTTPException, Query
+from supabase import Client
+from typing import Any, Dict, List, Optional, Tuple
+from database import setup_supabase_client
+from job_queue import job_queue, SUCCEEDED, FAILED
+from serialization import FastJSONResponse
+from skill_registry import skill_registry
+
+try:
+    import fcntl
+except ImportError:  # Windows: msvcrt byte-range locks, exclusive only
+    fcntl = None
+    import msvcrt
+
+router = APIRouter(prefix="/api", tags=["Similarity"])
+
+# TF-IDF index over extracted skills: one row per module, one column per canonical skill
+SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", ".cache/similarity")
+SIMILARITY_PAGE_SIZE = int(os.getenv("SIMILARITY_PAGE_SIZE", "1000"))
+SIMILARITY_SHARED_SKILLS = int(os.getenv("SIMILARITY_SHARED_SKILLS", "5"))
+# The delta log is folded into a new base snapshot once it grows past this size
+SIMILARITY_COMPACT_BYTES = int(os.getenv("SIMILARITY_COMPACT_BYTES", str(4 * 1024 * 1024)))
+# How long a query waits for the first (background) load of the index before answering 503
+SIMILARITY_BOOTSTRAP_WAIT_SECONDS = float(os.getenv("SIMILARITY_BOOTSTRAP_WAIT_SECONDS", "30"))
+
+_ARRAYS = ("module_ids", "module_degrees", "indptr", "indices")
+
+
+def _lock_file(f, exclusive: bool):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue  # LK_LOCK gives up after ~10 s of retries; keep waiting
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SimilarityIndex:
+    """
+    Module -> canonical skill ids, kept per row so a processed module only replaces
+    its own row. The weighted TF-IDF matrices are derived from those rows on demand
+    (a vectorized O(nnz) pass) and cached until the next update.
+
+    On disk: a base snapshot of flat .npy arrays (loaded memory-mapped) plus an
+    append-only delta log of replaced rows, both named by generation in meta.json.
+    An update appends only its own modules' rows; once the log passes
+    SIMILARITY_COMPACT_BYTES it is folded into a new base generation. Workers sharing
+    the directory take an exclusive file lock to write (catching up on the log first,
+    so no worker's rows are overwritten) and replay the log tail before answering
+    when it has grown.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._rows: Dict[int, np.ndarray] = {}      # module_id -> sorted canonical skill ids
+        self._degrees: Dict[int, int] = {}          # module_id -> degree_id
+        self._bootstrapped = False                  # rows cover every module in extracted_skills
+        self._matrices = None
+        self._generation = 0
+        self._offset = 0                            # bytes of the delta log already applied
+
+    # --- persistence ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _base_path(self, generation: int, name: str) -> str:
+        return self._path(os.path.join(f"base-{generation}", f"{name}.npy"))
+
+    def _log_path(self, generation: int) -> str:
+        return self._path(f"delta-{generation}.log")
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Cross-process lock on the index directory (shared to read files, exclusive to write)."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path("lock"), "a+") as f:
+            _lock_file(f, exclusive)
+            try:
+                yield
+            finally:
+                _unlock_file(f)
+
+    def _stale(self) -> bool:
+        """True when the files hold changes this process has not applied (one stat call)."""
+        if not self._loaded:
+            return True
+        try:
+            return os.stat(self._log_path(self._generation)).st_size != self._offset
+        except FileNotFoundError:
+            return True  # compacted into a newer generation
+
+    def _sync(self):
+        """Applies the files' changes to the in-memory rows; the caller holds the file lock."""
+        try:
+            with open(self._path("meta.json")) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            meta = {}
+        generation = meta.get("generation", 0)
+        if not self._loaded or generation != self._generation:
+            # An index written before the generation layout is rebuilt by the bootstrap
+            self._load_base(generation, "generation" in meta and meta.get("bootstrapped", False))
+        self._replay()
+        self._loaded = True
+        self._matrices = None
+
+    def _load_base(self, generation: int, bootstrapped: bool):
+        self._rows, self._degrees = {}, {}
+        self._generation, self._offset, self._bootstrapped = generation, 0, bootstrapped
+        try:
+            arrays = {name: np.load(self._base_path(generation, name), mmap_mode='r') for name in _ARRAYS}
+        except (FileNotFoundError, ValueError):
+            return
+        indptr, indices = arrays["indptr"], arrays["indices"]
+        for row, (module_id, degree_id) in enumerate(zip(arrays["module_ids"].tolist(),
+                                                         arrays["module_degrees"].tolist())):
+            # Row views slice the memory-mapped file; nothing is copied until a row is replaced
+            self._rows[module_id] = indices[indptr[row]:indptr[row + 1]]
+            self._degrees[module_id] = degree_id
+
+    def _replay(self):
+        """Applies complete delta log records past the last applied offset."""
+        try:
+            with open(self._log_path(self._generation), "rb") as f:
+                f.seek(self._offset)
+                tail = f.read()
+        except FileNotFoundError:
+            return
+        complete = tail[:tail.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            self._apply(json.loads(line))
+        self._offset += len(complete)
+
+    def _apply(self, record: Dict[str, Any]):
+        for module_id, degree_id, skill_ids in record["rows"]:
+            self._rows[module_id] = np.asarray(skill_ids, dtype=np.int32)
+            self._degrees[module_id] = degree_id
+        self._bootstrapped = self._bootstrapped or record.get("bootstrap", False)
+
+    def _append(self, record: Dict[str, Any]):
+        """Appends one record to the delta log; the caller holds the exclusive file lock."""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with open(self._log_path(self._generation), "ab") as f:
+            f.write(line)
+        self._offset += len(line)
+
+    def _compact(self):
+        """Writes the current rows as the next base generation and drops the old base and log."""
+        module_ids = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+        rows = list(self._rows.values())
+        arrays = {
+            "module_ids": module_ids,
+            "module_degrees": np.array([self._degrees[m] for m in module_ids.tolist()], dtype=np.int64),
+            "indptr": np.concatenate(([0], np.cumsum([len(r) for r in rows]))).astype(np.int64),
+            "indices": np.concatenate(rows).astype(np.int32) if rows else np.empty(0, dtype=np.int32),
+        }
+        previous, generation = self._generation, self._generation + 1
+        os.makedirs(self._path(f"base-{generation}"), exist_ok=True)
+        for name, array in arrays.items():
+            with open(self._base_path(generation, name), "wb") as f:
+                np.save(f, array)
+        open(self._log_path(generation), "wb").close()
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"generation": generation, "bootstrapped": self._bootstrapped, "modules": len(module_ids)}, f)
+        os.replace(tmp, self._path("meta.json"))
+        self._generation, self._offset = generation, 0
+        # Readers that still map the old base keep their views (unlinked files stay mapped)
+        shutil.rmtree(self._path(f"base-{previous}"), ignore_errors=True)
+        try:
+            os.remove(self._log_path(previous))
+        except FileNotFoundError:
+            pass
+
+    def _current(self):
+        """Catches up with other workers' changes if the files moved on; the caller holds self._lock."""
+        if self._stale():
+            with self._file_lock(exclusive=False):
+                self._sync()
+
+    # --- updates ---
+
+    def needs_bootstrap(self) -> bool:
+        with self._lock:
+            self._current()
+            return not self._bootstrapped
+
+    def update_modules(self, entries: List[Tuple[int, int, List[str]]], bootstrap: bool = False):
+        """
+        Adds skills for (degree_id, module_id, skill names) entries and appends the changed
+        rows to the delta log. Skills are merged into the module's existing row, mirroring
+        the extracted_skills upsert; a bootstrap load from the database replaces rows instead.
+        """
+        canonical = iter(skill_registry.register_many([name for _, _, names in entries for name in names]))
+        resolved = [(degree_id, module_id, [next(canonical)[0] for _ in names])
+                    for degree_id, module_id, names in entries]
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            changed = []
+            for degree_id, module_id, skill_ids in resolved:
+                existing = self._rows.get(module_id) if not bootstrap else None
+                merged = skill_ids if existing is None else np.concatenate((existing, skill_ids))
+                row = np.unique(np.asarray(merged, dtype=np.int32))
+                changed.append([module_id, degree_id, row.tolist()])
+            record = {"rows": changed, "bootstrap": bootstrap}
+            self._apply(record)
+            self._append(record)
+            if self._offset > SIMILARITY_COMPACT_BYTES:
+                self._compact()
+
+    # --- queries ---
+
+    def _build(self):
+        """L2-normalized TF-IDF matrices for modules and degrees (degree = sum of its modules)."""
+        module_ids = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+        rows = list(self._rows.values())
+        lengths = np.array([len(r) for r in rows], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        skill_ids = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+
+        vocab, columns = np.unique(skill_ids, return_inverse=True)
+        df = np.bincount(columns, minlength=len(vocab))
+        idf = np.log((1 + len(rows)) / (1 + df)) + 1.0
+        modules = sparse.csr_matrix((idf[columns], columns, indptr), shape=(len(rows), len(vocab)))
+        modules = _normalize_rows(modules)
+
+        degree_of_row = np.array([self._degrees[m] for m in module_ids.tolist()], dtype=np.int64)
+        degree_ids, degree_rows = np.unique(degree_of_row, return_inverse=True)
+        membership = sparse.csr_matrix(
+            (np.ones(len(rows)), (degree_rows, np.arange(len(rows)))), shape=(len(degree_ids), len(rows))
+        )
+        degrees = _normalize_rows(membership @ modules)
+
+        self._matrices = {
+            "vocab": vocab,
+            "modules": modules,
+            "module_ids": module_ids,
+            "module_row": {m: i for i, m in enumerate(module_ids.tolist())},
+            "module_degrees": degree_of_row,
+            "degrees": degrees,
+            "degree_ids": degree_ids,
+            "degree_row": {d: i for i, d in enumerate(degree_ids.tolist())},
+        }
+        return self._matrices
+
+    def _snapshot(self):
+        with self._lock:
+            self._current()
+            return self._matrices or self._build()
+
+    def similar_modules(self, module_id: int, top_k: int, exclude_same_degree: bool = False) -> Optional[List[Dict]]:
+        m = self._snapshot()
+        row = m["module_row"].get(module_id)
+        if row is None:
+            return None
+        scores = _scores(m["modules"], m["modules"][row])
+        scores[row] = -1.0
+        if exclude_same_degree:
+            scores[m["module_degrees"] == m["module_degrees"][row]] = -1.0
+        return [
+            {
+                "module_id": int(m["module_ids"][i]),
+                "degree_id": int(m["module_degrees"][i]),
+                "score": round(float(scores[i]), 4),
+                "shared_skills": _shared_skills(m, m["modules"][row], m["modules"][i]),
+            }
+            for i in _top_k(scores, top_k)
+        ]
+
+    def similar_degrees(self, degree_id: int, top_k: int) -> Optional[List[Dict]]:
+        m = self._snapshot()
+        row = m["degree_row"].get(degree_id)
+        if row is None:
+            return None
+        scores = _scores(m["degrees"], m["degrees"][row])
+        scores[row] = -1.0
+        return [
+            {
+                "degree_id": int(m["degree_ids"][i]),
+                "score": round(float(scores[i]), 4),
+                "shared_skills": _shared_skills(m, m["degrees"][row], m["degrees"][i]),
+            }
+            for i in _top_k(scores, top_k)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._current()
+            return {
+                "modules": len(self._rows),
+                "degrees": len(set(self._degrees.values())),
+                "entries": int(sum(len(r) for r in self._rows.values())),
+            }
+
+
+def _normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.csr_matrix(sparse.diags(inv) @ matrix)
+
+
+def _scores(matrix: sparse.csr_matrix, query: sparse.csr_matrix) -> np.ndarray:
+    """Cosine similarity of one normalized row against every row (one sparse mat-vec)."""
+    return np.asarray((matrix @ query.T).todense()).ravel()
+
+
+def _top_k(scores: np.ndarray, k: int) -> List[int]:
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")].tolist()
+
+
+def _shared_skills(m: Dict[str, Any], a: sparse.csr_matrix, b: sparse.csr_matrix) -> List[str]:
+    """Names of the shared skills contributing most to the similarity."""
+    overlap = a.multiply(b).tocoo()
+    order = np.argsort(-overlap.data)[:SIMILARITY_SHARED_SKILLS]
+    return [skill_registry.name(int(m["vocab"][c])) for c in overlap.col[order]]
+
+
+similarity_index = SimilarityIndex(SIMILARITY_INDEX_DIR)
+_bootstrap_lock = asyncio.Lock()
+
+
+async def _ensure_index():
+    """
+    Makes sure every module's skills from extracted_skills are in the index before it is
+    queried. Loading registers skill names, so it runs as a background job rather than in
+    the GET request; the request waits up to SIMILARITY_BOOTSTRAP_WAIT_SECONDS for it.
+    """
+    if not await asyncio.to_thread(similarity_index.needs_bootstrap):
+        return
+    job, _ = await job_queue.submit("similarity_bootstrap", {}, dedup_key="similarity")
+    job = await job_queue.wait(job["id"], SIMILARITY_BOOTSTRAP_WAIT_SECONDS)
+    if job is not None and job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Similarity index build failed: {job['error']}")
+    if job is None or job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=503, detail="Similarity index is being built; retry shortly.",
+                            headers={"Retry-After": "5"})
+
+
+async def _bootstrap_index(client: Client) -> int:
+    """Loads every module's skills from extracted_skills into the index; returns the number of modules."""
+    async with _bootstrap_lock:
+        if not await asyncio.to_thread(similarity_index.needs_bootstrap):
+            return 0
+        skills_by_module: Dict[int, Tuple[int, List[str]]] = {}
+        start = 0
+        try:
+            while True:
+                page = await client.table('extracted_skills') \
+                    .select('degree_id, module_id, name') \
+                    .order('id') \
+                    .range(start, start + SIMILARITY_PAGE_SIZE - 1) \
+                    .execute()
+                for row in page.data or []:
+                    skills_by_module.setdefault(row['module_id'], (row['degree_id'], []))[1].append(row['name'])
+                if len(page.data or []) < SIMILARITY_PAGE_SIZE:
+                    break
+                start += SIMILARITY_PAGE_SIZE
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Supabase Read Error: {e}")
+        entries = [(degree_id, module_id, names) for module_id, (degree_id, names) in skills_by_module.items()]
+        await asyncio.to_thread(similarity_index.update_modules, entries, True)
+        if entries:
+            print(f"Similarity index built: {len(entries)} modules")
+        return len(entries)
+
+
+async def index_module_skills(degree_id: int, module_rows: Dict[int, List[str]]):
+    """Folds freshly extracted skills ({module_id: names}) into the index; never fails the caller."""
+    try:
+        await asyncio.to_thread(similarity_index.update_modules,
+                                [(degree_id, module_id, names) for module_id, names in module_rows.items()])
+    except Exception as e:
+        print(f"Similarity index update failed: {e}")
+
+
+@router.get("/modules/{module_id}/similar")
+async def get_similar_modules(
+        module_id: int,
+        top_k: int = Query(10, ge=1, le=100),
+        exclude_same_degree: bool = False
+):
+    """Modules whose extracted skills overlap most with this module's (TF-IDF cosine similarity)."""
+    await _ensure_index()
+    similar = await asyncio.to_thread(similarity_index.similar_modules, module_id, top_k, exclude_same_degree)
+    if similar is None:
+        raise HTTPException(status_code=404, detail=f"No extracted skills for Module ID {module_id}")
+    return FastJSONResponse({"module_id": module_id, "similar": similar})
+
+
+@router.get("/degrees/{degree_id}/similar")
+async def get_similar_degrees(
+        degree_id: int,
+        top_k: int = Query(10, ge=1, le=100)
+):
+    """Degrees that teach the most similar skill profile (TF-IDF cosine similarity over all their modules)."""
+    await _ensure_index()
+    similar = await asyncio.to_thread(similarity_index.similar_degrees, degree_id, top_k)
+    if similar is None:
+        raise HTTPException(status_code=404, detail=f"No extracted skills for Degree ID {degree_id}")
+    return FastJSONResponse({"degree_id": degree_id, "similar": similar})
+
+
+# --- Job handler ---
+
+async def _bootstrap_index_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    client = await setup_supabase_client()
+    return {"modules": await _bootstrap_index(client)}
+
+
+job_queue.register("similarity_bootstrap", _bootstrap_index_job)
@@ -0,0 +1,46 @@
+from functools import lru_cache
+from typing import Any, List, Type, TypeVar
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    """orjson fallback for the few types it does not know natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes via orjson (NumPy arrays and scalars, non-str keys and pydantic models included)."""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. Returning one directly from an endpoint also
+    skips FastAPI's jsonable_encoder walk, which otherwise visits every value in Python.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[ModelT]) -> TypeAdapter:
+    """TypeAdapter for List[model], built once per model."""
+    return TypeAdapter(List[model])
+
+
+def validate_rows(model: Type[ModelT], rows: List[Any]) -> List[ModelT]:
+    """Validates a whole list of rows in one call into pydantic-core instead of one model(**row) per row."""
+    return list_adapter(model).validate_python(rows)
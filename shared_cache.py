@@ -0,0 +1,344 @@
+import os
+import time
+import zlib
+import sqlite3
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import orjson
+from serialization import dumps
+
+# Host-wide cache tier shared by every uvicorn worker: one SQLite file in WAL mode.
+# Per-process caches stay small and in front of it (their *_LOCAL_MAX_ENTRIES sizes while
+# this is enabled); this holds the bulk, once per host.
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true"
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", ".cache/shared_cache.sqlite3")
+SHARED_CACHE_MAX_BYTES = int(os.getenv("SHARED_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+SHARED_CACHE_COMPRESS_MIN_BYTES = int(os.getenv("SHARED_CACHE_COMPRESS_MIN_BYTES", "1024"))
+# How often a worker polls for invalidations made by the others (bounds cross-worker staleness)
+SHARED_CACHE_SYNC_SECONDS = float(os.getenv("SHARED_CACHE_SYNC_SECONDS", "1.0"))
+# Reads refresh an entry's LRU position at most this often, to keep reads from turning into writes
+SHARED_CACHE_TOUCH_SECONDS = float(os.getenv("SHARED_CACHE_TOUCH_SECONDS", "10"))
+SHARED_CACHE_LOG_RETENTION_SECONDS = float(os.getenv("SHARED_CACHE_LOG_RETENTION_SECONDS", "86400"))
+
+# Eviction trims to this fraction of max_bytes, so it runs in batches rather than on every write
+_LOW_WATERMARK = 0.9
+_EVICT_BATCH = 64
+
+# First byte of a stored value: JSON or raw bytes, each optionally zlib-compressed
+_JSON, _JSON_Z, _RAW, _RAW_Z = b"j", b"J", b"b", b"B"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_cache (
+    namespace TEXT NOT NULL, key TEXT NOT NULL, tag INTEGER, value BLOB NOT NULL, size INTEGER NOT NULL,
+    expires_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key));
+CREATE INDEX IF NOT EXISTS shared_cache_lru ON shared_cache(accessed_at);
+CREATE INDEX IF NOT EXISTS shared_cache_tag ON shared_cache(namespace, tag);
+CREATE TABLE IF NOT EXISTS shared_cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL, entries INTEGER NOT NULL);
+INSERT OR IGNORE INTO shared_cache_size (id, bytes, entries) VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS shared_cache_insert AFTER INSERT ON shared_cache BEGIN
+    UPDATE shared_cache_size SET bytes = bytes + NEW.size, entries = entries + 1; END;
+CREATE TRIGGER IF NOT EXISTS shared_cache_delete AFTER DELETE ON shared_cache BEGIN
+    UPDATE shared_cache_size SET bytes = bytes - OLD.size, entries = entries - 1; END;
+CREATE TRIGGER IF NOT EXISTS shared_cache_update AFTER UPDATE OF size ON shared_cache BEGIN
+    UPDATE shared_cache_size SET bytes = bytes + NEW.size - OLD.size; END;
+CREATE TABLE IF NOT EXISTS shared_cache_invalidations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT NOT NULL, key TEXT, tag INTEGER,
+    origin INTEGER NOT NULL, at REAL NOT NULL);
+"""
+
+# Called with (key, tag) for each invalidation made by another worker; (None, None) means "everything"
+InvalidationCallback = Callable[[Optional[str], Optional[int]], None]
+
+
+def _log_position(conn: sqlite3.Connection) -> int:
+    """Id of the latest invalidation ever logged (pruned rows included)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'shared_cache_invalidations'").fetchone()
+    return row[0] if row else 0
+
+
+def encode(value: Any) -> bytes:
+    """Compact stored form: orjson (or the raw bytes), zlib-compressed past SHARED_CACHE_COMPRESS_MIN_BYTES."""
+    raw = isinstance(value, (bytes, bytearray))
+    body = bytes(value) if raw else dumps(value)
+    if len(body) >= SHARED_CACHE_COMPRESS_MIN_BYTES:
+        return (_RAW_Z if raw else _JSON_Z) + zlib.compress(body, 6)
+    return (_RAW if raw else _JSON) + body
+
+
+def decode(blob: bytes) -> Any:
+    kind, body = blob[:1], blob[1:]
+    if kind in (_JSON_Z, _RAW_Z):
+        body = zlib.decompress(body)
+    return body if kind in (_RAW, _RAW_Z) else orjson.loads(body)
+
+
+class SharedCache:
+    """
+    Namespaced key/value cache in a SQLite (WAL) file that every worker process on
+    the host opens. Values are stored compactly (see encode), the file is kept under
+    max_bytes by evicting least-recently-used entries, and entries can carry an
+    integer tag (e.g. a degree_id) so related entries are dropped together.
+
+    Invalidations delete the entries and append to an invalidation log in one
+    transaction. Workers poll the log (sync) and call the callbacks subscribed for
+    the namespace, so their in-process copies are dropped too. A load that raced
+    with an invalidation is not stored: pass the token() taken before loading to set().
+
+    Errors are logged and counted; the cache then behaves as a miss, never as a failure.
+    """
+
+    def __init__(self, path: str, max_bytes: int, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._subscribers: Dict[str, List[InvalidationCallback]] = {}
+        self._last_seen = 0
+        self._synced_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.stale_sets = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+        self.errors = 0
+        self.bytes = 0
+        self.entries = 0
+
+    # --- Storage (run in a worker thread) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            # Only invalidations made from now on concern this process
+            self._last_seen = _log_position(conn)
+            self._conn = conn
+        return self._conn
+
+    def _get(self, namespace: str, key: str) -> Optional[Tuple[Any, Optional[int]]]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, tag, expires_at, accessed_at FROM shared_cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[2] < now:
+                conn.execute("DELETE FROM shared_cache WHERE namespace = ? AND key = ?", (namespace, key))
+                self.expirations += 1
+                return None
+            if row[3] < now - SHARED_CACHE_TOUCH_SECONDS:
+                conn.execute("UPDATE shared_cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                             (now, namespace, key))
+        return decode(row[0]), row[1]
+
+    def _set(self, namespace: str, key: str, blob: bytes, ttl_seconds: float, tag: Optional[int],
+             token: Optional[int]) -> bool:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if token is not None and conn.execute(
+                        "SELECT 1 FROM shared_cache_invalidations WHERE id > ? AND namespace = ?"
+                        " AND (key IS NULL AND tag IS NULL OR key = ? OR tag = ?) LIMIT 1",
+                        (token, namespace, key, tag)).fetchone():
+                    conn.execute("ROLLBACK")
+                    self.stale_sets += 1
+                    return False
+                now = time.time()
+                conn.execute(
+                    "INSERT INTO shared_cache (namespace, key, tag, value, size, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (namespace, key) DO UPDATE SET"
+                    " tag = excluded.tag, value = excluded.value, size = excluded.size,"
+                    " expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (namespace, key, tag, blob, len(blob), now + ttl_seconds, now),
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drops expired entries, then least-recently-used ones, until under the low watermark."""
+        size = conn.execute("SELECT bytes, entries FROM shared_cache_size").fetchone()
+        if size[0] > self.max_bytes:
+            self.expirations += conn.execute("DELETE FROM shared_cache WHERE expires_at < ?", (now,)).rowcount
+            target = self.max_bytes * _LOW_WATERMARK
+            while True:
+                size = conn.execute("SELECT bytes, entries FROM shared_cache_size").fetchone()
+                excess = size[0] - target
+                if excess <= 0 or size[1] == 0:
+                    break
+                # Oldest entries first, just enough of them to get under the watermark
+                victims = []
+                for rowid, entry_size in conn.execute(
+                        "SELECT rowid, size FROM shared_cache ORDER BY accessed_at LIMIT ?", (_EVICT_BATCH,)):
+                    victims.append((rowid,))
+                    excess -= entry_size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM shared_cache WHERE rowid = ?", victims)
+                self.evictions += len(victims)
+        self.bytes, self.entries = size
+
+    def _invalidate(self, namespace: str, key: Optional[str], tag: Optional[int]) -> int:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if key is not None:
+                    removed = conn.execute("DELETE FROM shared_cache WHERE namespace = ? AND key = ?",
+                                           (namespace, key)).rowcount
+                elif tag is not None:
+                    removed = conn.execute("DELETE FROM shared_cache WHERE namespace = ? AND tag = ?",
+                                           (namespace, tag)).rowcount
+                else:
+                    removed = conn.execute("DELETE FROM shared_cache WHERE namespace = ?", (namespace,)).rowcount
+                conn.execute(
+                    "INSERT INTO shared_cache_invalidations (namespace, key, tag, origin, at) VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, tag, os.getpid(), now),
+                )
+                conn.execute("DELETE FROM shared_cache_invalidations WHERE at < ?",
+                             (now - SHARED_CACHE_LOG_RETENTION_SECONDS,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def _token(self) -> int:
+        with self._lock:
+            return _log_position(self._connect())
+
+    def _changes(self) -> List[Tuple[str, Optional[str], Optional[int]]]:
+        """Invalidations made by other processes since the last call; a gap in the log means "everything"."""
+        with self._lock:
+            conn = self._connect()
+            oldest = conn.execute("SELECT MIN(id) FROM shared_cache_invalidations").fetchone()[0]
+            rows = conn.execute(
+                "SELECT id, namespace, key, tag, origin FROM shared_cache_invalidations WHERE id > ? ORDER BY id",
+                (self._last_seen,),
+            ).fetchall()
+            self.bytes, self.entries = conn.execute("SELECT bytes, entries FROM shared_cache_size").fetchone()
+            gap = oldest is not None and oldest > self._last_seen + 1
+            if rows:
+                self._last_seen = rows[-1][0]
+        if gap:
+            return [(namespace, None, None) for namespace in self._subscribers]
+        pid = os.getpid()
+        return [(namespace, key, tag) for _, namespace, key, tag, origin in rows if origin != pid]
+
+    # --- Async API ---
+
+    def subscribe(self, namespace: str, callback: InvalidationCallback):
+        """Registers a per-process cache to be told about other workers' invalidations of `namespace`."""
+        self._subscribers.setdefault(namespace, []).append(callback)
+
+    async def sync(self):
+        """Applies other workers' invalidations; a no-op until SHARED_CACHE_SYNC_SECONDS have passed."""
+        now = time.monotonic()
+        if not self.enabled or now - self._synced_at < SHARED_CACHE_SYNC_SECONDS:
+            return
+        self._synced_at = now
+        try:
+            changes = await asyncio.to_thread(self._changes)
+        except Exception as e:
+            self._error("sync", e)
+            return
+        for namespace, key, tag in changes:
+            self.remote_invalidations += 1
+            for callback in self._subscribers.get(namespace, ()):
+                callback(key, tag)
+
+    async def get(self, namespace: str, key: str) -> Optional[Tuple[Any, Optional[int]]]:
+        """Returns (value, tag), or None on a miss."""
+        if not self.enabled:
+            return None
+        try:
+            entry = await asyncio.to_thread(self._get, namespace, key)
+        except Exception as e:
+            self._error("read", e)
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def set(self, namespace: str, key: str, value: Any, ttl_seconds: float, tag: int = None,
+                  token: int = None) -> bool:
+        """
+        Stores a JSON-serializable value (or raw bytes). With a token from token(), the
+        value is dropped instead if the key was invalidated after the token was taken.
+        """
+        if not self.enabled:
+            return False
+        try:
+            blob = encode(value)
+            stored = await asyncio.to_thread(self._set, namespace, key, blob, ttl_seconds, tag, token)
+        except Exception as e:
+            self._error("write", e)
+            return False
+        self.sets += stored
+        return stored
+
+    async def invalidate(self, namespace: str, key: str = None, tag: int = None) -> int:
+        """Drops one key, every entry with `tag`, or (neither given) the whole namespace, on every worker."""
+        if not self.enabled:
+            return 0
+        self.invalidations += 1
+        try:
+            return await asyncio.to_thread(self._invalidate, namespace, key, tag)
+        except Exception as e:
+            self._error("invalidation", e)
+            return 0
+
+    async def token(self) -> Optional[int]:
+        """Position in the invalidation log; take it before loading a value that set() will store."""
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._token)
+        except Exception as e:
+            self._error("read", e)
+            return None
+
+    def _error(self, operation: str, e: Exception):
+        self.errors += 1
+        print(f"Shared cache {operation} error ({self.path}): {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for this process; bytes and entries are the whole file's, as of the last write or sync."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "stale_sets": self.stale_sets,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "entries": self.entries,
+            "max_bytes": self.max_bytes,
+        }
+
+
+shared_cache = SharedCache(SHARED_CACHE_PATH, SHARED_CACHE_MAX_BYTES, SHARED_CACHE_ENABLED)
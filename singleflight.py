@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Keyed request coalescing: concurrent callers with the same key await one
+    in-flight task and share its result or error. The task is shielded, so a
+    disconnecting caller does not cancel the work for everyone else.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._inflight),
+        }
+
+
+# One group per operation family, so metrics can be broken down by name
+_GROUPS: Dict[str, SingleFlight] = {}
+
+
+def group(name: str) -> SingleFlight:
+    """Returns the process-wide SingleFlight group for an operation family."""
+    if name not in _GROUPS:
+        _GROUPS[name] = SingleFlight(name)
+    return _GROUPS[name]
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {name: flight.stats() for name, flight in _GROUPS.items()}
@@ -0,0 +1,361 @@
+import os
+import re
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Canonical skill registry: every extracted skill name is aliased to one canonical skill
+SKILL_REGISTRY_PATH = os.getenv("SKILL_REGISTRY_PATH", ".cache/skill_registry.sqlite3")
+SKILL_MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.85"))
+# How often a lookup that misses re-reads rows other workers added to the shared file
+SKILL_REGISTRY_REFRESH_SECONDS = float(os.getenv("SKILL_REGISTRY_REFRESH_SECONDS", "5"))
+
+# MinHash over character 3-grams, LSH with 32 bands x 4 rows (candidate threshold ~0.42 Jaccard)
+_NUM_PERM = 128
+_BANDS = 32
+_ROWS = _NUM_PERM // _BANDS
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, (1 << 31) - 1, size=_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, (1 << 31) - 1, size=_NUM_PERM, dtype=np.uint64)
+
+# Qualifier words that do not change which skill is meant ("Python Fundamentals" == "Python").
+# Subject words such as "language" or "programming" are not qualifiers: they tell
+# "Natural Language Processing" apart from "Natural Processing".
+_QUALIFIERS = {
+    "skill", "skills", "fundamentals", "fundamental", "basics", "basic",
+    "introduction", "intro", "to", "of", "the", "and", "in", "principles", "concepts", "knowledge",
+}
+_WORD = re.compile(r"[a-z0-9+#]+")
+_NUMBER = re.compile(r"\d+")
+
+
+def normalize(name: str) -> str:
+    """Lowercase words without qualifiers or naive plurals, e.g. 'Data Structures (basics)' -> 'data structure'."""
+    words = []
+    for word in _WORD.findall(name.lower()):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if word not in _QUALIFIERS:
+            words.append(word)
+    return " ".join(words) or name.strip().lower()
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True when a and b differ by at most one inserted, deleted or substituted character."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i + (len(a) == len(b)):] == b[i + 1:]
+
+
+def same_skill(key: str, other: str) -> bool:
+    """
+    Guard applied on top of a MinHash match: the keys must be spelling variants of each
+    other, not different skills that share most of their letters. Keys may differ in
+    spacing ("postgre sql" / "postgresql") or by a one-character typo inside a long word
+    whose first four letters agree, so a changed prefix ("micro"/"macro", "organic"/"inorganic")
+    never merges.
+    """
+    if key.replace(" ", "") == other.replace(" ", ""):
+        return True
+    words, others = key.split(), other.split()
+    if len(words) != len(others):
+        return False
+    return all(
+        a == b or (min(len(a), len(b)) >= 6 and a[:4] == b[:4] and _within_one_edit(a, b))
+        for a, b in zip(words, others)
+    )
+
+
+def slug(name: str) -> str:
+    return name.replace(' ', '_').lower()
+
+
+def _shingles(key: str) -> np.ndarray:
+    compact = f" {key.replace(' ', '')} "
+    grams = {compact[i:i + 3] for i in range(max(1, len(compact) - 2))}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little") for g in grams],
+        dtype=np.uint64
+    ) % _PRIME
+
+
+def minhash(key: str) -> np.ndarray:
+    """128-value MinHash signature of a normalized name (vectorized over all permutations)."""
+    hashes = _shingles(key)
+    # a, h < 2^31, so a * h + b stays well inside uint64
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+class _View:
+    """
+    One immutable state of the registry's in-memory index. Lookups read the current
+    view without any lock; writers build the next view and publish it in one assignment.
+    """
+
+    __slots__ = ("aliases", "names", "keys", "signatures", "numbers", "buckets", "last_canonical", "last_alias")
+
+    def __init__(self):
+        self.aliases: Dict[str, int] = {}                  # normalized alias -> canonical id
+        self.names: Dict[int, str] = {}                    # canonical id -> display name
+        self.keys: Dict[int, str] = {}                     # canonical id -> normalized key
+        self.signatures: Dict[int, np.ndarray] = {}
+        self.numbers: Dict[int, List[str]] = {}
+        self.buckets: Dict[Tuple[int, bytes], frozenset] = {}  # (band, band hash) -> canonical ids
+        self.last_canonical = 0                            # highest canonical_skills id loaded
+        self.last_alias = 0                                # highest skill_aliases rowid loaded
+
+    def copy(self) -> "_View":
+        """Draft for the next view: dicts are copied, their values (arrays, frozensets) shared."""
+        draft = _View()
+        for field in self.__slots__:
+            value = getattr(self, field)
+            setattr(draft, field, dict(value) if isinstance(value, dict) else value)
+        return draft
+
+    def index(self, canonical_id: int, name: str, key: str):
+        signature = minhash(key)
+        self.names[canonical_id] = name
+        self.keys[canonical_id] = key
+        self.aliases[key] = canonical_id
+        self.signatures[canonical_id] = signature
+        self.numbers[canonical_id] = _NUMBER.findall(key)
+        for band in range(_BANDS):
+            bucket = (band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes())
+            self.buckets[bucket] = self.buckets.get(bucket, frozenset()) | {canonical_id}
+
+    def match(self, key: str) -> Optional[int]:
+        if key in self.aliases:
+            return self.aliases[key]
+        signature = minhash(key)
+        candidates = set()
+        for band in range(_BANDS):
+            candidates |= self.buckets.get((band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes()), frozenset())
+        # Numbers must agree ("Calculus 1" is not "Calculus 2")
+        numbers = _NUMBER.findall(key)
+        candidates = sorted(c for c in candidates if self.numbers[c] == numbers)
+        if not candidates:
+            return None
+        scores = (np.stack([self.signatures[c] for c in candidates]) == signature).mean(axis=1)
+        for i in np.argsort(-scores, kind="stable"):
+            if scores[i] < SKILL_MATCH_THRESHOLD:
+                break
+            if same_skill(key, self.keys[candidates[i]]):
+                return candidates[i]
+        return None
+
+
+class SkillRegistry:
+    """
+    In-memory alias map and LSH index, persisted to SQLite. Lookups are exact on the
+    normalized name first, then approximate via MinHash LSH candidates that must also
+    pass same_skill. Every worker keeps its own index over the shared file: rows other
+    workers added are picked up incrementally, and UNIQUE(key) makes sure two workers
+    never mint two ids for one key.
+
+    Lookups (resolve, name, stats) never block and never touch SQLite: they read the
+    published _View. Loading, refreshing and registering do SQLite I/O under the lock
+    and belong in a worker thread (refresh() and the job handlers take care of that).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._view: Optional[_View] = None
+        self._refreshed_at = 0.0
+        self._refreshing = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS canonical_skills ("
+                " id INTEGER PRIMARY KEY, name TEXT NOT NULL, key TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS skill_aliases (alias TEXT PRIMARY KEY, canonical_id INTEGER NOT NULL)"
+            )
+            self._dedupe_keys(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _dedupe_keys(conn: sqlite3.Connection):
+        """
+        Adds UNIQUE(key) on canonical_skills. Registries created before it may hold one key
+        under several ids: those collapse onto the oldest first.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE skill_aliases SET canonical_id = (SELECT MIN(c2.id) FROM canonical_skills c1"
+                " JOIN canonical_skills c2 ON c2.key = c1.key WHERE c1.id = skill_aliases.canonical_id)"
+                " WHERE canonical_id IN (SELECT id FROM canonical_skills c"
+                " WHERE id > (SELECT MIN(id) FROM canonical_skills WHERE key = c.key))"
+            )
+            conn.execute(
+                "DELETE FROM canonical_skills WHERE id > (SELECT MIN(id) FROM canonical_skills c WHERE c.key = canonical_skills.key)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS canonical_skills_key ON canonical_skills(key)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _load_new_rows(self, draft: _View):
+        """Adds canonical skills and aliases written since the draft's last load (by any worker)."""
+        conn = self._connect()
+        for canonical_id, name, key in conn.execute(
+                "SELECT id, name, key FROM canonical_skills WHERE id > ? ORDER BY id", (draft.last_canonical,)):
+            if canonical_id not in draft.names:
+                draft.index(canonical_id, name, key)
+            draft.last_canonical = canonical_id
+        for rowid, alias, canonical_id in conn.execute(
+                "SELECT rowid, alias, canonical_id FROM skill_aliases WHERE rowid > ? ORDER BY rowid",
+                (draft.last_alias,)):
+            draft.aliases[alias] = canonical_id
+            draft.last_alias = rowid
+
+    def load(self) -> _View:
+        """Re-reads rows added to the shared file and publishes the result. Blocking: run in a thread."""
+        with self._lock:
+            draft = self._view.copy() if self._view is not None else _View()
+            self._load_new_rows(draft)
+            self._view = draft
+            self._refreshed_at = time.monotonic()
+            return draft
+
+    def _current_view(self) -> _View:
+        """The published view, loading it first if needed (blocking: worker threads only)."""
+        return self._view if self._view is not None else self.load()
+
+    async def refresh(self, force: bool = False):
+        """
+        Picks up skills other workers registered, in a worker thread and at most every
+        SKILL_REGISTRY_REFRESH_SECONDS. Async read paths await this before resolving names.
+        """
+        due = self._view is None or time.monotonic() - self._refreshed_at >= SKILL_REGISTRY_REFRESH_SECONDS
+        if (not force and not due) or self._refreshing:
+            return
+        self._refreshing = True
+        try:
+            await asyncio.to_thread(self.load)
+        except sqlite3.Error as e:
+            print(f"Skill registry refresh failed: {e}")
+        finally:
+            self._refreshing = False
+
+    def resolve(self, name: str) -> Optional[Tuple[int, str]]:
+        """
+        (canonical id, canonical name) for a known skill, without registering anything;
+        None when the name is unknown to the published view (callers fall back to the raw name).
+        Lock-free and in memory, safe to call on the event loop.
+        """
+        view = self._view
+        if view is None:
+            return None
+        canonical_id = view.match(normalize(name))
+        return (canonical_id, view.names[canonical_id]) if canonical_id is not None else None
+
+    def resolve_name(self, name: str) -> str:
+        """Canonical name of a registered skill, or the name itself when it is unknown."""
+        canonical = self.resolve(name)
+        return canonical[1] if canonical is not None else name
+
+    def register(self, name: str) -> Tuple[int, str]:
+        """Aliases a skill name to its canonical skill, creating a new canonical skill if none matches."""
+        return self.register_many([name])[0]
+
+    def register_many(self, names: List[str]) -> List[Tuple[int, str]]:
+        """
+        Registers a batch of names in one transaction and returns their (canonical id,
+        canonical name) pairs, in order. Writes SQLite, so call it from a worker thread;
+        the new view is published only once the transaction committed.
+        """
+        with self._lock:
+            draft = self._view.copy() if self._view is not None else _View()
+            self._load_new_rows(draft)
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                resolved = [self._register(conn, draft, name) for name in names]
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._view = draft
+            self._refreshed_at = time.monotonic()
+            return [(canonical_id, draft.names[canonical_id]) for canonical_id in resolved]
+
+    @staticmethod
+    def _register(conn: sqlite3.Connection, draft: _View, name: str) -> int:
+        key = normalize(name)
+        canonical_id = draft.match(key)
+        if canonical_id is None:
+            # Another worker may have added the same key since the load: keep its id
+            conn.execute(
+                "INSERT INTO canonical_skills (name, key) VALUES (?, ?) ON CONFLICT(key) DO NOTHING",
+                (name.strip(), key)
+            )
+            canonical_id, canonical_name = conn.execute(
+                "SELECT id, name FROM canonical_skills WHERE key = ?", (key,)
+            ).fetchone()
+            if canonical_id not in draft.names:
+                draft.index(canonical_id, canonical_name, key)
+        if key not in draft.aliases:
+            conn.execute(
+                "INSERT OR IGNORE INTO skill_aliases (alias, canonical_id) VALUES (?, ?)", (key, canonical_id)
+            )
+            canonical_id = conn.execute(
+                "SELECT canonical_id FROM skill_aliases WHERE alias = ?", (key,)
+            ).fetchone()[0]
+            draft.aliases[key] = canonical_id
+        return canonical_id
+
+    def name(self, canonical_id: int) -> str:
+        """Display name of a canonical skill id (blocking on a miss: worker threads only)."""
+        view = self._current_view()
+        if canonical_id not in view.names:
+            view = self.load()  # registered by another worker since the last load
+        return view.names[canonical_id]
+
+    def canonicalize_skills(self, skills: List[Dict]) -> List[Dict]:
+        """
+        Registers a module's AI skills in one batch (the name -> canonical skill mapping lives
+        in this registry) and returns copies with names as extracted. Skills repeated under the
+        same name are merged (the longest description wins) so one upsert never writes a row twice.
+        """
+        merged: Dict[str, Dict] = {}
+        for skill in skills:
+            name = skill['name'].strip()
+            existing = merged.get(name)
+            if existing is None:
+                merged[name] = {**skill, "name": name}
+            elif len(skill.get('description') or '') > len(existing.get('description') or ''):
+                existing['description'] = skill['description']
+        rows = list(merged.values())
+        self.register_many([row['name'] for row in rows])
+        return rows
+
+    def stats(self) -> Dict[str, int]:
+        view = self._view
+        if view is None:
+            return {"canonical_skills": 0, "aliases": 0}
+        return {"canonical_skills": len(view.names), "aliases": len(view.aliases)}
+
+
+skill_registry = SkillRegistry(SKILL_REGISTRY_PATH)
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+# Local state (job store, caches, skill registry) goes to a throwaway directory, and the
+# read-through caches are off so every request reaches the fake backend
+_STATE_DIR = tempfile.mkdtemp(prefix="skillpath-tests-")
+for name, value in {
+    "JOB_QUEUE_PATH": os.path.join(_STATE_DIR, "jobs.sqlite3"),
+    "SKILL_REGISTRY_PATH": os.path.join(_STATE_DIR, "skill_registry.sqlite3"),
+    "LLM_CACHE_PATH": os.path.join(_STATE_DIR, "llm_cache.sqlite3"),
+    "SHARED_CACHE_PATH": os.path.join(_STATE_DIR, "shared_cache.sqlite3"),
+    "SIMILARITY_INDEX_DIR": os.path.join(_STATE_DIR, "similarity"),
+    "SHARED_CACHE_ENABLED": "false",
+    "DB_CACHE_ENABLED": "false",
+    "LLM_CACHE_ENABLED": "false",
+    "GEMINI_API_KEY": "test",
+    "GEMINI_BACKOFF_BASE_SECONDS": "0.01",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from postgrest import AsyncPostgrestClient
+from bench.fake_postgrest import FakePostgrest, create_app
+from bench.faults import Faults
+from database import get_supabase_client
+from routers import degrees
+
+# Unordered, with gaps in the ids, so paging cannot rely on offsets or insertion order
+DEGREE_IDS = [13, 2, 34, 5, 21, 3, 8]
+
+
+def _get_all(*requests):
+    """Runs GET /api/degrees/ requests against the router backed by the fake PostgREST."""
+    tables = {"degrees": [{"id": i, "name": f"Degree {i}", "code": f"D{i}"} for i in DEGREE_IDS]}
+    backend = create_app(FakePostgrest(tables, Faults()))
+
+    async def scenario():
+        postgrest = AsyncPostgrestClient(
+            "http://postgrest/rest/v1",
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=backend), base_url="http://postgrest/rest/v1"),
+        )
+        app = FastAPI()
+        app.include_router(degrees.router)
+
+        async def fake_client():
+            yield postgrest
+
+        app.dependency_overrides[get_supabase_client] = fake_client
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return [await client.get("/api/degrees/", params=params) for params in requests]
+        finally:
+            await postgrest.aclose()
+
+    return asyncio.run(scenario())
+
+
+def test_pages_follow_the_cursor():
+    first, second, last = _get_all({"limit": 3}, {"limit": 3, "after": 5}, {"limit": 3, "after": 21})
+
+    assert [d["id"] for d in first.json()] == [2, 3, 5]
+    assert first.headers["X-Next-Cursor"] == "5"
+    assert [d["id"] for d in second.json()] == [8, 13, 21]
+    assert second.headers["X-Next-Cursor"] == "21"
+    assert [d["id"] for d in last.json()] == [34]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_full_last_page_ends_with_an_empty_page():
+    full, empty = _get_all({"limit": 7}, {"limit": 7, "after": 34})
+
+    assert len(full.json()) == 7
+    assert full.headers["X-Next-Cursor"] == "34"
+    assert empty.status_code == 200
+    assert empty.json() == []
+
+
+def test_unpaged_list_returns_everything_in_id_order():
+    (response,) = _get_all({})
+
+    assert [d["id"] for d in response.json()] == sorted(DEGREE_IDS)
+    assert response.json()[0] == {"id": 2, "name": "Degree 2"}
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_fields_always_include_the_cursor_column():
+    selected, invalid, too_large = _get_all({"fields": "code", "limit": 2},
+                                            {"fields": "name;drop"},
+                                            {"limit": degrees.DEGREE_PAGE_MAX + 1})
+
+    assert selected.json() == [{"id": 2, "code": "D2"}, {"id": 3, "code": "D3"}]
+    assert selected.headers["X-Next-Cursor"] == "3"
+    assert invalid.status_code == 422
+    assert too_large.status_code == 422
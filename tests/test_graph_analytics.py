@@ -0,0 +1,71 @@
+import pytest
+import graph_analytics
+from graph_analytics import compute_centrality
+from graph_model import CompactGraph
+
+
+def _graph(nodes, links):
+    graph = CompactGraph()
+    for node_id, group in nodes:
+        graph.add_node(node_id, node_id, group)
+    for source, target in links:
+        graph.add_link(graph.index(source), graph.index(target), "teaches")
+    return graph
+
+
+def _by_id(result):
+    """Ranked nodes by id (scores are rounded to 6 decimals)."""
+    return {node["id"]: node for node in result["ranked"]}
+
+
+def test_star_centrality():
+    # A hub module teaching four skills: every shortest path between skills runs through it
+    graph = _graph([("hub", "Module")] + [(f"s{i}", "Skill") for i in range(4)],
+                   [("hub", f"s{i}") for i in range(4)])
+    ranked = _by_id(compute_centrality(graph, group=None))
+
+    assert ranked["hub"]["degree"] == 4
+    assert ranked["hub"]["betweenness"] == pytest.approx(1.0)
+    assert ranked["s0"]["betweenness"] == pytest.approx(0.0)
+    # Closed form for an undirected star with damping 0.85 and n = 5
+    assert ranked["hub"]["pagerank"] == pytest.approx(0.132 / 0.2775, abs=1e-5)
+    assert ranked["s0"]["pagerank"] == pytest.approx(0.03 + 0.2125 * 0.132 / 0.2775, abs=1e-5)
+    assert sum(node["pagerank"] for node in ranked.values()) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_betweenness_splits_over_equal_shortest_paths(monkeypatch):
+    # A 4-cycle: each opposite pair has two shortest paths, so every node carries half a pair
+    monkeypatch.setattr(graph_analytics, "BETWEENNESS_BATCH", 3)  # sources span two batches
+    graph = _graph([(name, "Skill") for name in "abcd"], [("a", "b"), ("b", "c"), ("c", "d"), ("d", "a")])
+    ranked = _by_id(compute_centrality(graph))
+
+    for node in ranked.values():
+        assert node["betweenness"] == pytest.approx(0.5 / 3, abs=1e-6)
+        assert node["pagerank"] == pytest.approx(0.25, abs=1e-6)
+
+
+def test_path_betweenness_matches_brute_force():
+    names = [f"n{i}" for i in range(6)]
+    graph = _graph([(name, "Skill") for name in names], list(zip(names, names[1:])))
+    ranked = _by_id(compute_centrality(graph))
+
+    # On a path, node i lies between every pair (a < i < b): i * (n - 1 - i) pairs
+    n = len(names)
+    for i, name in enumerate(names):
+        assert ranked[name]["betweenness"] == pytest.approx(i * (n - 1 - i) / ((n - 1) * (n - 2) / 2), abs=1e-6)
+
+
+def test_duplicate_links_weight_the_ranking():
+    graph = _graph([("m", "Module"), ("python", "Skill"), ("sql", "Skill")],
+                   [("m", "python"), ("m", "python"), ("m", "sql")])
+    result = compute_centrality(graph)
+
+    assert [node["id"] for node in result["ranked"]] == ["python", "sql"]
+    assert result["ranked"][0]["degree"] == 1
+    assert result["ranked"][0]["weighted_degree"] == 2.0
+
+
+def test_empty_group():
+    graph = _graph([("m", "Module")], [])
+    assert compute_centrality(graph) == {"nodes_count": 1, "ranked": []}
+    assert compute_centrality(CompactGraph()) == {"nodes_count": 0, "ranked": []}
@@ -0,0 +1,111 @@
+import asyncio
+from job_queue import _JobStore, JobQueue, PENDING, RUNNING, SUCCEEDED, FAILED
+
+
+def _stores(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    return _JobStore(path, "worker-a"), _JobStore(path, "worker-b")
+
+
+def test_claim_leases_the_oldest_pending_job(tmp_path):
+    store, _ = _stores(tmp_path)
+    first, created = store.submit("build", "1", {"degree_id": 1})
+    second, _ = store.submit("build", "2", {"degree_id": 2})
+    assert created and first["status"] == PENDING
+
+    claimed = store.claim(max_attempts=3, lease_seconds=60)
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == RUNNING
+    assert claimed["attempts"] == 1
+    assert store.claim(max_attempts=3, lease_seconds=60)["id"] == second["id"]
+    assert store.claim(max_attempts=3, lease_seconds=60) is None
+
+
+def test_only_pending_jobs_are_deduplicated(tmp_path):
+    store, _ = _stores(tmp_path)
+    job, _ = store.submit("build", "1", {"degree_id": 1})
+    duplicate, created = store.submit("build", "1", {"degree_id": 1})
+    assert not created and duplicate["id"] == job["id"]
+
+    store.claim(max_attempts=3, lease_seconds=60)
+    rerun, created = store.submit("build", "1", {"degree_id": 1})
+    assert created and rerun["id"] != job["id"]
+
+
+def test_renew_and_finish_belong_to_the_lease_owner(tmp_path):
+    owner, other = _stores(tmp_path)
+    job, _ = owner.submit("build", "1", {})
+    owner.claim(max_attempts=3, lease_seconds=60)
+
+    assert owner.renew(job["id"], 60)
+    assert not other.renew(job["id"], 60)
+    other.finish(job["id"], FAILED, error={"detail": "not mine"})
+    assert owner.get(job["id"])["status"] == RUNNING
+
+    owner.finish(job["id"], SUCCEEDED, result={"nodes": 3})
+    finished = owner.get(job["id"])
+    assert finished["status"] == SUCCEEDED
+    assert finished["result"] == {"nodes": 3}
+    assert finished["finished_at"] is not None
+    # A finished job has no lease left to renew
+    assert not owner.renew(job["id"], 60)
+
+
+def test_live_lease_is_not_requeued(tmp_path):
+    owner, other = _stores(tmp_path)
+    owner.submit("build", "1", {})
+    owner.claim(max_attempts=3, lease_seconds=60)
+
+    assert other.requeue_interrupted(max_attempts=3) == 0
+    assert other.claim(max_attempts=3, lease_seconds=60) is None
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    owner, other = _stores(tmp_path)
+    job, _ = owner.submit("build", "1", {})
+    owner.claim(max_attempts=3, lease_seconds=-1)
+
+    taken = other.claim(max_attempts=3, lease_seconds=60)
+    assert taken["id"] == job["id"]
+    assert taken["attempts"] == 2
+    # The previous owner lost the job: it can neither renew it nor record a result
+    assert not owner.renew(job["id"], 60)
+    owner.finish(job["id"], SUCCEEDED, result={"stale": True})
+    assert other.get(job["id"])["status"] == RUNNING
+
+    other.finish(job["id"], SUCCEEDED, result={"stale": False})
+    assert other.get(job["id"])["result"] == {"stale": False}
+
+
+def test_job_interrupted_too_often_fails(tmp_path):
+    owner, other = _stores(tmp_path)
+    job, _ = owner.submit("build", "1", {})
+    owner.claim(max_attempts=1, lease_seconds=-1)
+
+    assert other.requeue_interrupted(max_attempts=1) == 0
+    failed = other.get(job["id"])
+    assert failed["status"] == FAILED
+    assert failed["error"] == {"detail": "Interrupted too many times"}
+
+
+def test_worker_survives_an_unserializable_result(tmp_path):
+    async def scenario():
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"), workers=1)
+
+        async def handler(payload):
+            return {"value": object()} if payload["bad"] else {"value": 1}
+
+        queue.register("echo", handler)
+        await queue.start()
+        try:
+            bad, _ = await queue.submit("echo", {"bad": True})
+            good, _ = await queue.submit("echo", {"bad": False})
+            return await queue.wait(bad["id"], 5), await queue.wait(good["id"], 5)
+        finally:
+            await queue.stop()
+
+    bad, good = asyncio.run(scenario())
+    assert bad["status"] == FAILED
+    assert "not JSON serializable" in bad["error"]["detail"]
+    assert good["status"] == SUCCEEDED
+    assert good["result"] == {"value": 1}
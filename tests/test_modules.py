@@ -0,0 +1,57 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from google import genai
+from google.genai import types
+from postgrest import AsyncPostgrestClient
+from bench.fake_gemini import FakeGemini, create_app as create_gemini_app
+from bench.fake_postgrest import FakePostgrest, generate_catalog, create_app as create_postgrest_app
+from bench.faults import Faults
+from clients.registry import client_registry
+from routers.modules import run_process_module
+
+
+def _process_module(module_id, gemini_error_rate):
+    """Runs run_process_module against the PostgREST and Gemini fakes; returns (outcome, tables)."""
+    tables = generate_catalog(degrees=1, modules=2, skills_per_module=3, text_bytes=64, seed=1)
+    tables["extracted_skills"] = []
+    postgrest_app = create_postgrest_app(FakePostgrest(tables, Faults()))
+    gemini_app = create_gemini_app(FakeGemini(Faults(error_rate=gemini_error_rate), skills_per_module=3,
+                                              list_items=3, text_bytes=32, rate_limit_rate=0.0,
+                                              chunks=1, chunk_ms=0.0))
+
+    async def scenario():
+        postgrest = AsyncPostgrestClient("http://postgrest/rest/v1", http_client=httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=postgrest_app), base_url="http://postgrest/rest/v1"))
+        gemini_http = httpx.AsyncClient(transport=httpx.ASGITransport(app=gemini_app), base_url="http://gemini")
+        client_registry._clients["gemini"] = genai.Client(api_key="test", http_options=types.HttpOptions(
+            base_url="http://gemini", httpx_async_client=gemini_http))
+        try:
+            return await run_process_module(module_id, postgrest)
+        except HTTPException as e:
+            return e
+        finally:
+            client_registry._clients.pop("gemini", None)
+            await gemini_http.aclose()
+            await postgrest.aclose()
+
+    return asyncio.run(scenario()), tables
+
+
+def test_extracted_skills_are_saved():
+    result, tables = _process_module(1, gemini_error_rate=0.0)
+
+    assert result["status"] == "success"
+    assert result["skills_extracted"] == len(tables["extracted_skills"]) > 0
+    assert {row["module_id"] for row in tables["extracted_skills"]} == {1}
+    assert len(tables["degree_graphs"]) == 1
+
+
+def test_gemini_outage_fails_without_writing():
+    result, tables = _process_module(2, gemini_error_rate=1.0)
+
+    assert isinstance(result, HTTPException)
+    assert result.status_code == 502
+    assert tables["extracted_skills"] == []
+    assert tables["degree_graphs"] == []
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": calls}
+
+        results = await asyncio.gather(*[flight.do("key", load) for _ in range(5)])
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "errors": 0, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        flight = SingleFlight("test")
+        attempts = 0
+
+        async def load():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            if attempts == 1:
+                raise RuntimeError("backend down")
+            return "ok"
+
+        first = await asyncio.gather(*[flight.do("key", load) for _ in range(3)], return_exceptions=True)
+        second = await flight.do("key", load)
+        return flight, first, second
+
+    flight, first, second = asyncio.run(scenario())
+    assert [type(result) for result in first] == [RuntimeError] * 3
+    assert all(str(result) == "backend down" for result in first)
+    # The failed flight was removed, so the next call ran the loader again
+    assert second == "ok"
+    assert flight.executions == 2
+    assert flight.errors == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "done"
+
+        leaver = asyncio.create_task(flight.do("key", load))
+        stayer = asyncio.create_task(flight.do("key", load))
+        await asyncio.sleep(0)
+        leaver.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leaver
+        return await stayer
+
+    assert asyncio.run(scenario()) == "done"
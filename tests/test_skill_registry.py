@@ -0,0 +1,96 @@
+import pytest
+from skill_registry import SkillRegistry, normalize, same_skill
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return SkillRegistry(str(tmp_path / "skills.sqlite3"))
+
+
+@pytest.mark.parametrize("name, key", [
+    ("Python Fundamentals", "python"),
+    ("Introduction to Databases", "database"),
+    ("Data Structures (basics)", "data structure"),
+    ("Natural Language Processing", "natural language processing"),
+    ("Business", "business"),
+    ("C++", "c++"),
+])
+def test_normalize(name, key):
+    assert normalize(name) == key
+
+
+@pytest.mark.parametrize("key, other, expected", [
+    ("postgre sql", "postgresql", True),        # spacing variant
+    ("kubernetes", "kubernets", True),          # one deletion in a long word
+    ("machine learnin", "machine learning", True),
+    ("java", "jave", False),                    # typo allowance starts at six letters
+    ("microeconomic", "macroeconomic", False),  # the edit falls inside the first four letters
+    ("organic chemistry", "inorganic chemistry", False),
+    ("linear algebra", "linear algebra ii", False),
+    ("javascript", "javascirpt", False),        # a transposition is two edits
+])
+def test_same_skill(key, other, expected):
+    assert same_skill(key, other) is expected
+    assert same_skill(other, key) is expected
+
+
+@pytest.mark.parametrize("name, variant", [
+    ("Python", "Python Fundamentals"),
+    ("PostgreSQL", "Postgre SQL"),
+    ("Data Structures", "data structure"),
+    ("Software Engineering Project Management", "Software Enginering Project Management"),
+    ("Object Oriented Programming Design Patterns", "Object Oriented Programing Design Patterns"),
+])
+def test_variants_merge(registry, name, variant):
+    canonical = registry.register(name)
+    assert registry.register(variant) == canonical
+    assert registry.resolve(variant) == canonical
+
+
+@pytest.mark.parametrize("name, other", [
+    ("Calculus 1", "Calculus 2"),
+    ("Microeconomics", "Macroeconomics"),
+    ("Organic Chemistry", "Inorganic Chemistry"),
+    ("Natural Language Processing", "Natural Processing"),
+    ("Java", "JavaScript"),
+    # A one-letter typo only reaches SKILL_MATCH_THRESHOLD in long names: short ones
+    # share too few 3-grams to become candidates, whatever same_skill would allow
+    ("Kubernetes", "Kubernets"),
+    ("Machine Learning", "Machine Learnin"),
+])
+def test_distinct_skills_stay_apart(registry, name, other):
+    first, second = registry.register_many([name, other])
+    assert first[0] != second[0]
+    assert registry.resolve(other) == second
+
+
+def test_resolve_never_registers(registry):
+    assert registry.resolve("Python") is None  # nothing loaded yet
+    registry.register("Python")
+    assert registry.resolve("Rust") is None
+    assert registry.resolve_name("Rust") == "Rust"
+    assert registry.resolve_name("python basics") == "Python"
+    assert registry.stats() == {"canonical_skills": 1, "aliases": 1}
+
+
+def test_registrations_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "skills.sqlite3")
+    writer, reader = SkillRegistry(path), SkillRegistry(path)
+    canonical = writer.register("Machine Learning")
+
+    reader.load()
+    assert reader.resolve("machine learning basics") == canonical
+    # Registering the same name in the other worker reuses the existing id
+    assert reader.register("Machine Learning") == canonical
+
+
+def test_canonicalize_skills_merges_repeated_names(registry):
+    rows = registry.canonicalize_skills([
+        {"name": "SQL ", "category": "Technical", "description": "Queries"},
+        {"name": "SQL", "category": "Technical", "description": "Queries and joins"},
+        {"name": "Teamwork", "category": "Soft", "description": None},
+    ])
+    assert [row["name"] for row in rows] == ["SQL", "Teamwork"]
+    assert rows[0]["description"] == "Queries and joins"
+    assert "canonical_skill_id" not in rows[0]
+    assert registry.resolve("sql") is not None
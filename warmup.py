@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Dict, List
+from clients.registry import client_registry
+from clients.gemini_gateway import GEMINI_BASE_URL
+from database import setup_supabase_client
+from routers.grapgh import warm_graph
+from routers.analysis_endpoints import warm_analysis
+
+# Optional startup warm-up: open pooled connections and preload the most-requested degrees
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "false").lower() == "true"
+WARMUP_TOP_DEGREES = int(os.getenv("WARMUP_TOP_DEGREES", "10"))
+WARMUP_DEGREES = [int(d) for d in os.getenv("WARMUP_DEGREES", "").split(",") if d.strip()]
+WARMUP_PARALLELISM = int(os.getenv("WARMUP_PARALLELISM", "4"))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+DEGREE_POPULARITY_PATH = os.getenv("DEGREE_POPULARITY_PATH", ".cache/degree_popularity.json")
+
+
+class DegreePopularity:
+    """
+    Request counts per degree, persisted across restarts so warm-up knows which
+    degrees are requested most. Saving merges this process's new counts into the
+    file, so several workers sharing it do not overwrite each other.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._counts: Counter = Counter()
+        self._unsaved: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, degree_id: int):
+        self._counts[degree_id] += 1
+        self._unsaved[degree_id] += 1
+
+    def top(self, n: int) -> List[int]:
+        return [degree_id for degree_id, _ in self._counts.most_common(n)]
+
+    def _read(self) -> Counter:
+        try:
+            with open(self.path) as f:
+                return Counter({int(k): v for k, v in json.load(f).items()})
+        except (OSError, ValueError):
+            return Counter()
+
+    def load(self):
+        with self._lock:
+            self._counts = self._read() + self._unsaved
+
+    def save(self):
+        with self._lock:
+            counts = self._read() + self._unsaved
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({str(k): v for k, v in counts.items()}, f)
+            os.replace(tmp_path, self.path)
+            self._unsaved.clear()
+            self._counts = counts
+
+
+degree_popularity = DegreePopularity(DEGREE_POPULARITY_PATH)
+
+WARMUP_STATS: Dict[str, Any] = {"ran": False}
+
+
+async def _open_pools():
+    """One round trip on each pooled client, so TCP/TLS (and HTTP/2) setup happens before traffic."""
+    client = await setup_supabase_client()
+    http = await client_registry.get("http")
+    await client_registry.get("gemini")
+
+    async def supabase_ping():
+        await client.table('degrees').select('id').limit(1).execute()
+
+    async def gemini_ping():
+        # Any response keeps the connection in the pool; the status does not matter
+        await http.get(GEMINI_BASE_URL, timeout=5.0)
+
+    for name, result in zip(("supabase", "gemini"), await asyncio.gather(
+            supabase_ping(), gemini_ping(), return_exceptions=True)):
+        if isinstance(result, Exception):
+            print(f"Warm-up: could not open the {name} connection: {result}")
+
+
+async def warm_up() -> Dict[str, Any]:
+    """
+    Opens pooled connections, then loads the stored graph, skill data and cached
+    analysis sections of the most-requested degrees (plus WARMUP_DEGREES).
+    Only caches are filled; Gemini is never called.
+    """
+    started = time.perf_counter()
+    await asyncio.to_thread(degree_popularity.load)
+    await _open_pools()
+
+    degree_ids = list(dict.fromkeys(WARMUP_DEGREES + degree_popularity.top(WARMUP_TOP_DEGREES)))
+    client = await setup_supabase_client()
+    semaphore = asyncio.Semaphore(WARMUP_PARALLELISM)
+
+    async def warm_degree(degree_id: int):
+        async with semaphore:
+            return await asyncio.gather(warm_graph(degree_id, client), warm_analysis(degree_id, client))
+
+    graphs = sections = failed = 0
+    for result in await asyncio.gather(*[warm_degree(d) for d in degree_ids], return_exceptions=True):
+        if isinstance(result, Exception):
+            failed += 1
+            continue
+        graphs += result[0]
+        sections += result[1]
+
+    WARMUP_STATS.update({
+        "ran": True,
+        "degrees": len(degree_ids),
+        "graphs": graphs,
+        "analysis_sections": sections,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - started, 3),
+    })
+    print(f"✅ Warm-up: {len(degree_ids)} degrees, {graphs} graphs, {sections} cached analysis sections "
+          f"in {WARMUP_STATS['seconds']}s")
+    return WARMUP_STATS
+
+
+async def run_warm_up():
+    """Runs warm_up() within WARMUP_TIMEOUT_SECONDS; startup continues whatever happens."""
+    try:
+        await asyncio.wait_for(warm_up(), WARMUP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"❌ Warm-up did not finish within {WARMUP_TIMEOUT_SECONDS}s; continuing startup")
+    except Exception as e:
+        print(f"❌ ERROR: Warm-up failed: {e}")